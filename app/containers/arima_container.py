@@ -1,11 +1,20 @@
 from repositories.model_prediction_repository import PredictionRepository
 from services.arima_prediction_service import ArimaPredictionService
+from services.baseline_forecast_service import BaselineForecastService
 from services.data_preparation_service import DataPreparationService
+from services.order_search_service import OrderSearchService
+from services.predict_coalescer import PredictCoalescer
 from services.top_product_service import TopProductService
+from services.training_job_service import TrainingJobService
 from use_cases.train_arima_model_use_case import TrainARIMAUseCase
+from use_cases.ingest_transactions_use_case import IngestTransactionsUseCase
+from use_cases.update_arima_model_use_case import UpdateARIMAModelUseCase
+from settings.config import Settings
 
 from dependency_injector import containers, providers
 
+settings = Settings()
+
 
 class ArimaContainer(containers.DeclarativeContainer):
     """Contenedor de dependencias para la aplicación."""
@@ -13,13 +22,28 @@ class ArimaContainer(containers.DeclarativeContainer):
     config = providers.Configuration()
 
     # Repository
-    repository = providers.Factory(
+    # Singleton: el dataset cacheado se comparte entre todas las peticiones
+    repository = providers.Singleton(
         PredictionRepository
     )
 
     # Services
     data_preparation_service = providers.Singleton(
-        DataPreparationService
+        DataPreparationService,
+        cache_max_entries=settings.series_cache_max_entries,
+        cache_max_bytes=settings.series_cache_max_bytes
+    )
+
+    training_job_service = providers.Singleton(
+        TrainingJobService,
+        pool_size=settings.training_pool_size,
+        queue_depth=settings.training_queue_depth,
+        log_level=settings.log_level
+    )
+
+    order_search_service = providers.Factory(
+        OrderSearchService,
+        training_job_service=training_job_service
     )
 
     top_product_service = providers.Factory(
@@ -27,16 +51,50 @@ class ArimaContainer(containers.DeclarativeContainer):
         repository=repository
     )
 
+    # Singleton: los perfiles de referencia se calculan una vez por versión del dataset
+    baseline_forecast_service = providers.Singleton(
+        BaselineForecastService,
+        seasons=settings.baseline_seasons
+    )
+
     # Services
-    arima_service = providers.Factory(
+    # Singleton: el cache de pronósticos se comparte entre todas las peticiones
+    arima_service = providers.Singleton(
         ArimaPredictionService,
         repository=repository,
-        data_preparation_service=data_preparation_service
+        data_preparation_service=data_preparation_service,
+        forecast_cache_max_entries=settings.forecast_cache_max_entries,
+        forecast_cache_max_bytes=settings.forecast_cache_max_bytes,
+        forecast_backend=settings.forecast_backend,
+        baseline_service=baseline_forecast_service if settings.baseline_fallback else None
+    )
+
+    # Singleton: las peticiones de todo el proceso se agrupan en los mismos lotes
+    predict_coalescer = providers.Singleton(
+        PredictCoalescer,
+        service=arima_service,
+        window_seconds=settings.predict_coalesce_window_ms / 1000,
+        max_batch=settings.predict_coalesce_max_batch
     )
 
     # Use cases
     train_arima_use_case = providers.Factory(
         TrainARIMAUseCase,
         repository=repository,
-        data_preparation_service=data_preparation_service
-    )
\ No newline at end of file
+        data_preparation_service=data_preparation_service,
+        training_job_service=training_job_service,
+        order_search_service=order_search_service,
+        warm_start_maxiter=settings.warm_start_maxiter
+    )
+
+    update_arima_use_case = providers.Factory(
+        UpdateARIMAModelUseCase,
+        repository=repository,
+        data_preparation_service=data_preparation_service,
+        training_job_service=training_job_service
+    )
+
+    ingest_transactions_use_case = providers.Factory(
+        IngestTransactionsUseCase,
+        repository=repository
+    )
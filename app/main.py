@@ -1,6 +1,10 @@
-from fastapi import FastAPI
-from routers import arima_router, health_check
-from containers.arima_container import ArimaContainer
+import time
+
+from fastapi import FastAPI, Request
+from routers import arima_router, health_check, metrics_router
+from containers.arima_container import ArimaContainer, settings
+from metrics.registry import http_request_duration
+from settings.logger import configure_log_level
 
 # Crear la aplicación FastAPI
 app = FastAPI()
@@ -11,10 +15,41 @@ container = ArimaContainer()
 # Incluir los routers
 app.include_router(health_check.health_check_router)
 app.include_router(arima_router.arima_router)
+app.include_router(metrics_router.metrics_router)
+
+# Los procesos del pool reciben el mismo nivel por su inicializador
+configure_log_level(settings.log_level)
+
+
+@app.middleware("http")
+async def record_request_duration(request: Request, call_next):
+    start = time.perf_counter()
+    response = await call_next(request)
+    # La plantilla de la ruta (no la URL) mantiene acotado el número de series
+    route = request.scope.get("route")
+    http_request_duration.observe(
+        time.perf_counter() - start,
+        method=request.method,
+        path=getattr(route, "path", "unmatched"),
+        status=str(response.status_code)
+    )
+    return response
+
 
 # Configurar el contenedor
 @app.on_event("startup")
 async def startup_event():
     container.wire(modules=[
-        "routers.arima_router"
-    ])
\ No newline at end of file
+        "routers.arima_router",
+        "routers.metrics_router"
+    ])
+
+    # Precargar los modelos más consultados, si se configuraron
+    prewarm_pairs = settings.prewarm_pairs()
+    if prewarm_pairs:
+        container.repository().warm_model_cache(prewarm_pairs)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    container.training_job_service().shutdown()
@@ -0,0 +1,29 @@
+import numpy as np
+
+# Estacionalidad semanal de las ventas diarias
+SEASON_LENGTH = 7
+
+
+def seasonal_naive_forecast(history: np.ndarray, steps: int, season_length: int = SEASON_LENGTH) -> np.ndarray:
+    """
+    Pronóstico estacional ingenuo de muchas series a la vez.
+
+    `history` tiene una fila por serie con las últimas temporadas completas
+    (su largo es múltiplo de `season_length`) y NaN en los días anteriores
+    al inicio de la serie; la última columna es el último día observado.
+    Cada período futuro es el promedio del mismo día de la temporada en las
+    temporadas disponibles; si una serie no tiene ese día, se usa su
+    promedio general. Devuelve una matriz (series, steps).
+    """
+    n_series, window = history.shape
+    if window % season_length:
+        raise ValueError(f"history must span whole seasons of {season_length} periods")
+
+    seasons = history.reshape(n_series, window // season_length, season_length)
+    observed = ~np.isnan(seasons)
+    sums = np.where(observed, seasons, 0.0).sum(axis=1)
+    counts = observed.sum(axis=1)
+    overall = sums.sum(axis=1) / np.maximum(counts.sum(axis=1), 1)
+    profile = np.where(counts > 0, sums / np.maximum(counts, 1), overall[:, None])
+    # Como la ventana cubre temporadas completas, el período h cae en la posición h del perfil
+    return profile[:, np.arange(steps) % season_length]
@@ -0,0 +1,52 @@
+from collections import defaultdict
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from models.compact_arima_model import CompactArimaModel
+
+
+def forecast_many(
+        models: Sequence[CompactArimaModel],
+        steps: Sequence[int],
+        exogs: Sequence[Any]
+) -> List[np.ndarray]:
+    """
+    Pronósticos puntuales de muchos modelos compactos a la vez.
+
+    Los modelos se agrupan por dimensión del estado, horizonte y número de
+    variables exógenas; dentro de cada grupo se apilan las matrices de
+    transición, los vectores de diseño y los últimos estados, y la recursión
+    de `CompactArimaModel.forecast` avanza todos los modelos del grupo con
+    una operación matricial por período en lugar de un bucle por modelo.
+    Devuelve un arreglo por modelo, en el orden de entrada.
+    """
+    groups: Dict[Tuple[int, int, int], List[int]] = defaultdict(list)
+    for position, (model, horizon) in enumerate(zip(models, steps)):
+        groups[(model.k_states, int(horizon), model.beta.size)].append(position)
+
+    forecasts: List[np.ndarray] = [np.empty(0)] * len(models)
+    for (k_states, horizon, k_exog), positions in groups.items():
+        group = [models[position] for position in positions]
+        transition = np.stack([model.transition for model in group])
+        design = np.stack([model.design[0] for model in group])
+        state = np.stack([model.state for model in group])
+        intercepts = np.stack([model._state_intercepts(horizon) for model in group])
+
+        forecast = np.empty((len(group), horizon))
+        for step in range(horizon):
+            forecast[:, step] = np.einsum('gk,gk->g', design, state)
+            state = np.einsum('gij,gj->gi', transition, state) + intercepts[:, step]
+
+        if k_exog > 0:
+            if any(exogs[position] is None for position in positions):
+                raise ValueError("Out-of-sample forecasting in a model with a regression component requires exog")
+            beta = np.stack([model.beta for model in group])
+            exog = np.stack([
+                np.asarray(exogs[position], dtype=float).reshape(horizon, k_exog) for position in positions
+            ])
+            forecast += np.einsum('ghe,ge->gh', exog, beta)
+
+        for row, position in enumerate(positions):
+            forecasts[position] = forecast[row]
+    return forecasts
@@ -0,0 +1,217 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.statespace.tools import prepare_trend_data
+
+COMPACT_FORMAT = "compact-sarimax-v1"
+
+# Matrices del sistema que deben ser invariantes en el tiempo para compactar
+_TIME_INVARIANT_MATRICES = ('design', 'obs_cov', 'transition', 'selection', 'state_cov')
+
+
+class CompactArimaModel:
+    """
+    Forecaster SARIMAX reconstruido a partir de un artefacto compacto.
+
+    En lugar de los resultados completos (datos de entrenamiento, estados
+    suavizados, covarianzas), guarda la especificación, los parámetros, las
+    matrices del espacio de estados y el último estado predicho. Eso basta
+    para proyectar el pronóstico con las mismas recursiones que
+    `SARIMAXResults.forecast`.
+    """
+
+    def __init__(self, artifact: Dict[str, Any]):
+        self.artifact = artifact
+        self.spec = artifact['spec']
+        self.param_names = list(artifact['param_names'])
+        self.params = np.asarray(artifact['params'], dtype=float)
+        self.exog_names = list(artifact['exog_names'])
+        self.beta = np.asarray(artifact['beta'], dtype=float)
+        self.design = np.asarray(artifact['design'], dtype=float)
+        self.obs_cov = np.asarray(artifact['obs_cov'], dtype=float)
+        self.transition = np.asarray(artifact['transition'], dtype=float)
+        self.selection = np.asarray(artifact['selection'], dtype=float)
+        self.state_cov = np.asarray(artifact['state_cov'], dtype=float)
+        self.state = np.asarray(artifact['state'], dtype=float)
+        self.state_cov_matrix = np.asarray(artifact['state_cov_matrix'], dtype=float)
+        self.trend_params = np.asarray(artifact['trend_params'], dtype=float)
+        self.polynomial_trend = np.asarray(artifact['polynomial_trend'], dtype=float)
+        self.trend_state_index = artifact['trend_state_index']
+        self.trend_offset = artifact['trend_offset']
+        self.nobs = artifact['nobs']
+        self.nobs_effective = artifact.get('nobs_effective')
+        self.k_params = artifact.get('k_params')
+        self.training_end = artifact['training_end']
+        self.aic = artifact['aic']
+        self.bic = artifact['bic']
+        self.llf = artifact['llf']
+
+    @property
+    def k_states(self) -> int:
+        return self.transition.shape[0]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes ocupados por los arreglos del artefacto."""
+        return sum(value.nbytes for value in self.artifact.values() if isinstance(value, np.ndarray))
+
+    @classmethod
+    def is_artifact(cls, obj: Any) -> bool:
+        return isinstance(obj, dict) and obj.get('format') == COMPACT_FORMAT
+
+    @classmethod
+    def from_results(cls, results: Any, spec: Optional[Dict[str, Any]] = None) -> "CompactArimaModel":
+        """
+        Extrae el artefacto compacto de un `SARIMAXResults` ajustado.
+
+        Lanza ValueError si el modelo usa una variante que el artefacto no
+        representa (representación de Hamilton, diferenciación simple,
+        varianza concentrada, regresión en el estado o matrices variantes en
+        el tiempo).
+        """
+        model = results.model
+        if getattr(model, 'hamilton_representation', False):
+            raise ValueError("Compact artifacts do not support the Hamilton representation")
+        if getattr(model, 'simple_differencing', False):
+            raise ValueError("Compact artifacts do not support simple differencing")
+        if getattr(model, 'concentrate_scale', False):
+            # Las matrices del sistema quedan sin escalar y las covarianzas del filtro escaladas
+            raise ValueError("Compact artifacts do not support a concentrated scale")
+        if getattr(model, 'state_regression', False) or getattr(model, 'time_varying_regression', False):
+            raise ValueError("Compact artifacts only support exogenous variables through MLE regression")
+
+        params = np.asarray(results.params, dtype=float)
+        # Sincronizar las matrices del sistema con los parámetros ajustados
+        model.update(params, transformed=True)
+        ssm = model.ssm
+        matrices = {}
+        for name in _TIME_INVARIANT_MATRICES:
+            matrix = ssm[name]
+            if matrix.ndim == 3:
+                if matrix.shape[-1] != 1:
+                    raise ValueError(f"Compact artifacts require a time-invariant '{name}' matrix")
+                matrix = matrix[..., 0]
+            matrices[name] = np.array(matrix, dtype=float)
+
+        param_names = list(model.param_names)
+        exog_names = list(model.exog_names or [])
+        beta = np.array([params[param_names.index(name)] for name in exog_names], dtype=float)
+
+        k_trend = getattr(model, '_k_trend', 0)
+        trend_params = params[:k_trend] if k_trend > 0 else np.array([])
+
+        index = getattr(model, '_index', None)
+        training_end = index[-1].strftime('%Y-%m-%d') if isinstance(index, pd.DatetimeIndex) else None
+
+        default_spec = {
+            'order': list(model.order),
+            'seasonal_order': list(model.seasonal_order),
+            'trend': model.trend,
+            'enforce_stationarity': model.enforce_stationarity,
+            'enforce_invertibility': model.enforce_invertibility,
+        }
+
+        artifact = {
+            'format': COMPACT_FORMAT,
+            'spec': {**default_spec, **(spec or {})},
+            'param_names': param_names,
+            'params': params,
+            'exog_names': exog_names,
+            'beta': beta,
+            **matrices,
+            # Estado predicho para el primer período fuera de la muestra
+            'state': np.array(results.predicted_state[:, -1], dtype=float),
+            'state_cov_matrix': np.array(results.predicted_state_cov[:, :, -1], dtype=float),
+            'trend_params': trend_params,
+            'polynomial_trend': np.asarray(getattr(model, 'polynomial_trend', []), dtype=float),
+            'trend_state_index': getattr(model, '_k_states_diff', 0),
+            'trend_offset': getattr(model, 'trend_offset', 1),
+            'nobs': int(model.nobs),
+            'nobs_effective': int(results.nobs_effective),
+            'k_params': int(results.df_model),
+            'training_end': training_end,
+            'aic': float(results.aic),
+            'bic': float(results.bic),
+            'llf': float(results.llf),
+        }
+        return cls(artifact)
+
+    def to_artifact(self) -> Dict[str, Any]:
+        return self.artifact
+
+    def append(self, endog: Any, exog: Any = None, training_end: Optional[str] = None) -> "CompactArimaModel":
+        """
+        Incorpora nuevas observaciones con los parámetros fijos.
+
+        Ejecuta el filtro de Kalman desde el último estado predicho, igual que
+        `SARIMAXResults.append(..., refit=False)`, y devuelve un nuevo modelo
+        con el estado, la log-verosimilitud y los criterios de información
+        actualizados.
+        """
+        endog = np.asarray(endog, dtype=float).ravel()
+        steps = endog.size
+        intercepts = self._state_intercepts(steps)
+        obs_intercepts = self._exog_effect(steps, exog)
+        design = self.design[0]
+        obs_var = float(self.obs_cov[0, 0])
+        state_noise = self.selection @ self.state_cov @ self.selection.T
+
+        state = self.state.copy()
+        state_cov = self.state_cov_matrix.copy()
+        llf = self.llf
+        for step in range(steps):
+            if not np.isnan(endog[step]):
+                error = endog[step] - design @ state - obs_intercepts[step]
+                pz = state_cov @ design
+                variance = design @ pz + obs_var
+                gain = pz / variance
+                state = state + gain * error
+                state_cov = state_cov - np.outer(gain, pz)
+                llf += -0.5 * (np.log(2 * np.pi * variance) + error ** 2 / variance)
+            state = self.transition @ state + intercepts[step]
+            state_cov = self.transition @ state_cov @ self.transition.T + state_noise
+
+        artifact = {
+            **self.artifact,
+            'state': state,
+            'state_cov_matrix': state_cov,
+            'nobs': self.nobs + steps,
+            'training_end': training_end,
+            'llf': float(llf),
+        }
+        if self.k_params is not None and self.nobs_effective is not None:
+            nobs_effective = self.nobs_effective + int(np.sum(~np.isnan(endog)))
+            artifact['nobs_effective'] = nobs_effective
+            artifact['aic'] = float(-2 * llf + 2 * self.k_params)
+            artifact['bic'] = float(-2 * llf + self.k_params * np.log(nobs_effective))
+        return CompactArimaModel(artifact)
+
+    def _state_intercepts(self, steps: int) -> np.ndarray:
+        """Intercepto de la transición para los períodos fuera de la muestra."""
+        intercepts = np.zeros((steps, self.k_states))
+        if self.trend_params.size > 0:
+            trend_data = prepare_trend_data(
+                self.polynomial_trend, self.trend_params.size, steps, self.trend_offset + self.nobs
+            )
+            intercepts[:, self.trend_state_index] = trend_data @ self.trend_params
+        return intercepts
+
+    def _exog_effect(self, steps: int, exog: Any) -> np.ndarray:
+        if self.beta.size == 0:
+            return np.zeros(steps)
+        if exog is None:
+            raise ValueError("Out-of-sample forecasting in a model with a regression component requires exog")
+        values = np.asarray(exog, dtype=float).reshape(steps, self.beta.size)
+        return values @ self.beta
+
+    def forecast(self, steps: int = 1, exog: Any = None) -> np.ndarray:
+        """Pronóstico puntual de `steps` períodos, equivalente a `SARIMAXResults.forecast`."""
+        intercepts = self._state_intercepts(steps)
+        state = self.state.copy()
+        design = self.design[0]
+        forecast = np.empty(steps)
+        for step in range(steps):
+            forecast[step] = design @ state
+            state = self.transition @ state + intercepts[step]
+        return forecast + self._exog_effect(steps, exog)
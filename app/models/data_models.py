@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, constr
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Literal
 
 
 class ARIMAParameters(BaseModel):
@@ -28,6 +28,35 @@ class ARIMAParameters(BaseModel):
         description="Whether to enforce invertibility in the model",
         example=False
     )
+    simple_differencing: bool = Field(
+        default=False,
+        description="Difference the series before estimation instead of inside the state space. Faster; "
+                    "the stored model is re-filtered on the original scale",
+        example=False
+    )
+    concentrate_scale: bool = Field(
+        default=False,
+        description="Concentrate the error variance out of the likelihood, removing one parameter "
+                    "from the numerical optimization",
+        example=False
+    )
+    method: Literal["lbfgs", "bfgs", "newton", "nm", "cg", "ncg", "powell"] = Field(
+        default="lbfgs",
+        description="Optimizer used to maximize the likelihood",
+        example="lbfgs"
+    )
+    maxiter: int = Field(
+        default=50,
+        ge=1,
+        description="Maximum number of optimizer iterations",
+        example=50
+    )
+    low_memory: bool = Field(
+        default=False,
+        description="Skip storing filter output during estimation to reduce memory and time. "
+                    "The stored model is re-filtered once with the estimated parameters",
+        example=False
+    )
 
     class Config:
         schema_extra = {
@@ -40,6 +69,57 @@ class ARIMAParameters(BaseModel):
             }
         }
 
+class OrderSearchGrid(BaseModel):
+    p: List[int] = Field(default=[0, 1, 2], description="Candidate AR orders", example=[0, 1, 2])
+    d: List[int] = Field(default=[1], description="Candidate differencing orders", example=[1])
+    q: List[int] = Field(default=[0, 1, 2], description="Candidate MA orders", example=[0, 1, 2])
+    P: List[int] = Field(default=[0, 1], description="Candidate seasonal AR orders", example=[0, 1])
+    D: List[int] = Field(default=[1], description="Candidate seasonal differencing orders", example=[1])
+    Q: List[int] = Field(default=[0, 1], description="Candidate seasonal MA orders", example=[0, 1])
+    s: int = Field(default=7, description="Number of periods in a season", example=7)
+    criterion: Literal["aic", "bic"] = Field(
+        default="aic",
+        description="Information criterion used to rank the candidates",
+        example="aic"
+    )
+    screening_maxiter: int = Field(
+        default=15,
+        gt=0,
+        description="Optimizer iterations of the first, cheap fit of every candidate",
+        example=15
+    )
+    prune_margin: float = Field(
+        default=10.0,
+        ge=0,
+        description="Candidates whose screening criterion is worse than the best by more than this margin "
+                    "are discarded without a full fit",
+        example=10.0
+    )
+    max_candidates: int = Field(
+        default=64,
+        gt=0,
+        description="Upper bound on the grid size",
+        example=64
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "p": [0, 1, 2],
+                "d": [1],
+                "q": [0, 1, 2],
+                "P": [0, 1],
+                "D": [1],
+                "Q": [0, 1],
+                "s": 7,
+                "criterion": "aic",
+                "screening_maxiter": 15,
+                "prune_margin": 10.0,
+                "max_candidates": 64
+            }
+        }
+
+
 class TrainRequest(BaseModel):
     product_id: constr(min_length=1) = Field(
         ...,
@@ -55,12 +135,121 @@ class TrainRequest(BaseModel):
         default=None,
         description="Optional ARIMA model parameters. If not provided, default parameters will be used."
     )
+    background: bool = Field(
+        default=False,
+        description="If true, queue the training and return a job id immediately instead of waiting for the fit",
+        example=False
+    )
+    warm_start: bool = Field(
+        default=False,
+        description="Start the optimizer from the stored model's parameters when its order and seasonal "
+                    "order match; falls back to a cold start otherwise",
+        example=False
+    )
+    auto_order: Optional[OrderSearchGrid] = Field(
+        default=None,
+        description="If provided, search this grid of orders and train the best candidate; "
+                    "the order and seasonal_order in parameters are ignored"
+    )
+    profile: Literal["default", "fast"] = Field(
+        default="default",
+        description="Training profile. 'fast' enables simple differencing, scale concentration and "
+                    "a 25-iteration L-BFGS limit; fields set explicitly in parameters take precedence",
+        example="default"
+    )
 
     class Config:
         schema_extra = {
             "example": {
                 "product_id": "16a562fb5931",
                 "store_id": "14bce06b5959",
+                "parameters": {
+                    "order": [1, 1, 1],
+                    "seasonal_order": [1, 1, 1, 7],
+                    "trend": "n",
+                    "enforce_stationarity": False,
+                    "enforce_invertibility": False
+                },
+                "background": False,
+                "warm_start": False,
+                "profile": "default"
+            }
+        }
+
+class ProductStorePair(BaseModel):
+    product_id: constr(min_length=1) = Field(
+        ...,
+        description="Unique identifier for the product",
+        example="16a562fb5931"
+    )
+    store_id: constr(min_length=1) = Field(
+        ...,
+        description="Unique identifier for the store",
+        example="14bce06b5959"
+    )
+
+class UpdateRequest(BaseModel):
+    product_id: constr(min_length=1) = Field(
+        ...,
+        description="Unique identifier for the product",
+        example="16a562fb5931"
+    )
+    store_id: constr(min_length=1) = Field(
+        ...,
+        description="Unique identifier for the store",
+        example="14bce06b5959"
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "product_id": "16a562fb5931",
+                "store_id": "14bce06b5959"
+            }
+        }
+
+class TrainBatchRequest(BaseModel):
+    pairs: Optional[List[ProductStorePair]] = Field(
+        default=None,
+        description="Explicit product-store pairs to train. If omitted, every pair in the dataset is considered."
+    )
+    store_id: Optional[str] = Field(
+        default=None,
+        description="Only train pairs from this store",
+        example="14bce06b5959"
+    )
+    min_observations: Optional[int] = Field(
+        default=None,
+        ge=1,
+        description="Only train pairs with at least this many transactions",
+        example=60
+    )
+    parameters: Optional[ARIMAParameters] = Field(
+        default=None,
+        description="Optional ARIMA model parameters applied to every pair"
+    )
+    mode: Literal["fit", "update"] = Field(
+        default="fit",
+        description="'fit' re-estimates every model; 'update' appends new observations to existing models "
+                    "keeping their parameters fixed",
+        example="fit"
+    )
+    warm_start: bool = Field(
+        default=False,
+        description="In 'fit' mode, start each optimizer from the stored model's parameters when the spec matches",
+        example=False
+    )
+    profile: Literal["default", "fast"] = Field(
+        default="default",
+        description="Training profile applied to every pair in 'fit' mode; see TrainRequest.profile",
+        example="default"
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "store_id": "14bce06b5959",
+                "min_observations": 60,
                 "parameters": {
                     "order": [1, 1, 1],
                     "seasonal_order": [1, 1, 1, 7],
@@ -71,6 +260,47 @@ class TrainRequest(BaseModel):
             }
         }
 
+class TrainingJobResponse(BaseModel):
+    job_id: str = Field(..., description="Training job identifier")
+    status: str = Field(..., description="Job status: queued, running, done or failed", example="done")
+    product_id: str = Field(..., description="Unique identifier for the product")
+    store_id: str = Field(..., description="Unique identifier for the store")
+    submitted_at: str = Field(..., description="UTC timestamp when the job was queued")
+    finished_at: Optional[str] = Field(None, description="UTC timestamp when the job finished")
+    result: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Training result with model_info and data_info once the job is done"
+    )
+    error: Optional[str] = Field(None, description="Error message if the job failed")
+
+class Transaction(BaseModel):
+    date: str = Field(..., description="Transaction date in YYYY-MM-DD format", example="2024-02-01")
+    product_id: constr(min_length=1) = Field(..., description="Unique identifier for the product",
+                                             example="16a562fb5931")
+    store_id: constr(min_length=1) = Field(..., description="Unique identifier for the store",
+                                           example="14bce06b5959")
+    quantity: float = Field(..., description="Units sold", example=3)
+    price: float = Field(..., description="Unit price", example=10.99)
+
+
+class IngestRequest(BaseModel):
+    transactions: List[Transaction] = Field(
+        ...,
+        min_length=1,
+        description="New transactions to append to the dataset"
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "transactions": [
+                    {"date": "2024-02-01", "product_id": "16a562fb5931", "store_id": "14bce06b5959",
+                     "quantity": 3, "price": 10.99}
+                ]
+            }
+        }
+
+
 class PredictRequest(BaseModel):
     product_id: constr(min_length=1) = Field(
         ...,
@@ -94,6 +324,21 @@ class PredictRequest(BaseModel):
         description="Optional list of future prices for the prediction period",
         example=[10.99, 10.99, 10.99, 11.99, 11.99, 11.99, 11.99]
     )
+    price_scenarios: Optional[List[List[float]]] = Field(
+        None,
+        min_length=1,
+        max_length=1000,
+        description="Optional what-if mode: one future price path (of length steps) per scenario. The model "
+                    "and series are loaded once and the response holds one row of predictions per scenario; "
+                    "cannot be combined with future_prices",
+        example=[[10.99] * 7, [9.99] * 7]
+    )
+    queue_training: bool = Field(
+        False,
+        description="When the pair has no trained model and the seasonal-naive baseline answers, also queue a "
+                    "background SARIMAX fit with the default parameters (at most one per pair at a time)",
+        example=False
+    )
 
     class Config:
         schema_extra = {
@@ -105,6 +350,59 @@ class PredictRequest(BaseModel):
             }
         }
 
+class PredictBatchItem(BaseModel):
+    product_id: constr(min_length=1) = Field(
+        ...,
+        description="Unique identifier for the product",
+        example="16a562fb5931"
+    )
+    store_id: constr(min_length=1) = Field(
+        ...,
+        description="Unique identifier for the store",
+        example="14bce06b5959"
+    )
+    steps: int = Field(
+        ...,
+        gt=0,
+        le=30,
+        description="Number of future time periods to predict (1-30 days)",
+        example=7
+    )
+    future_prices: Optional[List[float]] = Field(
+        None,
+        description="Optional list of future prices for the prediction period"
+    )
+
+class PredictBatchRequest(BaseModel):
+    items: List[PredictBatchItem] = Field(
+        ...,
+        min_length=1,
+        description="Product-store pairs to forecast"
+    )
+    stream: bool = Field(
+        default=False,
+        description="If true, stream one NDJSON line per item as results become available",
+        example=False
+    )
+    backend: Optional[Literal["per_model", "vectorized"]] = Field(
+        default=None,
+        description="Forecast backend for this batch: 'per_model' calls each model's forecast, 'vectorized' "
+                    "projects all models together with array operations. Defaults to the server setting",
+        example="vectorized"
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "items": [
+                    {"product_id": "16a562fb5931", "store_id": "14bce06b5959", "steps": 7},
+                    {"product_id": "16a562fb5931", "store_id": "14bce06b5959", "steps": 3,
+                     "future_prices": [10.99, 10.99, 11.99]}
+                ],
+                "stream": False
+            }
+        }
+
 class PredictionData(BaseModel):
     predictions: List[float] = Field(..., description="Predicted values")
     dates: List[str] = Field(..., description="Dates for the predictions")
@@ -185,4 +483,78 @@ class TopProductResponse(BaseModel):
                 }
             }
         }
-        
\ No newline at end of file
+        
+
+
+class TopProductsRequest(DateRange):
+    n: int = Field(
+        default=50,
+        gt=0,
+        le=1000,
+        description="Number of products in each ranking",
+        example=50
+    )
+    metric: Literal["quantity", "sales"] = Field(
+        default="quantity",
+        description="Ranking metric: total quantity, or total sales (quantity times average price)",
+        example="quantity"
+    )
+    by_store: bool = Field(
+        default=False,
+        description="If true, return one ranking per store instead of a single ranking",
+        example=True
+    )
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "start_date": "2024-01-01",
+                "end_date": "2024-01-31",
+                "n": 50,
+                "metric": "sales",
+                "by_store": True
+            }
+        }
+
+
+class RankedProduct(BaseModel):
+    rank: int = Field(..., description="Position in the ranking, starting at 1")
+    product_id: str = Field(..., description="Product ID")
+    total_quantity: int = Field(..., description="Total quantity sold")
+    average_price: float = Field(..., description="Average price")
+    total_sales: float = Field(..., description="Total sales")
+
+
+class StoreRanking(BaseModel):
+    store_id: Optional[str] = Field(None, description="Store ID; null when the ranking covers all stores")
+    products: List[RankedProduct] = Field(..., description="Products sorted by the metric")
+
+
+class TopProductsResponse(BaseModel):
+    metric: str = Field(..., description="Metric used for the ranking")
+    n: int = Field(..., description="Maximum number of products per ranking")
+    period: Dict[str, str] = Field(..., description="Analyzed period")
+    rankings: List[StoreRanking] = Field(..., description="A single global ranking, or one per store")
+
+    class Config:
+        schema_extra = {
+            "example": {
+                "metric": "sales",
+                "n": 2,
+                "period": {
+                    "start_date": "2024-01-01",
+                    "end_date": "2024-01-31"
+                },
+                "rankings": [
+                    {
+                        "store_id": "14bce06b5959",
+                        "products": [
+                            {"rank": 1, "product_id": "16a562fb5931", "total_quantity": 1500,
+                             "average_price": 10.99, "total_sales": 16485.0},
+                            {"rank": 2, "product_id": "2c4f1b7e9a10", "total_quantity": 900,
+                             "average_price": 12.5, "total_sales": 11250.0}
+                        ]
+                    }
+                ]
+            }
+        }
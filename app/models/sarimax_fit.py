@@ -0,0 +1,104 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from statsmodels.tsa.statespace.sarimax import SARIMAX
+
+# Opciones de ARIMAParameters que van a SARIMAX.fit y no al constructor del modelo
+FIT_OPTIONS = ('method', 'maxiter', 'low_memory')
+
+# Ajustes que cada perfil de entrenamiento aplica sobre los parámetros por
+# defecto; los parámetros indicados explícitamente en la petición ganan.
+# `low_memory` no forma parte de "fast": en series de un año el filtrado
+# adicional cuesta más de lo que ahorra, y solo conviene en series largas
+TRAINING_PROFILES: Dict[str, Dict[str, Any]] = {
+    "default": {},
+    "fast": {
+        'simple_differencing': True,
+        'concentrate_scale': True,
+        'method': 'lbfgs',
+        'maxiter': 25,
+    },
+}
+
+
+def split_fit_options(model_params: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Separa los parámetros del modelo en argumentos del constructor y opciones del ajuste."""
+    model_kwargs = {key: value for key, value in model_params.items() if key not in FIT_OPTIONS}
+    fit_kwargs = {key: model_params[key] for key in FIT_OPTIONS if model_params.get(key) is not None}
+    return model_kwargs, fit_kwargs
+
+
+def build_sarimax(prepared_data: pd.DataFrame, model_params: Dict[str, Any], **overrides: Any) -> SARIMAX:
+    """SARIMAX de la serie preparada, con el precio como variable exógena."""
+    model_kwargs, _ = split_fit_options(model_params)
+    return SARIMAX(prepared_data['Quantity'], exog=prepared_data['Price'], **{**model_kwargs, **overrides})
+
+
+def fit_sarimax(
+        prepared_data: pd.DataFrame,
+        model: SARIMAX,
+        model_params: Dict[str, Any],
+        start_params: Optional[List[float]] = None,
+        maxiter: Optional[int] = None
+) -> Tuple[Any, Dict[str, Any]]:
+    """
+    Estima el modelo con las opciones de ajuste de `model_params` y devuelve
+    los resultados junto con la información del optimizador (`mle_retvals`).
+    `maxiter` reemplaza el límite de iteraciones de los parámetros y
+    `start_params` sigue el orden de los parámetros de los resultados
+    guardados (ver `stored_param_names`).
+
+    La diferenciación simple, la varianza concentrada y el filtrado de bajo
+    consumo de memoria solo aceleran la estimación: sus resultados
+    pronostican la serie diferenciada, dejan la varianza fuera de los
+    parámetros o no guardan los estados filtrados. En esos casos los
+    parámetros estimados, con la varianza concentrada como `sigma2`, se
+    pasan una vez por el filtro de Kalman del modelo completo. Los
+    resultados guardados son así los de un SARIMAX normal: pronostican en la
+    escala original, se actualizan con `append` igual que en el perfil por
+    defecto, se pueden compactar y su AIC/BIC es comparable con el de un
+    ajuste normal.
+    """
+    _, fit_kwargs = split_fit_options(model_params)
+    if maxiter is not None:
+        fit_kwargs['maxiter'] = maxiter
+    if start_params is not None and model.concentrate_scale and len(start_params) == len(model.param_names) + 1:
+        # Los resultados guardados incluyen sigma2, que SARIMAX ubica al final
+        # y que con la varianza concentrada no se estima
+        start_params = list(start_params)[:-1]
+    fitted = model.fit(start_params=start_params, disp=False, **fit_kwargs)
+    mle_retvals = fitted.mle_retvals or {}
+
+    if model.simple_differencing or model.concentrate_scale or fit_kwargs.get('low_memory'):
+        fitted = full_model_results(prepared_data, model_params, fitted)
+    return fitted, mle_retvals
+
+
+def full_model_results(prepared_data: pd.DataFrame, model_params: Dict[str, Any], fitted: Any) -> Any:
+    """Filtra los parámetros de `fitted` con el modelo completo, sin diferenciación simple ni escala concentrada."""
+    estimated = dict(zip(fitted.model.param_names, np.asarray(fitted.params, dtype=float)))
+    if fitted.model.concentrate_scale:
+        estimated['sigma2'] = float(fitted.scale)
+    return filter_sarimax(prepared_data, model_params, estimated)
+
+
+def filter_sarimax(prepared_data: pd.DataFrame, model_params: Dict[str, Any], params: Any) -> Any:
+    """
+    Resultados del modelo completo con parámetros ya estimados, sin volver a
+    optimizar: una sola pasada del filtro de Kalman. `params` es un
+    diccionario por nombre o una secuencia en el orden de `stored_param_names`.
+    """
+    full_model = build_sarimax(prepared_data, model_params, simple_differencing=False, concentrate_scale=False)
+    if isinstance(params, dict):
+        params = [params[name] for name in full_model.param_names]
+    return full_model.filter(np.asarray(params, dtype=float))
+
+
+def stored_param_names(model: SARIMAX) -> List[str]:
+    """
+    Nombres de los parámetros que `fit_sarimax` guarda para este modelo: con
+    la varianza concentrada los resultados guardados incluyen `sigma2`.
+    """
+    names = list(model.param_names)
+    return names + ['sigma2'] if model.concentrate_scale else names
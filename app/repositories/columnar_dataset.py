@@ -0,0 +1,67 @@
+import os
+
+import pandas as pd
+import pyarrow.feather as feather
+
+from repositories.series_index import SERIES_SORT_COLUMNS
+from settings.logger import setup_logger
+
+log = setup_logger()
+
+DATASET_COLUMNS = ['Date', 'ProductID', 'StoreID', 'Quantity', 'Price']
+
+
+def columnar_path(csv_path: str) -> str:
+    """Ruta del archivo Feather que acompaña al CSV en `database_connection`."""
+    return f"{os.path.splitext(csv_path)[0]}.feather"
+
+
+def downcast_quantity(quantity: pd.Series) -> pd.Series:
+    """Cantidades enteras al entero más chico posible; si no, a float."""
+    if quantity.notna().all() and (quantity % 1 == 0).all():
+        return pd.to_numeric(quantity, downcast='integer')
+    return pd.to_numeric(quantity, downcast='float')
+
+
+def read_typed_csv(csv_path: str) -> pd.DataFrame:
+    """Parsea el CSV aplicando los tipos definitivos de cada columna."""
+    df = pd.read_csv(
+        csv_path,
+        usecols=DATASET_COLUMNS,
+        dtype={'ProductID': 'category', 'StoreID': 'category', 'Price': 'float64'},
+        parse_dates=['Date'],
+    )
+    df['Quantity'] = downcast_quantity(df['Quantity'])
+    return df
+
+
+def convert_csv_to_columnar(csv_path: str, target_path: str) -> None:
+    """Convierte el CSV a Feather sin compresión, escribiendo de forma atómica."""
+    log.info("Convirtiendo %s a formato columnar en %s", csv_path, target_path)
+    # Ordenado por par y fecha para que el índice de series use rangos contiguos
+    df = read_typed_csv(csv_path).sort_values(SERIES_SORT_COLUMNS, ignore_index=True)
+    tmp_path = f"{target_path}.{os.getpid()}.tmp"
+    # Sin compresión para que las lecturas puedan mapear el archivo en memoria
+    feather.write_feather(df, tmp_path, compression='uncompressed')
+    os.replace(tmp_path, target_path)
+
+
+def is_columnar_stale(csv_path: str, target_path: str) -> bool:
+    if not os.path.exists(target_path):
+        return True
+    return os.stat(target_path).st_mtime_ns < os.stat(csv_path).st_mtime_ns
+
+
+def load_typed_dataset(csv_path: str) -> pd.DataFrame:
+    """
+    Carga el dataset desde su copia Feather, creándola la primera vez.
+
+    El CSV sigue siendo la fuente de verdad: si es más reciente que el
+    archivo Feather, se vuelve a convertir.
+    """
+    target_path = columnar_path(csv_path)
+    if is_columnar_stale(csv_path, target_path):
+        convert_csv_to_columnar(csv_path, target_path)
+
+    table = feather.read_table(target_path, memory_map=True)
+    return table.to_pandas()
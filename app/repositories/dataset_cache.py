@@ -0,0 +1,364 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+import pandas as pd
+
+from repositories.columnar_dataset import DATASET_COLUMNS, load_typed_dataset
+from repositories.sales_cube import SalesCube
+from repositories.series_index import SeriesIndex
+from repositories.transaction_journal import journal_lock, journal_path, read_transactions, rotate_stale_journal
+from settings.logger import setup_logger
+
+log = setup_logger()
+
+
+def _concat_rows(data: pd.DataFrame, rows: pd.DataFrame) -> pd.DataFrame:
+    """Concatena transacciones nuevas conservando los IDs como categóricos."""
+    rows = rows[data.columns]
+    for column in ('ProductID', 'StoreID'):
+        if isinstance(data[column].dtype, pd.CategoricalDtype):
+            categories = data[column].cat.categories.union(pd.Index(rows[column].astype(str).unique()))
+            if not categories.equals(data[column].cat.categories):
+                data = data.assign(**{column: data[column].cat.set_categories(categories)})
+            rows = rows.assign(**{column: pd.Categorical(rows[column].astype(str), categories=categories)})
+    return pd.concat([data, rows], ignore_index=True)
+
+
+class BaseSnapshot(ABC):
+    """
+    Versionado común a los snapshots del dataset: versión, pares
+    modificados por ingestas posteriores a la última carga completa y cubo de
+    ventas construido bajo demanda.
+    """
+
+    def __init__(self, version: int, base_version: Optional[int] = None):
+        self.version = version
+        # Versión de la última carga completa; las posteriores solo agregan filas
+        self.base_version = version if base_version is None else base_version
+        self._pair_versions: Dict[Tuple[str, str], int] = {}
+        self._sales_cube: Optional[SalesCube] = None
+        self._lock = threading.Lock()
+
+    @property
+    @abstractmethod
+    def row_count(self) -> int:
+        pass
+
+    @abstractmethod
+    def _build_sales_cube(self) -> SalesCube:
+        pass
+
+    @property
+    def sales_cube(self) -> SalesCube:
+        """Cubo de ventas diarias, construido en la primera consulta de esta versión."""
+        with self._lock:
+            if self._sales_cube is None:
+                self._sales_cube = self._build_sales_cube()
+                log.info("Cubo de ventas construido con %s celdas", len(self._sales_cube))
+            return self._sales_cube
+
+    def unchanged_since(self, product_id: str, store_id: str, version: int) -> bool:
+        """Indica si las filas del par son las mismas que en la versión `version`."""
+        if version < self.base_version or version > self.version:
+            return False
+        return self._pair_versions.get((product_id, store_id), self.base_version) <= version
+
+    def _inherit(self, previous: "BaseSnapshot", rows: pd.DataFrame) -> None:
+        """Hereda del snapshot anterior los pares modificados y extiende su cubo con `rows`."""
+        self._pair_versions = {
+            **previous._pair_versions,
+            **{(str(product_id), str(store_id)): self.version
+               for product_id, store_id in rows[['ProductID', 'StoreID']].drop_duplicates().itertuples(index=False)}
+        }
+        with previous._lock:
+            if previous._sales_cube is not None:
+                self._sales_cube = previous._sales_cube.extend(rows)
+
+
+class DatasetSnapshot(BaseSnapshot):
+    """
+    Versión inmutable del dataset cargado junto con sus índices.
+
+    Las transacciones ingeridas después de la carga completa se guardan en
+    `ingested`, separadas del DataFrame cargado, que se comparte sin copiar
+    entre todas las versiones hasta la siguiente carga completa.
+    """
+
+    def __init__(
+            self,
+            data: pd.DataFrame,
+            version: int,
+            base_version: Optional[int] = None,
+            series_index: Optional[SeriesIndex] = None,
+            ingested: Optional[pd.DataFrame] = None
+    ):
+        super().__init__(version, base_version)
+        if series_index is None:
+            data, series_index = SeriesIndex.build(data)
+        self._base = data
+        self.series_index = series_index
+        self.ingested = ingested if ingested is not None else data.iloc[0:0]
+        self._data: Optional[pd.DataFrame] = None
+
+    @classmethod
+    def load(cls, data: pd.DataFrame, journal_rows: pd.DataFrame, version: int) -> "DatasetSnapshot":
+        """Snapshot de una carga completa, con las transacciones del journal ya aplicadas."""
+        if not journal_rows.empty:
+            data = _concat_rows(data, journal_rows)
+        return cls(data, version)
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """Dataset completo; con transacciones ingeridas se combina en la primera consulta."""
+        if self.ingested.empty:
+            return self._base
+        with self._lock:
+            if self._data is None:
+                self._data = _concat_rows(self._base, self.ingested)
+            return self._data
+
+    @property
+    def row_count(self) -> int:
+        return len(self._base) + len(self.ingested)
+
+    def _build_sales_cube(self) -> SalesCube:
+        cube = SalesCube.build(self._base)
+        return cube.extend(self.ingested) if not self.ingested.empty else cube
+
+    def get_series_rows(self, product_id: str, store_id: str) -> pd.DataFrame:
+        rows = self.series_index.get_rows(self._base, product_id, store_id)
+        if self.ingested.empty:
+            return rows
+        extra = self.series_index.get_appended_rows(self.ingested, product_id, store_id)
+        if extra.empty:
+            return rows
+        if rows.empty:
+            return extra.reset_index(drop=True)
+        return _concat_rows(rows.reset_index(drop=True), extra)
+
+    def append(self, rows: pd.DataFrame, version: int) -> "DatasetSnapshot":
+        """
+        Nuevo snapshot con las transacciones de `rows` agregadas. Solo se
+        ordena el lote nuevo y se actualizan en el índice los pares que
+        toca; el dataset cargado no se copia. El cubo de ventas, si ya
+        existía, se extiende solo con las filas nuevas.
+        """
+        rows, series_index = self.series_index.extend(rows, len(self.ingested))
+        ingested = rows.reset_index(drop=True) if self.ingested.empty \
+            else pd.concat([self.ingested, rows], ignore_index=True)
+        snapshot = DatasetSnapshot(self._base, version, self.base_version, series_index, ingested)
+        snapshot._inherit(self, rows)
+        return snapshot
+
+
+class PairCounts:
+    """
+    Índice global de pares para datasets que no se indexan en memoria:
+    mismas consultas que SeriesIndex (pares y número de filas) a partir de
+    un conteo por par.
+    """
+
+    def __init__(self, counts: Dict[Tuple[str, str], int]):
+        self._counts = counts
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def __contains__(self, pair: Tuple[str, str]) -> bool:
+        return pair in self._counts
+
+    def pairs(self) -> Iterator[Tuple[str, str]]:
+        return iter(self._counts)
+
+    def row_count(self, product_id: str, store_id: str) -> int:
+        return self._counts.get((product_id, store_id), 0)
+
+
+class OverlaySnapshot(BaseSnapshot):
+    """
+    Snapshot sobre un dataset de solo lectura que se consulta por par
+    (`pair_counts`, `row_count` y `get_series_rows`). Las transacciones del
+    journal se mantienen en memoria aparte, indexadas por par como las filas
+    ingeridas de DatasetSnapshot, y se combinan con las filas del dataset al
+    consultar un par.
+    """
+
+    def __init__(
+            self,
+            dataset: Any,
+            version: int,
+            ingested: Optional[pd.DataFrame] = None,
+            base_version: Optional[int] = None,
+            ingested_index: Optional[SeriesIndex] = None
+    ):
+        super().__init__(version, base_version)
+        self.dataset = dataset
+        if ingested is None:
+            ingested = pd.DataFrame(columns=DATASET_COLUMNS)
+        if ingested_index is None:
+            ingested, ingested_index = SeriesIndex({}).extend(ingested, 0)
+            ingested = ingested.reset_index(drop=True)
+        self.ingested = ingested
+        self._ingested_index = ingested_index
+        counts = dict(dataset.pair_counts)
+        for pair in ingested_index.pairs():
+            counts[pair] = counts.get(pair, 0) + ingested_index.row_count(*pair)
+        self.series_index = PairCounts(counts)
+
+    @classmethod
+    def load(cls, dataset: Any, journal_rows: pd.DataFrame, version: int) -> "OverlaySnapshot":
+        return cls(dataset, version, journal_rows if not journal_rows.empty else None)
+
+    @property
+    def row_count(self) -> int:
+        return self.dataset.row_count + len(self.ingested)
+
+    def get_series_rows(self, product_id: str, store_id: str) -> pd.DataFrame:
+        rows = self.dataset.get_series_rows(product_id, store_id)
+        if self.ingested.empty:
+            return rows
+        extra = self._ingested_index.get_appended_rows(self.ingested, product_id, store_id)
+        if extra.empty:
+            return rows
+        if rows.empty:
+            return extra.reset_index(drop=True)
+        return _concat_rows(rows.reset_index(drop=True), extra)
+
+    def append(self, rows: pd.DataFrame, version: int) -> "OverlaySnapshot":
+        """
+        Nuevo snapshot con las transacciones de `rows` agregadas; como en
+        DatasetSnapshot, solo se ordena el lote y se indexan los pares que toca.
+        """
+        rows, ingested_index = self._ingested_index.extend(rows, len(self.ingested))
+        ingested = rows.reset_index(drop=True) if self.ingested.empty \
+            else pd.concat([self.ingested, rows], ignore_index=True)
+        snapshot = type(self)(self.dataset, version, ingested, self.base_version, ingested_index)
+        snapshot._inherit(self, rows)
+        return snapshot
+
+
+class DatasetCache:
+    """
+    Cache en memoria del dataset, compartido por todo el proceso.
+
+    El archivo se carga una sola vez y se vuelve a cargar solo cuando cambia
+    su mtime o su tamaño. Cada recarga genera un nuevo snapshot con su índice
+    de series reconstruido. El DataFrame devuelto es compartido entre
+    servicios, por lo que debe tratarse como de solo lectura.
+    """
+
+    def __init__(
+            self,
+            loader: Callable[[str], Any] = pd.read_csv,
+            snapshot_class: Callable[..., BaseSnapshot] = DatasetSnapshot
+    ):
+        self._loader = loader
+        self._snapshot_class = snapshot_class
+        self._lock = threading.Lock()
+        self._path: Optional[str] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._snapshot: Optional[DatasetSnapshot] = None
+        self._journal_offset = 0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self.appends = 0
+
+    @staticmethod
+    def _file_signature(path: str) -> Tuple[int, int]:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    @staticmethod
+    def _journal_size(path: str) -> int:
+        try:
+            return os.stat(journal_path(path)).st_size
+        except FileNotFoundError:
+            return 0
+
+    def get_snapshot(self, path: str) -> BaseSnapshot:
+        """
+        Devuelve el snapshot de `path`, recargándolo solo si el archivo cambió.
+
+        Las transacciones ingeridas en el journal del CSV se aplican encima:
+        en una carga completa se lee el journal entero y, mientras el CSV no
+        cambie, solo se leen los bytes agregados desde la última lectura. Si
+        el CSV cambió desde que se empezó el journal, en la carga completa el
+        journal se archiva y no se aplica.
+        """
+        signature = self._file_signature(path)
+        journal_size = self._journal_size(path)
+        with self._lock:
+            if self._snapshot is not None and self._path == path and self._signature == signature:
+                if journal_size == self._journal_offset:
+                    self.hits += 1
+                    return self._snapshot
+                if journal_size > self._journal_offset:
+                    return self._append_journal(path)
+
+            if self._snapshot is None or self._path != path:
+                self.misses += 1
+                log.info("Dataset no cacheado, cargando %s", path)
+            else:
+                self.reloads += 1
+                log.info("El dataset %s cambió en disco, recargando", path)
+
+            source = self._loader(path)
+            with journal_lock(path):
+                archived = rotate_stale_journal(path)
+            if archived is not None:
+                log.info("El CSV cambió desde que se empezó el journal; archivado en %s", archived)
+            rows, self._journal_offset = read_transactions(journal_path(path), 0)
+            if not rows.empty:
+                log.info("Aplicando %s transacciones del journal", len(rows))
+
+            self.version += 1
+            self._snapshot = self._snapshot_class.load(source, rows, self.version)
+            self._path = path
+            self._signature = signature
+            log.info("Índice de series construido con %s pares", len(self._snapshot.series_index))
+            return self._snapshot
+
+    def _append_journal(self, path: str) -> BaseSnapshot:
+        """Aplica al snapshot actual las transacciones nuevas del journal."""
+        rows, self._journal_offset = read_transactions(journal_path(path), self._journal_offset)
+        if rows.empty:
+            self.hits += 1
+            return self._snapshot
+
+        self.appends += 1
+        self.version += 1
+        self._snapshot = self._snapshot.append(rows, self.version)
+        log.info("Agregadas %s transacciones del journal (versión %s)", len(rows), self.version)
+        return self._snapshot
+
+    def get(self, path: str) -> pd.DataFrame:
+        """Devuelve el dataset de `path`, recargándolo solo si el archivo cambió."""
+        return self.get_snapshot(path).data
+
+    def clear(self) -> None:
+        """Descarta el dataset cacheado; la siguiente lectura vuelve a cargarlo."""
+        with self._lock:
+            self._snapshot = None
+            self._path = None
+            self._signature = None
+            self._journal_offset = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "appends": self.appends,
+                "version": self.version,
+                "rows": 0 if self._snapshot is None else self._snapshot.row_count,
+                "series": 0 if self._snapshot is None else len(self._snapshot.series_index),
+            }
+
+
+# Instancia única por proceso, compartida por todos los repositorios
+dataset_cache = DatasetCache(loader=load_typed_dataset)
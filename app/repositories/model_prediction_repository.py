@@ -1,51 +1,181 @@
 import os
+import threading
 
 import joblib
 import pandas as pd
-from typing import Any
+from typing import Any, Dict, List, Optional, Tuple
 import gdown
 
+from cache.lru_cache import LRUCache
+from metrics.registry import stage_duration
+from models.compact_arima_model import CompactArimaModel
 from settings.logger import setup_logger
 from interfaces.repository_interface import ModelRepository
+from repositories.dataset_cache import BaseSnapshot, DatasetCache, dataset_cache
+from repositories.partitioned_dataset import PartitionedSnapshot, load_partitioned_dataset
+from repositories.shared_dataset import SharedSnapshot, load_shared_dataset
+from repositories.transaction_journal import append_transactions
 from settings.config import Settings
 
 settings = Settings()
 
 log = setup_logger()
 
+# Dataset particionado por tienda para historiales que no caben en memoria
+partitioned_dataset_cache = DatasetCache(
+    loader=lambda csv_path: load_partitioned_dataset(
+        csv_path,
+        buckets=settings.dataset_partition_buckets,
+        memory_budget=settings.dataset_memory_budget_bytes
+    ),
+    snapshot_class=PartitionedSnapshot
+)
+
+# Dataset publicado una vez en archivos mapeados en memoria y compartido por los workers
+shared_dataset_cache = DatasetCache(loader=load_shared_dataset, snapshot_class=SharedSnapshot)
+
+DATASET_CACHES = {
+    "memory": dataset_cache,
+    "partitioned": partitioned_dataset_cache,
+    "shared": shared_dataset_cache,
+}
+
 
 class PredictionRepository(ModelRepository):
     def __init__(self):
         self.model_path = settings.arima_models_bucket_s3
         self.dataset_path = f"{settings.database_connection}/{settings.dataset_file}"
-        log.info(f"Dataset path: {self.dataset_path}")
-        log.info(f"Model path: {self.model_path}")
-        log.info(f"Dataset file: {settings.dataset_file}")
-        log.info(f"Dataset id: {settings.dataset_id}")
-        log.info(f"database conection {settings.database_connection}")
+        # Modelos deserializados; cada entrada guarda la firma (mtime, tamaño)
+        # del .joblib y su tamaño en disco se usa como estimación de memoria
+        self._model_cache = LRUCache(
+            settings.model_cache_max_entries,
+            settings.model_cache_max_bytes,
+            sizeof=lambda entry: entry[0][1]
+        )
+        self.model_cache_stale = 0
+        # Vistas compactas de los SARIMAXResults completos, para el pronóstico vectorizado
+        self._compact_views = LRUCache(
+            settings.model_cache_max_entries,
+            settings.model_cache_max_bytes,
+            sizeof=lambda entry: entry[1].nbytes
+        )
+        self._dataset_cache = DATASET_CACHES.get(settings.dataset_storage, dataset_cache)
+        log.debug("Dataset path: %s", self.dataset_path)
+        log.debug("Model path: %s", self.model_path)
+        log.debug("Dataset file: %s", settings.dataset_file)
+        log.debug("Dataset id: %s", settings.dataset_id)
+        log.debug("database conection %s", settings.database_connection)
+
+    def _model_file(self, product_id: str, store_id: str) -> str:
+        return f"{self.model_path}/-.-{product_id}-_-{store_id}.joblib"
 
     def save_model(self, model: Any, product_id:str, store_id:str) -> None:
-        model_name = f"{self.model_path}/-.-{product_id}-_-{store_id}.joblib"
-        joblib.dump(model, model_name)
+        """
+        Guarda el modelo del par de forma atómica: se escribe en un archivo
+        temporal del mismo directorio y se renombra sobre el definitivo, de
+        modo que otros procesos nunca leen (ni cachean la firma de) un
+        .joblib a medio escribir.
+        """
+        model_name = self._model_file(product_id, store_id)
+        tmp_name = f"{model_name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            joblib.dump(self._to_artifact(model), tmp_name)
+            os.replace(tmp_name, model_name)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            raise
+        self._model_cache.invalidate((product_id, store_id))
         log.info(f"Modelo ARIMA guardado exitosamente en: {model_name}")
 
     def load_model(self, product_id:str, store_id:str) -> Any:
-        log.info("\nCargando el modelo ARIMA...")
-        model_name = f"{self.model_path}/-.-{product_id}-_-{store_id}.joblib"
-        if os.path.exists(model_name):
-            model = joblib.load(model_name)
-            log.info("modelo %s exitosamente cargado", self.model_path)
+        with stage_duration.time(stage="model_load"):
+            return self._load_model(product_id, store_id)
+
+    def model_signature(self, product_id: str, store_id: str) -> Optional[Tuple[int, int]]:
+        """Firma (mtime, tamaño) del .joblib del par; cambia cada vez que se guarda el modelo."""
+        try:
+            stat = os.stat(self._model_file(product_id, store_id))
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_model(self, product_id: str, store_id: str) -> Any:
+        log.debug("Cargando el modelo ARIMA...")
+        model_name = self._model_file(product_id, store_id)
+        signature = self.model_signature(product_id, store_id)
+        if signature is not None:
+            cached = self._model_cache.get((product_id, store_id))
+            if cached is not None:
+                if cached[0] == signature:
+                    return cached[1]
+                # El archivo fue reescrito fuera de este proceso
+                self.model_cache_stale += 1
+
+            model = self._from_artifact(joblib.load(model_name))
+            self._model_cache.put((product_id, store_id), (signature, model))
+            log.debug("modelo %s exitosamente cargado", self.model_path)
             return model
+        self._model_cache.invalidate((product_id, store_id))
         log.info("No se encontro el modelo %s", self.model_path)
         return
 
-    def load_data(self) -> pd.DataFrame:
+    def load_compact_model(self, product_id: str, store_id: str) -> Optional[CompactArimaModel]:
+        """
+        Modelo del par como CompactArimaModel. Los artefactos completos se
+        convierten una vez por modelo cargado; devuelve None si no hay modelo
+        o si usa una variante que la vista compacta no representa.
+        """
+        model = self.load_model(product_id, store_id)
+        if model is None or isinstance(model, CompactArimaModel):
+            return model
+
+        cached = self._compact_views.get((product_id, store_id))
+        if cached is not None and cached[0] is model:
+            return cached[1]
+        try:
+            compact = CompactArimaModel.from_results(model)
+        except (ValueError, AttributeError) as e:
+            log.debug("El modelo %s/%s no admite vista compacta: %s", product_id, store_id, e)
+            return None
+        self._compact_views.put((product_id, store_id), (model, compact))
+        return compact
+
+    def _to_artifact(self, model: Any) -> Any:
+        """Objeto a serializar según `model_artifact_format` ("full" o "compact")."""
+        if isinstance(model, CompactArimaModel):
+            return model.to_artifact()
+        if settings.model_artifact_format != "compact":
+            return model
+        try:
+            return CompactArimaModel.from_results(model).to_artifact()
+        except ValueError as e:
+            log.warning("No se pudo compactar el modelo, se guarda completo: %s", e)
+            return model
+
+    @staticmethod
+    def _from_artifact(artifact: Any) -> Any:
+        # Los .joblib existentes contienen el SARIMAXResults completo
+        if CompactArimaModel.is_artifact(artifact):
+            return CompactArimaModel(artifact)
+        return artifact
+
+    def warm_model_cache(self, pairs: List[Tuple[str, str]]) -> int:
+        """Precarga en el cache los modelos de los pares indicados."""
+        loaded = 0
+        for product_id, store_id in pairs:
+            if self.load_model(product_id, store_id) is not None:
+                loaded += 1
+        log.info("Cache de modelos precalentado con %s de %s modelos", loaded, len(pairs))
+        return loaded
+
+    def get_model_cache_stats(self) -> Dict[str, Any]:
+        return {**self._model_cache.stats(), "stale": self.model_cache_stale}
+
+    def _ensure_dataset(self) -> None:
         # Verificar si el archivo existe
         if os.path.exists(self.dataset_path):
-            log.info("El archivo ya existe. No es necesario volver a descargarlo.\n")
-            log.info("archivo: %s \n", self.dataset_path)
-            return pd.read_csv(self.dataset_path)
-
+            return
 
         log.info("El archivo no existe. Procediendo a descargarlo...")
 
@@ -56,4 +186,31 @@ class PredictionRepository(ModelRepository):
         gdown.download(download_url, output=self.dataset_path, quiet=False)
 
         log.info(f"Archivo descargado en: {self.dataset_path}")
-        return pd.read_csv(self.dataset_path)
\ No newline at end of file
+
+    def load_snapshot(self) -> BaseSnapshot:
+        """Dataset cacheado junto con su índice de series y su versión."""
+        self._ensure_dataset()
+        # El dataset solo se recarga si el CSV cambió su mtime o su tamaño;
+        # las lecturas se sirven desde la copia columnar tipada
+        with stage_duration.time(stage="data_load"):
+            return self._dataset_cache.get_snapshot(self.dataset_path)
+
+    def ingest_transactions(self, transactions: pd.DataFrame) -> BaseSnapshot:
+        """
+        Persiste las transacciones en el journal del dataset y devuelve el
+        snapshot que ya las incluye. Otros procesos las ven en su próxima
+        lectura, al detectar que el journal creció.
+        """
+        self._ensure_dataset()
+        append_transactions(self.dataset_path, transactions)
+        return self._dataset_cache.get_snapshot(self.dataset_path)
+
+    def load_data(self) -> pd.DataFrame:
+        return self.load_snapshot().data
+
+    def load_series(self, product_id: str, store_id: str) -> pd.DataFrame:
+        """Transacciones de un par producto/tienda, sin recorrer el dataset completo."""
+        return self.load_snapshot().get_series_rows(product_id, store_id)
+
+    def get_dataset_cache_stats(self) -> Dict[str, Any]:
+        return {**self._dataset_cache.stats(), "storage": settings.dataset_storage}
@@ -0,0 +1,276 @@
+import os
+import shutil
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+import pyarrow.dataset as ds
+import pyarrow.feather as feather
+import pyarrow.ipc as pa_ipc
+
+from cache.lru_cache import LRUCache
+from repositories.columnar_dataset import DATASET_COLUMNS, downcast_quantity
+from repositories.dataset_cache import OverlaySnapshot, _concat_rows
+from repositories.sales_cube import CUBE_MEASURES, SalesCube
+from repositories.series_index import SERIES_SORT_COLUMNS, SeriesIndex
+from settings.logger import setup_logger
+
+log = setup_logger()
+
+PARTITION_SCHEMA = pa.schema([
+    ('Date', pa.timestamp('ns')),
+    ('ProductID', pa.string()),
+    ('StoreID', pa.string()),
+    ('Quantity', pa.float64()),
+    ('Price', pa.float64()),
+])
+BUCKET_COLUMN = 'ProductBucket'
+PAIRS_FILE = '_pairs.feather'
+SUCCESS_FILE = '_SUCCESS'
+
+
+def partitioned_path(csv_path: str) -> str:
+    """Directorio con la copia del CSV particionada por tienda."""
+    return f"{os.path.splitext(csv_path)[0]}.partitions"
+
+
+def product_bucket(product_ids: np.ndarray, buckets: int) -> np.ndarray:
+    """Bucket estable (independiente del proceso) de cada ProductID."""
+    hashes = pd.util.hash_array(np.asarray(product_ids, dtype=object))
+    return (hashes % np.uint64(max(buckets, 1))).astype(np.int32)
+
+
+def _partitioning(buckets: int) -> ds.Partitioning:
+    fields = [('StoreID', pa.string())]
+    if buckets > 0:
+        fields.append((BUCKET_COLUMN, pa.int32()))
+    return ds.partitioning(pa.schema(fields), flavor='hive')
+
+
+def is_partitioned_stale(csv_path: str, target_dir: str, buckets: int) -> bool:
+    marker = os.path.join(target_dir, SUCCESS_FILE)
+    if not os.path.exists(marker):
+        return True
+    with open(marker) as success:
+        written_buckets = int(success.read().strip() or 0)
+    return written_buckets != buckets or os.stat(marker).st_mtime_ns < os.stat(csv_path).st_mtime_ns
+
+
+def write_partitions(csv_path: str, target_dir: str, buckets: int = 0, block_size: int = 16 * 1024 * 1024) -> None:
+    """
+    Recorre el CSV una sola vez en bloques de `block_size` bytes y lo escribe
+    en archivos Arrow particionados por StoreID (y por bucket de ProductID si
+    `buckets` > 0). La memoria usada depende del tamaño de bloque, no del
+    tamaño del CSV. Además guarda el número de filas y el rango de fechas de
+    cada par, que sirve de índice global sin abrir las particiones.
+    """
+    log.info("Particionando %s en %s", csv_path, target_dir)
+    tmp_dir = f"{target_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    reader = pa_csv.open_csv(
+        csv_path,
+        read_options=pa_csv.ReadOptions(block_size=block_size),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=DATASET_COLUMNS,
+            column_types={name: PARTITION_SCHEMA.field(name).type for name in DATASET_COLUMNS},
+        ),
+    )
+    write_schema = PARTITION_SCHEMA.append(pa.field(BUCKET_COLUMN, pa.int32())) if buckets > 0 else PARTITION_SCHEMA
+    pair_stats: List[pd.DataFrame] = []
+
+    def batches() -> Iterator[pa.RecordBatch]:
+        for batch in reader:
+            batch = pa.RecordBatch.from_arrays(
+                [batch.column(name) for name in DATASET_COLUMNS], schema=PARTITION_SCHEMA
+            )
+            frame = batch.select(['ProductID', 'StoreID', 'Date']).to_pandas()
+            pair_stats.append(frame.groupby(['ProductID', 'StoreID']).agg(
+                Rows=('Date', 'size'), FirstDate=('Date', 'min'), LastDate=('Date', 'max')
+            ))
+            if buckets > 0:
+                bucket = product_bucket(frame['ProductID'].to_numpy(), buckets)
+                batch = pa.RecordBatch.from_arrays(
+                    batch.columns + [pa.array(bucket, pa.int32())], schema=write_schema
+                )
+            yield batch
+
+    ds.write_dataset(
+        batches(),
+        tmp_dir,
+        schema=write_schema,
+        format='ipc',
+        partitioning=_partitioning(buckets),
+        file_options=ds.IpcFileFormat().make_write_options(compression=None),
+        max_partitions=1_000_000,
+        existing_data_behavior='error',
+    )
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    pairs = pd.concat(pair_stats).groupby(level=['ProductID', 'StoreID']).agg(
+        Rows=('Rows', 'sum'), FirstDate=('FirstDate', 'min'), LastDate=('LastDate', 'max')
+    ).reset_index() if pair_stats else pd.DataFrame(columns=['ProductID', 'StoreID', 'Rows', 'FirstDate', 'LastDate'])
+    feather.write_feather(pairs, os.path.join(tmp_dir, PAIRS_FILE), compression='uncompressed')
+    with open(os.path.join(tmp_dir, SUCCESS_FILE), 'w') as success:
+        success.write(str(buckets))
+
+    shutil.rmtree(target_dir, ignore_errors=True)
+    os.replace(tmp_dir, target_dir)
+
+
+class PartitionedDataset:
+    """
+    Dataset particionado en disco con las particiones leídas bajo demanda.
+
+    Las particiones cargadas se guardan, ya tipadas y con su índice de
+    series, en un LRU limitado por `memory_budget` bytes, de modo que la
+    memoria usada no depende del tamaño total del dataset.
+    """
+
+    def __init__(self, path: str, buckets: int = 0, memory_budget: int = 1024 * 1024 * 1024):
+        self.path = path
+        self.buckets = buckets
+        # Los archivos se leen directamente: el escáner de pyarrow paga un costo
+        # por cada lote pequeño que dejó la escritura en streaming
+        self._files: Dict[Tuple[str, Optional[int]], List[str]] = {}
+        dataset = ds.dataset(path, format='ipc', partitioning=_partitioning(buckets))
+        for fragment in dataset.get_fragments():
+            keys = ds.get_partition_keys(fragment.partition_expression)
+            key = (str(keys['StoreID']), int(keys[BUCKET_COLUMN]) if buckets > 0 else None)
+            self._files.setdefault(key, []).append(fragment.path)
+        self._partitions = LRUCache(
+            max_entries=1_000_000, max_bytes=memory_budget, sizeof=lambda entry: entry[2]
+        )
+        pairs = feather.read_feather(os.path.join(path, PAIRS_FILE))
+        self.pair_counts = {
+            (str(product_id), str(store_id)): int(rows)
+            for product_id, store_id, rows in zip(pairs['ProductID'], pairs['StoreID'], pairs['Rows'])
+        }
+        self.row_count = int(pairs['Rows'].sum())
+        self.first_day = pd.Timestamp(pairs['FirstDate'].min()).normalize() if len(pairs) else None
+        self.last_day = pd.Timestamp(pairs['LastDate'].max()).normalize() if len(pairs) else None
+
+    def _read_files(self, key: Tuple[str, Optional[int]]) -> pd.DataFrame:
+        tables = [pa_ipc.open_file(file_path).read_all() for file_path in self._files.get(key, [])]
+        if not tables:
+            return pd.DataFrame(columns=DATASET_COLUMNS)
+        table = pa.concat_tables(tables).combine_chunks()
+        table = table.append_column('StoreID', pa.array([key[0]] * table.num_rows, pa.string()))
+        return table.select(DATASET_COLUMNS).to_pandas()
+
+    def read_partition(self, store_id: str, bucket: Optional[int]) -> pd.DataFrame:
+        df = self._read_files((store_id, bucket))
+        df['ProductID'] = df['ProductID'].astype('category')
+        df['StoreID'] = df['StoreID'].astype('category')
+        df['Quantity'] = downcast_quantity(df['Quantity'])
+        # La escritura en paralelo no conserva el orden de las filas
+        return df.sort_values(SERIES_SORT_COLUMNS, ignore_index=True)
+
+    def load_partition(self, store_id: str, bucket: Optional[int]) -> Tuple[pd.DataFrame, SeriesIndex]:
+        """Filas de una partición con su índice de series, desde el LRU si ya se leyó."""
+        key = (store_id, bucket)
+        cached = self._partitions.get(key)
+        if cached is not None:
+            return cached[0], cached[1]
+
+        data, series_index = SeriesIndex.build(self.read_partition(store_id, bucket))
+        nbytes = int(data.memory_usage(index=True, deep=True).sum())
+        if nbytes > self._partitions.max_bytes:
+            log.warning("La partición %s ocupa %s bytes, más que el presupuesto de memoria", key, nbytes)
+        self._partitions.put(key, (data, series_index, nbytes))
+        return data, series_index
+
+    def iter_frames(self) -> Iterator[pd.DataFrame]:
+        """
+        Recorre el dataset completo partición a partición sin pasar por el LRU,
+        para no desplazar las particiones que usan las predicciones.
+        """
+        for key in sorted(self._files):
+            yield self._read_files(key)
+
+    def bucket_of(self, product_id: str) -> Optional[int]:
+        if self.buckets <= 0:
+            return None
+        return int(product_bucket(np.array([product_id], dtype=object), self.buckets)[0])
+
+    def get_series_rows(self, product_id: str, store_id: str) -> pd.DataFrame:
+        if (product_id, store_id) not in self.pair_counts:
+            return pd.DataFrame(columns=DATASET_COLUMNS)
+        data, series_index = self.load_partition(store_id, self.bucket_of(product_id))
+        return series_index.get_rows(data, product_id, store_id)
+
+    def cache_stats(self) -> Dict[str, int]:
+        return self._partitions.stats()
+
+
+def load_partitioned_dataset(
+        csv_path: str,
+        buckets: int = 0,
+        memory_budget: int = 1024 * 1024 * 1024
+) -> PartitionedDataset:
+    """
+    Abre la copia particionada del CSV, creándola la primera vez o cuando el
+    CSV es más reciente. El tamaño de bloque de lectura se deriva del
+    presupuesto de memoria.
+    """
+    target_dir = partitioned_path(csv_path)
+    if is_partitioned_stale(csv_path, target_dir, buckets):
+        block_size = int(min(max(memory_budget // 16, 1024 * 1024), 64 * 1024 * 1024))
+        write_partitions(csv_path, target_dir, buckets, block_size)
+    return PartitionedDataset(target_dir, buckets, memory_budget)
+
+
+class PartitionedSnapshot(OverlaySnapshot):
+    """
+    Snapshot sobre el dataset particionado. Las transacciones del journal se
+    mantienen en memoria aparte y se combinan con las filas de la partición
+    al consultar un par.
+    """
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """
+        Dataset completo, reunido leyendo una partición a la vez. Ocupa en
+        memoria el dataset entero, sin respetar `memory_budget`, y no se
+        cachea: es para herramientas y diagnósticos. Los servicios consultan
+        por par (`get_series_rows`) o por partición (`dataset.iter_frames`).
+        """
+        frames = list(self.dataset.iter_frames())
+        data = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=DATASET_COLUMNS)
+        if self.ingested.empty:
+            return data
+        return _concat_rows(data, self.ingested)
+
+    def _build_sales_cube(self) -> SalesCube:
+        """
+        Construye el cubo recorriendo una partición a la vez: de cada una solo
+        se conservan sus celdas diarias agregadas.
+        """
+        if self.dataset.first_day is None:
+            cube = SalesCube.build(pd.DataFrame(columns=DATASET_COLUMNS))
+            return cube.extend(self.ingested)
+
+        products = pd.Index(sorted({product_id for product_id, _ in self.dataset.pair_counts}))
+        stores = pd.Index(sorted({store_id for _, store_id in self.dataset.pair_counts}))
+        first_day = self.dataset.first_day
+        n_days = int((self.dataset.last_day - first_day) // pd.Timedelta(days=1)) + 1
+
+        keys, measures = [], []
+        for data in self.dataset.iter_frames():
+            series = (products.get_indexer(data['ProductID']).astype(np.int64) * len(stores)
+                      + stores.get_indexer(data['StoreID']))
+            cell_keys, cells = np.unique(series * n_days + SalesCube._days(data['Date'], first_day),
+                                         return_inverse=True)
+            row_measures = SalesCube._row_measures(data)
+            keys.append(cell_keys)
+            measures.append(np.column_stack([
+                np.bincount(cells, weights=row_measures[:, column], minlength=len(cell_keys))
+                for column in range(len(CUBE_MEASURES))
+            ]))
+
+        cube = SalesCube._from_cells(
+            products, stores, first_day, n_days, np.concatenate(keys), np.vstack(measures)
+        )
+        return cube.extend(self.ingested)
@@ -0,0 +1,213 @@
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from repositories.series_index import _column_codes
+
+# Medidas acumuladas por (producto, tienda, día)
+CUBE_MEASURES = ('quantity', 'price_sum', 'price_count', 'rows')
+
+
+class SalesCube:
+    """
+    Agregado diario de ventas por (producto, tienda) con sumas acumuladas.
+
+    Cada celda no vacía (par, día) guarda la cantidad vendida, la suma y el
+    número de precios y el número de transacciones. Las celdas están
+    ordenadas por par y día, y sobre ellas se guardan las sumas acumuladas,
+    de modo que el total de un par en un rango de fechas es la diferencia de
+    dos posiciones encontradas por búsqueda binaria. Una consulta cuesta
+    O(pares · log celdas), independiente del número de transacciones.
+    """
+
+    def __init__(
+            self,
+            products: pd.Index,
+            stores: pd.Index,
+            first_day: pd.Timestamp,
+            n_days: int,
+            cell_keys: np.ndarray,
+            series_keys: np.ndarray,
+            cumulative: np.ndarray
+    ):
+        self.products = products
+        self.stores = stores
+        self.first_day = first_day
+        self.n_days = n_days
+        self.cell_keys = cell_keys
+        self.series_keys = series_keys
+        # Fila 0 en ceros para que cumulative[hi] - cumulative[lo] sea la suma del rango
+        self.cumulative = cumulative
+
+    @staticmethod
+    def _row_measures(df: pd.DataFrame) -> np.ndarray:
+        quantity = df['Quantity'].to_numpy(dtype=float, na_value=np.nan)
+        price = df['Price'].to_numpy(dtype=float, na_value=np.nan)
+        has_price = ~np.isnan(price)
+        return np.column_stack([
+            np.nan_to_num(quantity),
+            np.where(has_price, price, 0.0),
+            has_price.astype(float),
+            np.ones(len(df)),
+        ])
+
+    @staticmethod
+    def _days(dates: pd.Series, first_day: pd.Timestamp) -> np.ndarray:
+        dates = pd.DatetimeIndex(dates).normalize()
+        return ((dates - first_day) // pd.Timedelta(days=1)).to_numpy(dtype=np.int64)
+
+    @classmethod
+    def _from_cells(
+            cls,
+            products: pd.Index,
+            stores: pd.Index,
+            first_day: pd.Timestamp,
+            n_days: int,
+            keys: np.ndarray,
+            measures: np.ndarray
+    ) -> "SalesCube":
+        """Agrupa las medidas por celda y acumula las sumas a lo largo de las celdas ordenadas."""
+        cell_keys, cells = np.unique(keys, return_inverse=True)
+        aggregated = np.column_stack([
+            np.bincount(cells, weights=measures[:, column], minlength=len(cell_keys))
+            for column in range(len(CUBE_MEASURES))
+        ])
+        cumulative = np.vstack([np.zeros((1, len(CUBE_MEASURES))), np.cumsum(aggregated, axis=0)])
+        return cls(products, stores, first_day, n_days, cell_keys, np.unique(cell_keys // n_days), cumulative)
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> "SalesCube":
+        if df.empty:
+            return cls(pd.Index([]), pd.Index([]), pd.Timestamp(0), 1, np.empty(0, dtype=np.int64),
+                       np.empty(0, dtype=np.int64), np.zeros((1, len(CUBE_MEASURES))))
+
+        product_codes, products = _column_codes(df['ProductID'])
+        store_codes, stores = _column_codes(df['StoreID'])
+        first_day = pd.DatetimeIndex(df['Date']).min().normalize()
+        days = cls._days(df['Date'], first_day)
+        n_days = int(days.max()) + 1
+
+        series = product_codes.astype(np.int64) * len(stores) + store_codes
+        return cls._from_cells(products, stores, first_day, n_days, series * n_days + days, cls._row_measures(df))
+
+    def extend(self, rows: pd.DataFrame) -> "SalesCube":
+        """
+        Nuevo cubo con las transacciones de `rows` agregadas, sin volver a
+        recorrer las transacciones ya acumuladas: las celdas existentes se
+        recodifican (pueden aparecer productos, tiendas o días nuevos) y se
+        combinan con las celdas del lote.
+        """
+        if rows.empty:
+            return self
+        if len(self.cell_keys) == 0:
+            return SalesCube.build(rows)
+
+        row_products = pd.Index(rows['ProductID'].astype(str))
+        row_stores = pd.Index(rows['StoreID'].astype(str))
+        products = self.products.astype(str).union(row_products.unique())
+        stores = self.stores.astype(str).union(row_stores.unique())
+        first_day = min(self.first_day, pd.DatetimeIndex(rows['Date']).min().normalize())
+        row_days = self._days(rows['Date'], first_day)
+        day_shift = int((self.first_day - first_day) // pd.Timedelta(days=1))
+        n_days = max(self.n_days + day_shift, int(row_days.max()) + 1)
+
+        # Recodificar las celdas existentes con los nuevos índices; como los
+        # índices nuevos son uniones ordenadas, las claves siguen ordenadas
+        old_series, old_days = np.divmod(self.cell_keys, self.n_days)
+        old_products = products.get_indexer(self.products.astype(str))[old_series // len(self.stores)]
+        old_stores = stores.get_indexer(self.stores.astype(str))[old_series % len(self.stores)]
+        cell_keys = (old_products.astype(np.int64) * len(stores) + old_stores) * n_days + old_days + day_shift
+        measures = np.diff(self.cumulative, axis=0)
+
+        # Agregar el lote por celda y combinarlo con las celdas existentes
+        row_series = products.get_indexer(row_products).astype(np.int64) * len(stores) + stores.get_indexer(row_stores)
+        row_cells, row_inverse = np.unique(row_series * n_days + row_days, return_inverse=True)
+        row_measures = self._row_measures(rows)
+        row_measures = np.column_stack([
+            np.bincount(row_inverse, weights=row_measures[:, column], minlength=len(row_cells))
+            for column in range(len(CUBE_MEASURES))
+        ])
+
+        positions = np.searchsorted(cell_keys, row_cells)
+        existing = positions < len(cell_keys)
+        existing[existing] = cell_keys[positions[existing]] == row_cells[existing]
+        np.add.at(measures, positions[existing], row_measures[existing])
+        cell_keys = np.insert(cell_keys, positions[~existing], row_cells[~existing])
+        measures = np.insert(measures, positions[~existing], row_measures[~existing], axis=0)
+
+        cumulative = np.vstack([np.zeros((1, len(CUBE_MEASURES))), np.cumsum(measures, axis=0)])
+        return SalesCube(products, stores, first_day, n_days, cell_keys, np.unique(cell_keys // n_days), cumulative)
+
+    def __len__(self) -> int:
+        return len(self.cell_keys)
+
+    def _day(self, date: pd.Timestamp) -> int:
+        return int((pd.Timestamp(date).normalize() - self.first_day) // pd.Timedelta(days=1))
+
+    def series_totals(
+            self,
+            start_date: str,
+            end_date: str,
+            store_id: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Totales por par en [start_date, end_date], opcionalmente para una
+        sola tienda. Devuelve los códigos de producto y de tienda de cada par y
+        una matriz con una columna por medida de CUBE_MEASURES.
+        """
+        series_keys = self.series_keys
+        start_day = max(self._day(start_date), 0)
+        end_day = min(self._day(end_date), self.n_days - 1)
+        if start_day > end_day:
+            series_keys = series_keys[:0]
+        elif store_id:
+            store_code = self.stores.get_loc(store_id) if store_id in self.stores else -1
+            series_keys = series_keys[series_keys % len(self.stores) == store_code]
+
+        lo = np.searchsorted(self.cell_keys, series_keys * self.n_days + start_day, side='left')
+        hi = np.searchsorted(self.cell_keys, series_keys * self.n_days + end_day, side='right')
+        sums = self.cumulative[hi] - self.cumulative[lo]
+        n_stores = max(len(self.stores), 1)
+        return series_keys // n_stores, series_keys % n_stores, sums
+
+    def product_totals(
+            self,
+            start_date: str,
+            end_date: str,
+            store_id: Optional[str] = None
+    ) -> Tuple[pd.Index, np.ndarray]:
+        """
+        Totales por producto en [start_date, end_date], opcionalmente para
+        una sola tienda. Devuelve los productos y una matriz con una columna
+        por medida de CUBE_MEASURES.
+        """
+        product_codes, _, sums = self.series_totals(start_date, end_date, store_id)
+        totals = np.zeros((len(self.products), len(CUBE_MEASURES)))
+        for column in range(len(CUBE_MEASURES)):
+            totals[:, column] = np.bincount(product_codes, weights=sums[:, column], minlength=len(self.products))
+        return self.products, totals
+
+    def recent_history(self, window: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Cantidad diaria de los últimos `window` días de cada par, terminando
+        en el último día con transacciones del par (el mismo que cierra su
+        serie preparada). Devuelve las claves de los pares, ese último día y
+        una matriz (pares, window) con la cantidad de cada día: 0 en los días
+        sin ventas y NaN en los anteriores a la primera transacción del par.
+        """
+        series_keys = self.series_keys
+        lo = np.searchsorted(self.cell_keys, series_keys * self.n_days, side='left')
+        hi = np.searchsorted(self.cell_keys, (series_keys + 1) * self.n_days, side='left')
+        first_days = self.cell_keys[lo] - series_keys * self.n_days
+        last_days = self.cell_keys[hi - 1] - series_keys * self.n_days
+
+        days = last_days[:, None] - np.arange(window)[::-1]
+        keys = series_keys[:, None] * self.n_days + days
+        quantity = CUBE_MEASURES.index('quantity')
+        totals = (self.cumulative[np.searchsorted(self.cell_keys, keys, side='right'), quantity]
+                  - self.cumulative[np.searchsorted(self.cell_keys, keys, side='left'), quantity])
+        return series_keys, last_days, np.where(days >= first_days[:, None], totals, np.nan)
+
+    def nbytes(self) -> int:
+        return self.cell_keys.nbytes + self.series_keys.nbytes + self.cumulative.nbytes
@@ -0,0 +1,105 @@
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+SERIES_SORT_COLUMNS = ['ProductID', 'StoreID', 'Date']
+
+
+def _column_codes(column: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """Códigos enteros ordenados de una columna de IDs (categórica o no)."""
+    if isinstance(column.dtype, pd.CategoricalDtype) and column.cat.categories.is_monotonic_increasing:
+        return column.cat.codes.to_numpy(), column.cat.categories
+    codes, uniques = pd.factorize(column, sort=True)
+    return codes, pd.Index(uniques)
+
+
+class SeriesIndex:
+    """
+    Índice de rangos de filas por par (ProductID, StoreID).
+
+    Se construye sobre un DataFrame ordenado por producto y tienda, de modo
+    que las filas de cada par son contiguas y una consulta cuesta
+    O(filas del par) en lugar de recorrer el dataset completo.
+
+    Las filas ingeridas después de construirlo viven en un DataFrame aparte
+    (`appended`), agrupadas por par dentro de cada lote; cada par guarda los
+    rangos de sus filas en ese DataFrame, de modo que agregar un lote solo
+    ordena las filas nuevas y toca los pares del lote.
+    """
+
+    def __init__(
+            self,
+            ranges: Dict[Tuple[str, str], Tuple[int, int]],
+            appended: Optional[Dict[Tuple[str, str], Tuple[Tuple[int, int], ...]]] = None
+    ):
+        self._ranges = ranges
+        self._appended = appended or {}
+        self._new_pairs = [pair for pair in self._appended if pair not in self._ranges]
+
+    @classmethod
+    def build(cls, df: pd.DataFrame) -> Tuple[pd.DataFrame, "SeriesIndex"]:
+        """Devuelve el DataFrame ordenado por par y el índice construido sobre él."""
+        if df.empty:
+            return df, cls({})
+
+        product_codes, products = _column_codes(df['ProductID'])
+        store_codes, stores = _column_codes(df['StoreID'])
+        pair_keys = product_codes.astype(np.int64) * len(stores) + store_codes
+
+        if np.any(np.diff(pair_keys) < 0):
+            order = np.argsort(pair_keys, kind='stable')
+            df = df.iloc[order].reset_index(drop=True)
+            pair_keys = pair_keys[order]
+
+        starts = np.flatnonzero(np.r_[True, pair_keys[1:] != pair_keys[:-1]])
+        stops = np.r_[starts[1:], len(pair_keys)]
+        first_keys = pair_keys[starts]
+
+        pair_labels = zip(
+            products[first_keys // len(stores)].astype(str).tolist(),
+            stores[first_keys % len(stores)].astype(str).tolist()
+        )
+        ranges = dict(zip(pair_labels, zip(starts.tolist(), stops.tolist())))
+        return df, cls(ranges)
+
+    def extend(self, rows: pd.DataFrame, offset: int) -> Tuple[pd.DataFrame, "SeriesIndex"]:
+        """
+        Índice con el lote `rows` agregado al final del DataFrame de filas
+        ingeridas, que hasta ahora tiene `offset` filas. Devuelve el lote
+        ordenado por par, tal como debe agregarse, y el índice nuevo; el
+        costo es proporcional al lote y no al dataset.
+        """
+        rows, batch_index = SeriesIndex.build(rows)
+        appended = dict(self._appended)
+        for pair, (start, stop) in batch_index._ranges.items():
+            appended[pair] = appended.get(pair, ()) + ((offset + start, offset + stop),)
+        return rows, SeriesIndex(self._ranges, appended)
+
+    def __len__(self) -> int:
+        return len(self._ranges) + len(self._new_pairs)
+
+    def __contains__(self, pair: Tuple[str, str]) -> bool:
+        return pair in self._ranges or pair in self._appended
+
+    def pairs(self) -> Iterator[Tuple[str, str]]:
+        yield from self._ranges
+        yield from self._new_pairs
+
+    def row_count(self, product_id: str, store_id: str) -> int:
+        start, stop = self._ranges.get((product_id, store_id), (0, 0))
+        return stop - start + sum(stop - start for start, stop in self._appended.get((product_id, store_id), ()))
+
+    def get_rows(self, df: pd.DataFrame, product_id: str, store_id: str) -> pd.DataFrame:
+        """Filas del par en `df`; vacío si el par no existe."""
+        start, stop = self._ranges.get((product_id, store_id), (0, 0))
+        return df.iloc[start:stop]
+
+    def get_appended_rows(self, appended: pd.DataFrame, product_id: str, store_id: str) -> pd.DataFrame:
+        """Filas ingeridas del par en `appended`, en el orden en que se agregaron."""
+        segments = self._appended.get((product_id, store_id), ())
+        if len(segments) == 1:
+            start, stop = segments[0]
+            return appended.iloc[start:stop]
+        return appended.iloc[np.concatenate([np.arange(start, stop) for start, stop in segments])
+                             if segments else []]
@@ -0,0 +1,251 @@
+import fcntl
+import json
+import os
+import shutil
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from repositories.columnar_dataset import read_typed_csv
+from repositories.dataset_cache import OverlaySnapshot, _concat_rows
+from repositories.sales_cube import SalesCube
+from repositories.series_index import SeriesIndex, _column_codes
+from settings.logger import setup_logger
+
+log = setup_logger()
+
+# Columnas del dataset y arreglos de los índices, un .npy por arreglo
+SHARED_ARRAYS = (
+    'date', 'product_codes', 'store_codes', 'quantity', 'price',
+    'pair_keys', 'pair_starts', 'cell_keys', 'series_keys', 'cumulative',
+)
+CURRENT_FILE = 'CURRENT'
+LOCK_FILE = '.lock'
+MANIFEST_FILE = 'manifest.json'
+
+
+def shared_path(csv_path: str) -> str:
+    """Directorio con las versiones publicadas del dataset compartido."""
+    return f"{os.path.splitext(csv_path)[0]}.shared"
+
+
+def _source_signature(csv_path: str) -> Tuple[int, int]:
+    stat = os.stat(csv_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+@contextmanager
+def _publish_lock(target_dir: str) -> Iterator[None]:
+    """Lock exclusivo entre procesos para que un solo worker publique cada versión."""
+    fd = os.open(os.path.join(target_dir, LOCK_FILE), os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def read_manifest(version_dir: str) -> Dict:
+    with open(os.path.join(version_dir, MANIFEST_FILE)) as manifest:
+        return json.load(manifest)
+
+
+def current_version_dir(target_dir: str) -> Optional[str]:
+    """Versión apuntada por CURRENT, o None si todavía no se publicó ninguna."""
+    try:
+        with open(os.path.join(target_dir, CURRENT_FILE)) as current:
+            name = current.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(target_dir, name) if name else None
+
+
+def _fresh_version_dir(csv_path: str, target_dir: str) -> Optional[str]:
+    """Versión actual si fue publicada a partir del CSV tal como está en disco."""
+    version_dir = current_version_dir(target_dir)
+    if version_dir is None or not os.path.exists(os.path.join(version_dir, MANIFEST_FILE)):
+        return None
+    if tuple(read_manifest(version_dir)['source_signature']) != _source_signature(csv_path):
+        return None
+    return version_dir
+
+
+def publish_shared_dataset(csv_path: str, target_dir: str) -> str:
+    """
+    Publica una nueva versión del dataset en `target_dir` y la deja como
+    actual.
+
+    Las filas se ordenan por par y fecha y se guardan, junto con los rangos
+    de cada par y el cubo de ventas, como arreglos .npy sin comprimir que los
+    workers mapean en memoria. La versión se escribe en un directorio
+    temporal que se renombra al terminar, y recién entonces se reemplaza
+    CURRENT: los workers nunca ven una versión a medio escribir. Se conservan
+    la versión nueva y la anterior; los workers que siguen mapeando una
+    versión borrada la leen sin problemas hasta soltarla.
+    """
+    signature = _source_signature(csv_path)
+    previous_dir = current_version_dir(target_dir)
+    version = read_manifest(previous_dir)['version'] + 1 if previous_dir and os.path.exists(previous_dir) else 1
+    name = f"v{version:06d}"
+    log.info("Publicando la versión %s del dataset compartido en %s", version, target_dir)
+
+    data = read_typed_csv(csv_path)
+    product_codes, products = _column_codes(data['ProductID'])
+    store_codes, stores = _column_codes(data['StoreID'])
+    row_pairs = product_codes.astype(np.int64) * len(stores) + store_codes
+    # Mismo orden que la copia Feather: por par y, dentro del par, por fecha
+    order = np.lexsort((data['Date'].to_numpy(), row_pairs))
+    data = data.iloc[order].reset_index(drop=True)
+    product_codes, store_codes, row_pairs = product_codes[order], store_codes[order], row_pairs[order]
+    cube = SalesCube.build(data)
+
+    starts = np.flatnonzero(np.r_[True, row_pairs[1:] != row_pairs[:-1]]) if len(data) else np.empty(0, np.int64)
+    # Códigos con el tipo entero que usa pandas para estas categorías, para
+    # que al adjuntar el Categorical se construya sin copiar
+    arrays = {
+        'date': data['Date'].to_numpy(),
+        'product_codes': pd.Categorical.from_codes(product_codes, categories=products).codes,
+        'store_codes': pd.Categorical.from_codes(store_codes, categories=stores).codes,
+        'quantity': data['Quantity'].to_numpy(),
+        'price': data['Price'].to_numpy(),
+        'pair_keys': row_pairs[starts],
+        'pair_starts': np.r_[starts, len(data)].astype(np.int64),
+        'cell_keys': cube.cell_keys,
+        'series_keys': cube.series_keys,
+        'cumulative': cube.cumulative,
+    }
+
+    tmp_dir = os.path.join(target_dir, f"{name}.{os.getpid()}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    for array_name, array in arrays.items():
+        np.save(os.path.join(tmp_dir, f"{array_name}.npy"), np.ascontiguousarray(array))
+    np.save(os.path.join(tmp_dir, 'products.npy'), np.asarray(products.astype(str), dtype=str))
+    np.save(os.path.join(tmp_dir, 'stores.npy'), np.asarray(stores.astype(str), dtype=str))
+    np.save(os.path.join(tmp_dir, 'cube_products.npy'), np.asarray(cube.products.astype(str), dtype=str))
+    np.save(os.path.join(tmp_dir, 'cube_stores.npy'), np.asarray(cube.stores.astype(str), dtype=str))
+    with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as manifest:
+        json.dump({
+            'version': version,
+            'source_signature': list(signature),
+            'rows': len(data),
+            'pairs': len(starts),
+            'first_day': cube.first_day.isoformat(),
+            'n_days': cube.n_days,
+        }, manifest)
+    os.replace(tmp_dir, os.path.join(target_dir, name))
+
+    tmp_current = os.path.join(target_dir, f"{CURRENT_FILE}.{os.getpid()}.tmp")
+    with open(tmp_current, 'w') as current:
+        current.write(name)
+    os.replace(tmp_current, os.path.join(target_dir, CURRENT_FILE))
+
+    keep = {name, os.path.basename(previous_dir) if previous_dir else None}
+    for entry in os.listdir(target_dir):
+        if entry.startswith('v') and entry not in keep:
+            shutil.rmtree(os.path.join(target_dir, entry), ignore_errors=True)
+    return os.path.join(target_dir, name)
+
+
+class SharedDataset:
+    """
+    Versión publicada del dataset, mapeada en memoria en modo solo lectura.
+
+    Las columnas del DataFrame y los arreglos del cubo de ventas apuntan
+    directamente a las páginas del archivo: todos los workers que adjuntan
+    la misma versión comparten esas páginas a través del page cache del
+    sistema operativo, de modo que la memoria privada de cada worker se
+    limita a los diccionarios de pares.
+    """
+
+    def __init__(self, version_dir: str):
+        self.path = version_dir
+        manifest = read_manifest(version_dir)
+        self.version = manifest['version']
+        # np.asarray quita la subclase memmap sin copiar: las vistas siguen sobre el archivo
+        arrays = {
+            name: np.asarray(np.load(os.path.join(version_dir, f"{name}.npy"), mmap_mode='r'))
+            for name in SHARED_ARRAYS
+        }
+        products = pd.Index(np.load(os.path.join(version_dir, 'products.npy')).tolist())
+        stores = pd.Index(np.load(os.path.join(version_dir, 'stores.npy')).tolist())
+
+        self.frame = pd.DataFrame({
+            'Date': arrays['date'],
+            'ProductID': pd.Categorical.from_codes(arrays['product_codes'], categories=products, validate=False),
+            'StoreID': pd.Categorical.from_codes(arrays['store_codes'], categories=stores, validate=False),
+            'Quantity': arrays['quantity'],
+            'Price': arrays['price'],
+        }, copy=False)
+        self.row_count = manifest['rows']
+
+        pair_keys = arrays['pair_keys']
+        starts = arrays['pair_starts'].tolist()
+        pair_labels = list(zip(
+            products[pair_keys // max(len(stores), 1)].astype(str).tolist(),
+            stores[pair_keys % max(len(stores), 1)].astype(str).tolist()
+        ))
+        ranges = dict(zip(pair_labels, zip(starts[:-1], starts[1:])))
+        self.series_index = SeriesIndex(ranges)
+        self.pair_counts = {pair: stop - start for pair, (start, stop) in ranges.items()}
+
+        self._cube = SalesCube(
+            pd.Index(np.load(os.path.join(version_dir, 'cube_products.npy')).tolist()),
+            pd.Index(np.load(os.path.join(version_dir, 'cube_stores.npy')).tolist()),
+            pd.Timestamp(manifest['first_day']),
+            manifest['n_days'],
+            arrays['cell_keys'],
+            arrays['series_keys'],
+            arrays['cumulative'],
+        )
+
+    def get_series_rows(self, product_id: str, store_id: str) -> pd.DataFrame:
+        return self.series_index.get_rows(self.frame, product_id, store_id)
+
+    @property
+    def sales_cube(self) -> SalesCube:
+        return self._cube
+
+
+def load_shared_dataset(csv_path: str) -> SharedDataset:
+    """
+    Adjunta la versión actual del dataset compartido, publicándola antes si
+    no existe o si el CSV cambió desde la última publicación.
+
+    El primer worker que detecta el cambio toma el lock y publica; los demás
+    esperan el lock y adjuntan la versión recién publicada sin volver a
+    parsear el CSV.
+    """
+    target_dir = shared_path(csv_path)
+    version_dir = _fresh_version_dir(csv_path, target_dir)
+    if version_dir is None:
+        os.makedirs(target_dir, exist_ok=True)
+        with _publish_lock(target_dir):
+            version_dir = _fresh_version_dir(csv_path, target_dir)
+            if version_dir is None:
+                version_dir = publish_shared_dataset(csv_path, target_dir)
+    log.info("Adjuntando el dataset compartido %s", version_dir)
+    return SharedDataset(version_dir)
+
+
+class SharedSnapshot(OverlaySnapshot):
+    """
+    Snapshot sobre una versión del dataset compartido. Las transacciones del
+    journal se mantienen en memoria privada del worker y se combinan con las
+    filas compartidas al consultar un par.
+    """
+
+    @property
+    def data(self) -> pd.DataFrame:
+        """DataFrame compartido; con transacciones ingeridas se devuelve una copia privada que las incluye."""
+        if self.ingested.empty:
+            return self.dataset.frame
+        return _concat_rows(self.dataset.frame, self.ingested)
+
+    def _build_sales_cube(self) -> SalesCube:
+        return self.dataset.sales_cube.extend(self.ingested)
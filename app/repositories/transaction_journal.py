@@ -0,0 +1,130 @@
+import fcntl
+import io
+import os
+from contextlib import contextmanager
+from typing import Iterator, Optional, Tuple
+
+import pandas as pd
+
+from repositories.columnar_dataset import DATASET_COLUMNS, downcast_quantity
+
+
+def journal_path(csv_path: str) -> str:
+    """Ruta del journal de transacciones ingeridas que acompaña al CSV."""
+    return f"{os.path.splitext(csv_path)[0]}.journal.csv"
+
+
+def journal_base_path(csv_path: str) -> str:
+    """Archivo con la firma (mtime, tamaño) del CSV sobre el que se empezó el journal."""
+    return f"{os.path.splitext(csv_path)[0]}.journal.base"
+
+
+def _csv_signature(csv_path: str) -> str:
+    stat = os.stat(csv_path)
+    return f"{stat.st_mtime_ns} {stat.st_size}"
+
+
+@contextmanager
+def journal_lock(csv_path: str) -> Iterator[None]:
+    """Lock exclusivo entre procesos para escribir o rotar el journal del CSV."""
+    fd = os.open(f"{os.path.splitext(csv_path)[0]}.journal.lock", os.O_WRONLY | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+
+def rotate_stale_journal(csv_path: str) -> Optional[str]:
+    """
+    Asocia el journal a la versión actual del CSV. Si el journal se empezó
+    sobre otra versión (el CSV fue reemplazado, por ejemplo por una
+    exportación que ya incluye las transacciones ingeridas), se archiva como
+    `<dataset>.journal.<mtime del CSV anterior>.csv` y se empieza uno vacío;
+    devuelve la ruta archivada, o None si no hubo que rotar. Un journal sin
+    firma (creado por una versión anterior del servicio) se adopta tal cual.
+    Debe llamarse con `journal_lock` tomado.
+    """
+    base_path = journal_base_path(csv_path)
+    signature = _csv_signature(csv_path)
+    try:
+        with open(base_path) as base:
+            recorded = base.read().strip()
+    except FileNotFoundError:
+        recorded = None
+    if recorded == signature:
+        return None
+
+    archived = None
+    path = journal_path(csv_path)
+    if recorded and os.path.exists(path):
+        archived = f"{os.path.splitext(csv_path)[0]}.journal.{recorded.split()[0]}.csv"
+        os.replace(path, archived)
+
+    tmp_path = f"{base_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as base:
+        base.write(signature)
+    os.replace(tmp_path, base_path)
+    return archived
+
+
+def typed_transactions(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica a un lote de transacciones los mismos tipos que al dataset."""
+    df = df[DATASET_COLUMNS].copy()
+    df['Date'] = pd.to_datetime(df['Date'])
+    df['ProductID'] = df['ProductID'].astype(str)
+    df['StoreID'] = df['StoreID'].astype(str)
+    df['Price'] = df['Price'].astype('float64')
+    df['Quantity'] = downcast_quantity(pd.to_numeric(df['Quantity']))
+    return df
+
+
+def append_transactions(csv_path: str, df: pd.DataFrame) -> int:
+    """
+    Agrega las transacciones al journal del CSV y las sincroniza a disco
+    antes de volver. El journal es un CSV sin encabezado con las columnas de
+    DATASET_COLUMNS; cada lote se escribe completo bajo un lock exclusivo,
+    de modo que los lectores nunca ven líneas de lotes intercalados. Si el
+    CSV cambió desde que se empezó el journal, antes se rota (ver
+    `rotate_stale_journal`). Devuelve el tamaño del journal tras la escritura.
+    """
+    payload = df[DATASET_COLUMNS].to_csv(header=False, index=False, date_format='%Y-%m-%d').encode()
+    with journal_lock(csv_path):
+        rotate_stale_journal(csv_path)
+        fd = os.open(journal_path(csv_path), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, payload)
+            os.fsync(fd)
+            return os.fstat(fd).st_size
+        finally:
+            os.close(fd)
+
+
+def read_transactions(path: str, offset: int = 0) -> Tuple[pd.DataFrame, int]:
+    """
+    Lee las transacciones del journal a partir del byte `offset` y devuelve
+    las filas tipadas junto con el offset hasta el que se leyó. Una última
+    línea incompleta se deja para la siguiente lectura.
+    """
+    empty = typed_transactions(pd.DataFrame(columns=DATASET_COLUMNS))
+    if not os.path.exists(path):
+        return empty, offset
+
+    with open(path, 'rb') as journal:
+        journal.seek(offset)
+        chunk = journal.read()
+
+    complete = chunk.rfind(b'\n') + 1
+    if complete == 0:
+        return empty, offset
+
+    rows = pd.read_csv(
+        io.BytesIO(chunk[:complete]),
+        header=None,
+        names=DATASET_COLUMNS,
+        dtype={'ProductID': str, 'StoreID': str},
+    )
+    return typed_transactions(rows), offset + complete
@@ -1,15 +1,62 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import time
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response, StreamingResponse
 from dependency_injector.wiring import inject, Provide
+from pydantic import BaseModel
 
+from repositories.model_prediction_repository import PredictionRepository
 from services.arima_prediction_service import ArimaPredictionService
+from services.predict_coalescer import PredictCoalescer
+from services.data_preparation_service import DataPreparationService
 from services.top_product_service import TopProductService
+from services.training_job_service import TrainingJobService, TrainingQueueFullError
 from containers.arima_container import ArimaContainer
+from metrics.registry import stage_duration
+from settings.logger import setup_logger
 from use_cases.train_arima_model_use_case import TrainARIMAUseCase
-from models.data_models import TrainRequest, PredictRequest, ModelResponse, DateRange, TopProductResponse
+from use_cases.ingest_transactions_use_case import IngestTransactionsUseCase
+from use_cases.update_arima_model_use_case import UpdateARIMAModelUseCase
+from models.data_models import (
+    TrainRequest, PredictRequest, ModelResponse, DateRange, TopProductResponse, TrainingJobResponse,
+    TrainBatchRequest, PredictBatchRequest, UpdateRequest, TopProductsRequest, TopProductsResponse,
+    IngestRequest
+)
 
 
 arima_router = APIRouter(prefix="/arima", tags=["ARIMA Model"])
 
+log = setup_logger()
+
+
+def _json_response(response: BaseModel, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serializa la respuesta midiendo el tiempo de serialización."""
+    with stage_duration.time(stage="response_serialization"):
+        content = response.model_dump_json()
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evalúa un encabezado If-None-Match (lista de ETags, débiles o no, o "*")."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+
+def _queue_training(train_use_case: Callable[[], TrainARIMAUseCase], request: PredictRequest) -> Optional[Dict]:
+    """Encola el ajuste del par respondido con el baseline; si la cola está llena, la predicción no falla."""
+    try:
+        return train_use_case().submit_once(request.product_id, request.store_id)
+    except TrainingQueueFullError as e:
+        log.warning("No se encoló el entrenamiento de %s/%s: %s", request.product_id, request.store_id, e)
+        return None
+
 
 @arima_router.post(
     "/predict",
@@ -19,32 +66,90 @@ arima_router = APIRouter(prefix="/arima", tags=["ARIMA Model"])
 @inject
 async def predict(
     request: PredictRequest,
-    service: ArimaPredictionService = Depends(Provide[ArimaContainer.arima_service])
-) -> ModelResponse:
+    if_none_match: Optional[str] = Header(None),
+    service: ArimaPredictionService = Depends(Provide[ArimaContainer.arima_service]),
+    coalescer: PredictCoalescer = Depends(Provide[ArimaContainer.predict_coalescer]),
+    train_use_case: Callable[[], TrainARIMAUseCase] = Depends(Provide[ArimaContainer.train_arima_use_case.provider])
+) -> Response:
     try:
-        # Convertir future_prices a pd.Series si se proporcionan
-        future_prices = None
-        if request.future_prices:
-            future_prices = pd.Series(
-                request.future_prices,
-                index=pd.date_range(start=pd.Timestamp.now(), periods=request.steps, freq='D')
+        if request.price_scenarios is not None:
+            if request.future_prices:
+                raise ValueError("future_prices and price_scenarios cannot be combined")
+            result, etag = await service.predict_scenarios_with_etag(
+                steps=request.steps,
+                product_id=request.product_id,
+                store_id=request.store_id,
+                price_scenarios=request.price_scenarios
             )
+        else:
+            # Convertir future_prices a pd.Series si se proporcionan
+            future_prices = None
+            if request.future_prices:
+                future_prices = pd.Series(
+                    request.future_prices,
+                    index=pd.date_range(start=pd.Timestamp.now(), periods=request.steps, freq='D')
+                )
 
-        result = await service.predict(
-            steps=request.steps,
-            product_id=request.product_id,
-            store_id=request.store_id,
-            future_prices=future_prices
-        )
+            # Con PREDICT_COALESCE_WINDOW_MS > 0 la petición se resuelve en lote con las concurrentes
+            result, etag = await coalescer.predict_with_etag(
+                steps=request.steps,
+                product_id=request.product_id,
+                store_id=request.store_id,
+                future_prices=future_prices
+            )
 
-        return ModelResponse(
+        message = f"Predictions generated for product {request.product_id} in store {request.store_id}"
+        if result.get("baseline"):
+            message = f"Baseline predictions generated for product {request.product_id} in store " \
+                      f"{request.store_id}: no trained model yet"
+            if request.queue_training:
+                # El resultado del servicio no se muta: el trabajo va en una copia
+                result = {**result, "training_job": _queue_training(train_use_case, request)}
+
+        # El cliente ya tiene este pronóstico: se responde sin cuerpo
+        if _etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+
+        return _json_response(ModelResponse(
             status="success",
-            message=f"Predictions generated for product {request.product_id} in store {request.store_id}",
+            message=message,
             data=result
-        )
+        ), headers={"ETag": etag})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+
+@arima_router.post(
+    "/predict-batch",
+    summary="Generar predicciones para muchos pares producto/tienda en una sola petición"
+)
+@inject
+async def predict_batch(
+    request: PredictBatchRequest,
+    service: ArimaPredictionService = Depends(Provide[ArimaContainer.arima_service])
+):
+    items = [item.model_dump() for item in request.items]
+
+    if request.stream:
+        async def stream_results():
+            async for chunk in service.predict_batch(items, request.backend):
+                for result in chunk:
+                    yield json.dumps(result) + "\n"
+
+        return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+    try:
+        results = [result async for chunk in service.predict_batch(items, request.backend) for result in chunk]
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
+    failed = sum(1 for result in results if result["status"] == "failed")
+    return {
+        "status": "success",
+        "summary": {"total": len(results), "succeeded": len(results) - failed, "failed": failed},
+        "results": results
+    }
 
 
 @arima_router.post(
@@ -56,17 +161,156 @@ async def predict(
 async def train(
         request: TrainRequest,
         use_case: TrainARIMAUseCase = Depends(Provide[ArimaContainer.train_arima_use_case])
+) -> Response:
+    try:
+        if request.background and request.auto_order is not None:
+            raise ValueError("auto_order is not supported for background training")
+
+        if request.background:
+            job = use_case.submit(
+                product_id=request.product_id,
+                store_id=request.store_id,
+                parameters=request.parameters,
+                warm_start=request.warm_start,
+                profile=request.profile
+            )
+            return _json_response(ModelResponse(
+                status="queued",
+                message=f"Training queued for product {request.product_id} in store {request.store_id}",
+                data=job
+            ))
+
+        result = await use_case.execute(
+            product_id=request.product_id,
+            store_id=request.store_id,
+            parameters=request.parameters,
+            warm_start=request.warm_start,
+            auto_order=request.auto_order,
+            profile=request.profile
+        )
+
+        return _json_response(ModelResponse(
+            status="success",
+            message=f"Model trained successfully for product {request.product_id} in store {request.store_id}",
+            data=result
+        ))
+    except TrainingQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@arima_router.post(
+    "/update",
+    response_model=ModelResponse,
+    summary="Actualizar un modelo existente con las observaciones nuevas, sin reentrenarlo"
+)
+@inject
+async def update(
+        request: UpdateRequest,
+        use_case: UpdateARIMAModelUseCase = Depends(Provide[ArimaContainer.update_arima_use_case])
 ) -> ModelResponse:
     try:
         result = await use_case.execute(
             product_id=request.product_id,
+            store_id=request.store_id
+        )
+
+        return ModelResponse(
+            status="success",
+            message=f"Model updated with {result['data_info']['new_observations']} new observations "
+                    f"for product {request.product_id} in store {request.store_id}",
+            data=result
+        )
+    except TrainingQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@arima_router.post(
+    "/train-batch",
+    summary="Entrenar en paralelo varios pares producto/tienda",
+    response_description="Un objeto JSON por línea (NDJSON) por cada par, y un resumen al final"
+)
+@inject
+async def train_batch(
+        request: TrainBatchRequest,
+        use_case: TrainARIMAUseCase = Depends(Provide[ArimaContainer.train_arima_use_case])
+) -> StreamingResponse:
+    try:
+        pairs = use_case.resolve_batch_pairs(
+            pairs=[(pair.product_id, pair.store_id) for pair in request.pairs or []],
             store_id=request.store_id,
-            parameters=request.parameters
+            min_observations=request.min_observations
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not pairs:
+        raise HTTPException(status_code=400, detail="No product-store pairs match the batch filters")
+
+    async def stream_results():
+        start = time.perf_counter()
+        done = failed = 0
+        async for result in use_case.execute_batch(
+                pairs, request.parameters, request.mode, request.warm_start, request.profile):
+            if result["status"] == "done":
+                done += 1
+            else:
+                failed += 1
+            yield json.dumps(result) + "\n"
+
+        elapsed = time.perf_counter() - start
+        yield json.dumps({
+            "summary": {
+                "total": len(pairs),
+                "done": done,
+                "failed": failed,
+                "elapsed_seconds": round(elapsed, 3),
+                "fits_per_minute": round(done / elapsed * 60, 2) if elapsed > 0 else None
+            }
+        }) + "\n"
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
+
+
+@arima_router.get(
+    "/train/jobs/{job_id}",
+    response_model=TrainingJobResponse,
+    summary="Consultar el estado de un entrenamiento en segundo plano"
+)
+@inject
+async def get_training_job(
+        job_id: str,
+        training_jobs: TrainingJobService = Depends(Provide[ArimaContainer.training_job_service])
+) -> TrainingJobResponse:
+    job = training_jobs.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Training job {job_id} not found")
+    return TrainingJobResponse(**job)
+
+
+@arima_router.post(
+    "/ingest",
+    response_model=ModelResponse,
+    summary="Agregar transacciones nuevas al dataset sin recargar el CSV"
+)
+@inject
+async def ingest(
+        request: IngestRequest,
+        use_case: IngestTransactionsUseCase = Depends(Provide[ArimaContainer.ingest_transactions_use_case])
+) -> ModelResponse:
+    try:
+        # La escritura con fsync y la actualización del snapshot son síncronas:
+        # fuera del event loop para no frenar las predicciones en curso
+        result = await run_in_threadpool(
+            use_case.execute, [transaction.model_dump() for transaction in request.transactions]
         )
 
         return ModelResponse(
             status="success",
-            message=f"Model trained successfully for product {request.product_id} in store {request.store_id}",
+            message=f"Ingested {result['ingested_rows']} transactions",
             data=result
         )
     except Exception as e:
@@ -94,3 +338,51 @@ async def get_top_product(
 
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+
+@arima_router.post(
+    "/top-products",
+    response_model=TopProductsResponse,
+    summary="Ranking de los N productos más vendidos, global o por tienda"
+)
+@inject
+async def get_top_products(
+        request: TopProductsRequest,
+        service: TopProductService = Depends(Provide[ArimaContainer.top_product_service])
+) -> TopProductsResponse:
+    try:
+        result = await service.get_top_products(
+            start_date=request.start_date,
+            end_date=request.end_date,
+            n=request.n,
+            metric=request.metric,
+            store_id=request.store_id,
+            by_store=request.by_store
+        )
+
+        return TopProductsResponse(**result)
+
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@arima_router.get(
+    "/cache-stats",
+    summary="Consultar los contadores de los caches en memoria"
+)
+@inject
+async def get_cache_stats(
+        repository: PredictionRepository = Depends(Provide[ArimaContainer.repository]),
+        data_preparation: DataPreparationService = Depends(Provide[ArimaContainer.data_preparation_service]),
+        training_jobs: TrainingJobService = Depends(Provide[ArimaContainer.training_job_service]),
+        service: ArimaPredictionService = Depends(Provide[ArimaContainer.arima_service]),
+        coalescer: PredictCoalescer = Depends(Provide[ArimaContainer.predict_coalescer])
+) -> dict:
+    return {
+        "dataset": repository.get_dataset_cache_stats(),
+        "models": repository.get_model_cache_stats(),
+        "series": data_preparation.get_cache_stats(),
+        "forecasts": service.get_cache_stats(),
+        "predict_coalescer": coalescer.stats(),
+        "training_pool": training_jobs.stats()
+    }
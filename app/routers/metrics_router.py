@@ -0,0 +1,86 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+from dependency_injector.wiring import inject, Provide
+
+from containers.arima_container import ArimaContainer
+from metrics.registry import http_request_duration, render_samples, stage_duration
+from repositories.model_prediction_repository import PredictionRepository
+from services.arima_prediction_service import ArimaPredictionService
+from services.data_preparation_service import DataPreparationService
+from services.predict_coalescer import PredictCoalescer
+from services.training_job_service import TrainingJobService
+
+
+metrics_router = APIRouter()
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _cache_metrics(caches: Dict[str, Dict[str, Any]]) -> List[str]:
+    """Gauges y contadores de los caches LRU, con el nombre del cache como etiqueta."""
+    lines = []
+    for suffix, key, metric_type, documentation in (
+            ("entries", "entries", "gauge", "Entries currently held by the cache."),
+            ("bytes", "bytes", "gauge", "Estimated bytes currently held by the cache."),
+            ("max_bytes", "max_bytes", "gauge", "Byte budget of the cache."),
+            ("hits_total", "hits", "counter", "Cache lookups served from memory."),
+            ("misses_total", "misses", "counter", "Cache lookups that had to load the value."),
+            ("evictions_total", "evictions", "counter", "Entries evicted to stay within the budget."),
+    ):
+        lines += render_samples(f"arima_cache_{suffix}", documentation, metric_type, [
+            ({"cache": name}, stats.get(key)) for name, stats in caches.items()
+        ])
+    return lines
+
+
+@metrics_router.get(
+    "/metrics",
+    response_class=PlainTextResponse,
+    summary="Métricas de latencia por etapa, caches y pool de entrenamiento en formato Prometheus"
+)
+@inject
+async def metrics(
+        repository: PredictionRepository = Depends(Provide[ArimaContainer.repository]),
+        data_preparation: DataPreparationService = Depends(Provide[ArimaContainer.data_preparation_service]),
+        training_jobs: TrainingJobService = Depends(Provide[ArimaContainer.training_job_service]),
+        service: ArimaPredictionService = Depends(Provide[ArimaContainer.arima_service]),
+        coalescer: PredictCoalescer = Depends(Provide[ArimaContainer.predict_coalescer])
+) -> PlainTextResponse:
+    dataset = repository.get_dataset_cache_stats()
+    pool = training_jobs.stats()
+    coalescing = coalescer.stats()
+
+    lines = stage_duration.render() + http_request_duration.render()
+    lines += _cache_metrics({
+        "models": repository.get_model_cache_stats(),
+        "series": data_preparation.get_cache_stats(),
+        "forecasts": service.get_cache_stats(),
+    })
+    lines += render_samples("arima_dataset_version", "Version of the in-memory dataset snapshot.", "gauge", [
+        ({}, dataset["version"])
+    ])
+    lines += render_samples("arima_dataset_rows", "Transactions in the in-memory dataset snapshot.", "gauge", [
+        ({}, dataset["rows"])
+    ])
+    lines += render_samples("arima_dataset_loads_total", "Dataset snapshot lookups by outcome.", "counter", [
+        ({"outcome": outcome}, dataset[outcome]) for outcome in ("hits", "misses", "reloads", "appends")
+    ])
+    lines += render_samples("arima_training_pool_size", "Worker processes in the training pool.", "gauge", [
+        ({}, pool["pool_size"])
+    ])
+    lines += render_samples("arima_training_outstanding", "Fits queued or running in the pool.", "gauge", [
+        ({}, pool["outstanding"])
+    ])
+    lines += render_samples("arima_training_jobs", "Background training jobs by status.", "gauge", [
+        ({"status": status}, count) for status, count in pool["jobs"].items()
+    ])
+    lines += render_samples("arima_predict_coalesced_total", "Predict requests handled by the coalescer.", "counter", [
+        ({"outcome": "batched"}, coalescing["requests"] - coalescing["deduplicated"]),
+        ({"outcome": "deduplicated"}, coalescing["deduplicated"]),
+    ])
+    lines += render_samples("arima_predict_batches_total", "Batches run by the predict coalescer.", "counter", [
+        ({}, coalescing["batches"])
+    ])
+    return PlainTextResponse("\n".join(lines) + "\n", media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,70 +1,443 @@
+import asyncio
+import hashlib
+import json
+
+import numpy as np
 import pandas as pd
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, List, AsyncIterator, Tuple, Union
+
+from cache.lru_cache import LRUCache
+from models.batch_forecast import forecast_many
+from models.compact_arima_model import CompactArimaModel
 from interfaces.prediction_service_interface import PredictionService
+from metrics.registry import stage_duration
+from repositories.dataset_cache import BaseSnapshot
+from services.baseline_forecast_service import BaselineForecastService
 from services.data_preparation_service import DataPreparationService
 from settings.logger import setup_logger
 
 log = setup_logger()
 
+FORECAST_BACKENDS = ("per_model", "vectorized")
+# Ítems por bloque con el backend vectorizado: bloques grandes amortizan el apilado
+VECTORIZED_CHUNK_SIZE = 2048
+
+# (steps, product_id, store_id, future_prices) de una petición de pronóstico
+ForecastRequest = Tuple[int, str, str, Optional[pd.Series]]
+# Pronóstico y ETag de una petición, o el error que produjo
+ForecastOutcome = Union[Tuple[Dict[str, Any], str], Exception]
+
+
+def _prices_key(future_prices: Optional[pd.Series]) -> Optional[str]:
+    """Hash de los precios suministrados; None cuando se usan los del histórico."""
+    if future_prices is None:
+        return None
+    values = np.ascontiguousarray(np.asarray(future_prices, dtype=np.float64))
+    # La forma distingue una trayectoria de una matriz de escenarios con los mismos valores
+    digest = hashlib.blake2b(str(values.shape).encode(), digest_size=16)
+    digest.update(values.tobytes())
+    return digest.hexdigest()
+
+
+def _exog_coefficients(model: Any) -> Optional[np.ndarray]:
+    """
+    Coeficientes de las exógenas cuando entran al pronóstico de forma lineal
+    y contemporánea (regresión estimada por MLE); None en otro caso.
+    """
+    if isinstance(model, CompactArimaModel):
+        return model.beta
+    sarimax = getattr(model, 'model', None)
+    exog_names = list(getattr(sarimax, 'exog_names', None) or [])
+    if not exog_names or not getattr(sarimax, 'mle_regression', False):
+        return None
+    params = pd.Series(np.asarray(model.params), index=sarimax.param_names)
+    return params[exog_names].to_numpy(dtype=float)
+
 
 class ArimaPredictionService(PredictionService):
-    def __init__(self, repository, data_preparation_service: DataPreparationService):
+    def __init__(
+            self,
+            repository,
+            data_preparation_service: DataPreparationService,
+            batch_chunk_size: int = 64,
+            forecast_cache_max_entries: int = 4096,
+            forecast_cache_max_bytes: int = 64 * 1024 * 1024,
+            forecast_backend: str = "per_model",
+            baseline_service: Optional[BaselineForecastService] = None
+    ):
+        if forecast_backend not in FORECAST_BACKENDS:
+            raise ValueError(f"forecast_backend must be one of {FORECAST_BACKENDS}")
         self.repository = repository
         self.data_preparation = data_preparation_service
+        self.batch_chunk_size = batch_chunk_size
+        self.forecast_backend = forecast_backend
+        # Sin baseline, pedir un par sin modelo entrenado es un error
+        self.baseline_service = baseline_service
+        # Pronósticos por (producto, tienda, steps, hash de precios); cada entrada
+        # guarda la firma del modelo y la versión del dataset con que se calculó
+        self._forecast_cache = LRUCache(
+            forecast_cache_max_entries, forecast_cache_max_bytes, sizeof=lambda entry: entry[4]
+        )
+
+    def _cached_forecast(
+            self,
+            snapshot: BaseSnapshot,
+            steps: int,
+            product_id: str,
+            store_id: str,
+            future_prices: Optional[pd.Series] = None
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Pronóstico del par junto con su ETag, reutilizado mientras no cambien
+        el modelo guardado (su firma en disco cambia al reentrenar, también
+        desde otro proceso) ni las transacciones del par. El ETag es un hash
+        del contenido, por lo que coincide entre procesos. El diccionario
+        devuelto es compartido entre peticiones y no debe mutarse.
+        """
+        key, signature, cached = self._cache_lookup(snapshot, steps, product_id, store_id, future_prices)
+        if cached is not None:
+            return cached
+        result = self._forecast(snapshot, steps, product_id, store_id, future_prices)
+        return result, self._cache_store(snapshot, key, signature, result)
+
+    def _cache_lookup(
+            self,
+            snapshot: BaseSnapshot,
+            steps: int,
+            product_id: str,
+            store_id: str,
+            future_prices: Optional[pd.Series]
+    ) -> Tuple[Tuple[Any, ...], Optional[Tuple[int, int]], Optional[Tuple[Dict[str, Any], str]]]:
+        """Clave, firma actual del modelo y, si sigue vigente, el pronóstico cacheado."""
+        key = (product_id, store_id, steps, _prices_key(future_prices))
+        signature = self.repository.model_signature(product_id, store_id)
+        cached = self._forecast_cache.get(key)
+        if cached is not None:
+            if cached[0] == signature and snapshot.unchanged_since(product_id, store_id, cached[1]):
+                return key, signature, (cached[2], cached[3])
+            self._forecast_cache.invalidate(key)
+        return key, signature, None
+
+    def _cache_store(
+            self,
+            snapshot: BaseSnapshot,
+            key: Tuple[Any, ...],
+            signature: Optional[Tuple[int, int]],
+            result: Dict[str, Any]
+    ) -> str:
+        """Guarda el pronóstico y devuelve su ETag."""
+        payload = json.dumps(result, sort_keys=True, separators=(',', ':')).encode()
+        etag = f'"{hashlib.blake2b(payload, digest_size=16).hexdigest()}"'
+        if signature is not None:
+            self._forecast_cache.put(key, (signature, snapshot.version, result, etag, len(payload)))
+        return etag
+
+    def _forecast_scenarios(
+            self,
+            snapshot: BaseSnapshot,
+            steps: int,
+            product_id: str,
+            store_id: str,
+            price_scenarios: np.ndarray
+    ) -> Dict[str, Any]:
+        """
+        Pronósticos del par para cada trayectoria de precios, cargando el
+        modelo y la serie una sola vez. Como el precio entra al SARIMAX de
+        forma lineal, cada escenario es el pronóstico con precio cero más
+        beta por sus precios; si el modelo no permite esa descomposición se
+        pronostica escenario por escenario.
+        """
+        if price_scenarios.ndim != 2 or price_scenarios.shape[1] != steps:
+            raise ValueError(f"Cada escenario de price_scenarios debe contener {steps} períodos de datos")
+
+        model = self.repository.load_model(product_id, store_id)
+        if model is None:
+            raise ValueError(f"price_scenarios requiere un modelo entrenado para el producto {product_id} "
+                             f"en la tienda {store_id}")
+        last_date, _ = self._forecast_inputs(
+            snapshot, steps, product_id, store_id, pd.Series(price_scenarios[0])
+        )
+
+        beta = _exog_coefficients(model)
+        with stage_duration.time(stage="forecast"):
+            if beta is not None and beta.size == 1:
+                base = np.asarray(model.forecast(steps=steps, exog=np.zeros((steps, 1))), dtype=float)
+                predictions = base + price_scenarios * beta[0]
+            else:
+                predictions = np.stack([
+                    np.asarray(model.forecast(steps=steps, exog=prices), dtype=float) for prices in price_scenarios
+                ])
+
+        future_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=steps, freq='D')
+        return {
+            "dates": future_dates.strftime('%Y-%m-%d').tolist(),
+            "predictions": predictions.tolist(),
+            "price_scenarios": price_scenarios.tolist(),
+            "metrics": {
+                "aic": getattr(model, 'aic', None),
+                "bic": getattr(model, 'bic', None)
+            }
+        }
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return self._forecast_cache.stats()
+
+    def clear(self) -> None:
+        """Descarta los pronósticos cacheados; el siguiente se vuelve a calcular."""
+        self._forecast_cache.clear()
+
+    def _forecast(
+            self,
+            snapshot: BaseSnapshot,
+            steps: int,
+            product_id: str,
+            store_id: str,
+            future_prices: Optional[pd.Series] = None
+    ) -> Dict[str, Any]:
+        # Cargar modelo específico para producto/tienda
+        model = self.repository.load_model(product_id, store_id)
+        if model is None:
+            if self.baseline_service is None:
+                raise ValueError(f"No existe un modelo entrenado para el producto {product_id} en la tienda {store_id}")
+            log.debug("Sin modelo para %s/%s, se usa el pronóstico de referencia", product_id, store_id)
+            with stage_duration.time(stage="forecast"):
+                return self.baseline_service.forecast(snapshot, steps, product_id, store_id)
+        last_date, future_prices = self._forecast_inputs(snapshot, steps, product_id, store_id, future_prices)
+
+        # Realizar predicción
+        log.debug("Generando predicciones para producto %s en tienda %s", product_id, store_id)
+        with stage_duration.time(stage="forecast"):
+            forecast = model.forecast(steps=steps, exog=future_prices)
+        log.debug("Predicciones generadas para producto %s en tienda %s", product_id, store_id)
+        return self._forecast_result(model, np.asarray(forecast), last_date, future_prices)
+
+    def _forecast_inputs(
+            self,
+            snapshot: BaseSnapshot,
+            steps: int,
+            product_id: str,
+            store_id: str,
+            future_prices: Optional[pd.Series] = None
+    ) -> Tuple[pd.Timestamp, pd.Series]:
+        """Última fecha observada del par y precios futuros validados."""
+        # Obtener la última fecha de los datos históricos
+        historical_data = self.data_preparation.get_time_series(snapshot, product_id, store_id)
+        last_date = historical_data.index[-1]
+
+        if future_prices is None:
+            # Si no se proporcionan precios futuros, intentar obtenerlos
+            log.debug("Obteniendo precios futuros para %s días", steps)
+            future_prices = self.data_preparation.get_future_prices(
+                historical_data,
+                start_date=last_date + pd.Timedelta(days=1),
+                periods=steps
+            )
+
+        # Validar los precios futuros
+        if not isinstance(future_prices, (pd.Series, pd.DataFrame)):
+            raise ValueError("future_prices debe ser una Serie o DataFrame de pandas")
+
+        if len(future_prices) != steps:
+            raise ValueError(f"future_prices debe contener {steps} períodos de datos")
+        return last_date, future_prices
+
+    @staticmethod
+    def _forecast_result(
+            model: Any,
+            forecast: np.ndarray,
+            last_date: pd.Timestamp,
+            future_prices: pd.Series
+    ) -> Dict[str, Any]:
+        # Preparar respuesta
+        future_dates = pd.date_range(
+            start=last_date + pd.Timedelta(days=1),
+            periods=len(forecast),
+            freq='D'
+        )
+
+        return {
+            "predictions": forecast.tolist(),
+            "dates": future_dates.strftime('%Y-%m-%d').tolist(),
+            "prices_used": future_prices.tolist(),
+            "metrics": {
+                "aic": getattr(model, 'aic', None),
+                "bic": getattr(model, 'bic', None)
+            },
+            "baseline": False
+        }
 
     async def predict(self, steps: int, product_id: str, store_id: str, future_prices: Optional[pd.Series] = None) -> \
     Dict[str, Any]:
+        result, _ = await self.predict_with_etag(steps, product_id, store_id, future_prices)
+        return result
+
+    async def predict_with_etag(
+            self,
+            steps: int,
+            product_id: str,
+            store_id: str,
+            future_prices: Optional[pd.Series] = None
+    ) -> Tuple[Dict[str, Any], str]:
         try:
-            # Cargar modelo específico para producto/tienda
-            model = self.repository.load_model(product_id, store_id)
-
-            # Obtener la última fecha de los datos históricos
-            raw_data = self.repository.load_data()
-            historical_data = self.data_preparation.prepare_time_series(raw_data, product_id, store_id)
-            last_date = historical_data.index[-1]
-
-            if future_prices is None:
-                # Si no se proporcionan precios futuros, intentar obtenerlos
-                log.info(f"Obteniendo precios futuros para {steps} días")
-                future_prices = self.data_preparation.get_future_prices(
-                    raw_data,
-                    product_id,
-                    store_id,
-                    start_date=last_date + pd.Timedelta(days=1),
-                    periods=steps
-                )
+            snapshot = self.repository.load_snapshot()
+            return self._cached_forecast(snapshot, steps, product_id, store_id, future_prices)
 
-            # Validar los precios futuros
-            if not isinstance(future_prices, (pd.Series, pd.DataFrame)):
-                raise ValueError("future_prices debe ser una Serie o DataFrame de pandas")
+        except Exception as e:
+            log.error(f"Error generando predicciones: {str(e)}")
+            raise ValueError(f"Error generando predicciones: {str(e)}")
 
-            if len(future_prices) != steps:
-                raise ValueError(f"future_prices debe contener {steps} períodos de datos")
+    @staticmethod
+    def _item_request(item: Dict[str, Any]) -> ForecastRequest:
+        future_prices = pd.Series(item["future_prices"], dtype=float) if item.get("future_prices") else None
+        return item["steps"], item["product_id"], item["store_id"], future_prices
 
-            # Realizar predicción
-            log.info(f"**** Generando predicciones para producto {product_id} en tienda {store_id}")
-            forecast = model.forecast(steps=steps, exog=future_prices)
-            log.info(f"**** Predicciones generadas para producto {product_id} en tienda {store_id}")
+    @staticmethod
+    def _item_success(item: Dict[str, Any], forecast: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "product_id": item["product_id"],
+            "store_id": item["store_id"],
+            "status": "success",
+            "start_date": forecast["dates"][0],
+            "predictions": forecast["predictions"],
+            "baseline": forecast.get("baseline", False)
+        }
 
-            # Preparar respuesta
-            future_dates = pd.date_range(
-                start=last_date + pd.Timedelta(days=1),
-                periods=steps,
-                freq='D'
-            )
+    @staticmethod
+    def _item_failure(item: Dict[str, Any], error: Exception) -> Dict[str, Any]:
+        log.error(f"Error generando predicciones para {item['product_id']}/{item['store_id']}: {str(error)}")
+        return {
+            "product_id": item["product_id"],
+            "store_id": item["store_id"],
+            "status": "failed",
+            "error": f"Error generando predicciones: {str(error)}"
+        }
 
-            response = {
-                "predictions": forecast.tolist(),
-                "dates": future_dates.strftime('%Y-%m-%d').tolist(),
-                "prices_used": future_prices.tolist(),
-                "metrics": {
-                    "aic": getattr(model, 'aic', None),
-                    "bic": getattr(model, 'bic', None)
-                }
-            }
+    def _item_results(self, items: List[Dict[str, Any]], outcomes: List[ForecastOutcome]) -> List[Dict[str, Any]]:
+        return [
+            self._item_failure(item, outcome) if isinstance(outcome, Exception) else self._item_success(item, outcome[0])
+            for item, outcome in zip(items, outcomes)
+        ]
 
-            return response
+    async def predict_scenarios_with_etag(
+            self,
+            steps: int,
+            product_id: str,
+            store_id: str,
+            price_scenarios: List[List[float]]
+    ) -> Tuple[Dict[str, Any], str]:
+        """Variante de `predict_with_etag` con una matriz de escenarios de precios."""
+        try:
+            snapshot = self.repository.load_snapshot()
+            scenarios = np.asarray(price_scenarios, dtype=float)
+            key, signature, cached = self._cache_lookup(snapshot, steps, product_id, store_id, scenarios)
+            if cached is not None:
+                return cached
+            result = self._forecast_scenarios(snapshot, steps, product_id, store_id, scenarios)
+            return result, self._cache_store(snapshot, key, signature, result)
 
         except Exception as e:
             log.error(f"Error generando predicciones: {str(e)}")
-            raise ValueError(f"Error generando predicciones: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error generando predicciones: {str(e)}")
+
+    def _forecast_each(self, snapshot: BaseSnapshot, requests: List[ForecastRequest]) -> List[ForecastOutcome]:
+        outcomes: List[ForecastOutcome] = []
+        for steps, product_id, store_id, future_prices in requests:
+            try:
+                outcomes.append(self._cached_forecast(snapshot, steps, product_id, store_id, future_prices))
+            except Exception as e:
+                outcomes.append(e)
+        return outcomes
+
+    def _forecast_vectorized(self, snapshot: BaseSnapshot, requests: List[ForecastRequest]) -> List[ForecastOutcome]:
+        """
+        Igual que `_forecast_each`, pero los pronósticos que no están en cache
+        se calculan juntos con `forecast_many` a partir de la vista compacta
+        de cada modelo. Los modelos que no admiten vista compacta se
+        pronostican uno a uno.
+        """
+        outcomes: List[Optional[ForecastOutcome]] = [None] * len(requests)
+        pending = []
+        for position, (steps, product_id, store_id, future_prices) in enumerate(requests):
+            try:
+                key, signature, cached = self._cache_lookup(snapshot, steps, product_id, store_id, future_prices)
+                if cached is not None:
+                    outcomes[position] = cached
+                    continue
+                model = self.repository.load_compact_model(product_id, store_id)
+                if model is None:
+                    outcomes[position] = self._cached_forecast(snapshot, steps, product_id, store_id, future_prices)
+                    continue
+                last_date, future_prices = self._forecast_inputs(snapshot, steps, product_id, store_id, future_prices)
+                pending.append((position, key, signature, model, last_date, future_prices))
+            except Exception as e:
+                outcomes[position] = e
+
+        if pending:
+            with stage_duration.time(stage="forecast"):
+                forecasts = forecast_many(
+                    [entry[3] for entry in pending],
+                    [requests[entry[0]][0] for entry in pending],
+                    [entry[5] for entry in pending]
+                )
+            for (position, key, signature, model, last_date, future_prices), forecast in zip(pending, forecasts):
+                result = self._forecast_result(model, forecast, last_date, future_prices)
+                outcomes[position] = (result, self._cache_store(snapshot, key, signature, result))
+        return outcomes
+
+    def forecast_many_with_etag(
+            self,
+            requests: List[ForecastRequest],
+            backend: Optional[str] = None
+    ) -> List[ForecastOutcome]:
+        """
+        Pronósticos de varias peticiones sobre un único snapshot del dataset,
+        en el orden de entrada. Cada resultado es el par (pronóstico, ETag) o
+        la excepción de esa petición, sin interrumpir a las demás.
+        """
+        backend = backend or self.forecast_backend
+        if backend not in FORECAST_BACKENDS:
+            raise ValueError(f"backend must be one of {FORECAST_BACKENDS}")
+        snapshot = self.repository.load_snapshot()
+        if backend == "vectorized":
+            return self._forecast_vectorized(snapshot, requests)
+        return self._forecast_each(snapshot, requests)
+
+    def _predict_chunk(self, snapshot: BaseSnapshot, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self._item_results(items, self._forecast_each(snapshot, [self._item_request(item) for item in items]))
+
+    def _predict_chunk_vectorized(self, snapshot: BaseSnapshot, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return self._item_results(
+            items, self._forecast_vectorized(snapshot, [self._item_request(item) for item in items])
+        )
+
+    async def predict_batch(
+            self,
+            items: List[Dict[str, Any]],
+            backend: Optional[str] = None
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """
+        Genera predicciones para muchos pares compartiendo un único snapshot del
+        dataset. Los ítems se reparten en bloques que se ejecutan en el pool de
+        hilos del event loop, y cada bloque se entrega en cuanto termina. Los
+        errores se reportan por ítem sin interrumpir el lote.
+
+        `backend` ("per_model" o "vectorized") reemplaza el configurado en el
+        servicio para este lote.
+        """
+        backend = backend or self.forecast_backend
+        if backend not in FORECAST_BACKENDS:
+            raise ValueError(f"backend must be one of {FORECAST_BACKENDS}")
+        if backend == "vectorized":
+            predict_chunk, chunk_size = self._predict_chunk_vectorized, VECTORIZED_CHUNK_SIZE
+        else:
+            predict_chunk, chunk_size = self._predict_chunk, self.batch_chunk_size
+
+        snapshot = self.repository.load_snapshot()
+        loop = asyncio.get_running_loop()
+        chunks = [
+            items[start:start + chunk_size]
+            for start in range(0, len(items), chunk_size)
+        ]
+        futures = [loop.run_in_executor(None, predict_chunk, snapshot, chunk) for chunk in chunks]
+        for future in asyncio.as_completed(futures):
+            yield await future
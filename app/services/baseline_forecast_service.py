@@ -0,0 +1,71 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.baseline_forecast import SEASON_LENGTH, seasonal_naive_forecast
+from repositories.dataset_cache import BaseSnapshot
+from repositories.sales_cube import SalesCube
+from settings.logger import setup_logger
+
+log = setup_logger()
+
+BASELINE_METHOD = "seasonal_naive"
+
+
+class BaselineForecastService:
+    """
+    Pronósticos de referencia para pares sin modelo entrenado.
+
+    Para cada versión del dataset se calcula, con una sola pasada vectorizada
+    sobre el cubo de ventas, el perfil semanal de todos los pares: el
+    promedio de cada día de la semana en las últimas `seasons` semanas.
+    Pronosticar un par es luego una búsqueda en esa tabla.
+    """
+
+    def __init__(self, seasons: int = 4):
+        if seasons < 1:
+            raise ValueError("seasons must be at least 1")
+        self.seasons = seasons
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._table: Optional[Tuple[SalesCube, np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def _profiles(self, snapshot: BaseSnapshot) -> Tuple[SalesCube, np.ndarray, np.ndarray, np.ndarray]:
+        """Claves de los pares, último día y perfil semanal de todos los pares de la versión."""
+        with self._lock:
+            if self._version != snapshot.version:
+                cube = snapshot.sales_cube
+                series_keys, last_days, history = cube.recent_history(self.seasons * SEASON_LENGTH)
+                profiles = seasonal_naive_forecast(history, SEASON_LENGTH)
+                self._table = (cube, series_keys, last_days, profiles)
+                self._version = snapshot.version
+                log.info("Perfiles de referencia calculados para %s pares", len(series_keys))
+            return self._table
+
+    def forecast(self, snapshot: BaseSnapshot, steps: int, product_id: str, store_id: str) -> Dict[str, Any]:
+        """Pronóstico de referencia del par, con el mismo formato que el de un modelo entrenado."""
+        cube, series_keys, last_days, profiles = self._profiles(snapshot)
+        if product_id not in cube.products or store_id not in cube.stores:
+            raise ValueError(f"No data found for ProductID {product_id} and StoreID {store_id}")
+        key = cube.products.get_loc(product_id) * len(cube.stores) + cube.stores.get_loc(store_id)
+        position = np.searchsorted(series_keys, key)
+        if position == len(series_keys) or series_keys[position] != key:
+            raise ValueError(f"No data found for ProductID {product_id} and StoreID {store_id}")
+
+        last_date = cube.first_day + pd.Timedelta(days=int(last_days[position]))
+        future_dates = pd.date_range(start=last_date + pd.Timedelta(days=1), periods=steps, freq='D')
+        return {
+            "predictions": profiles[position, np.arange(steps) % SEASON_LENGTH].tolist(),
+            "dates": future_dates.strftime('%Y-%m-%d').tolist(),
+            "prices_used": None,
+            "metrics": {
+                "aic": None,
+                "bic": None,
+                "method": BASELINE_METHOD,
+                "season_length": SEASON_LENGTH,
+                "seasons": self.seasons
+            },
+            "baseline": True
+        }
@@ -1,25 +1,66 @@
+from typing import Any, Dict, Optional
+
 import pandas as pd
 
+from cache.lru_cache import LRUCache
+from metrics.registry import stage_duration
+from repositories.dataset_cache import BaseSnapshot
 from settings.logger import setup_logger
 
 log = setup_logger()
 
 
+def _frame_nbytes(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
 class DataPreparationService:
+    def __init__(self, cache_max_entries: int = 2048, cache_max_bytes: int = 256 * 1024 * 1024):
+        # Series diarias preparadas por (producto, tienda), junto con la versión
+        # del dataset con la que se prepararon
+        self._series_cache = LRUCache(
+            cache_max_entries, cache_max_bytes, sizeof=lambda entry: _frame_nbytes(entry[1])
+        )
+        self._cached_version: Optional[int] = None
+
+    def get_time_series(self, snapshot: BaseSnapshot, product_id: str, store_id: str) -> pd.DataFrame:
+        """
+        Serie diaria preparada de un par, memoizada por versión del dataset.
+
+        Una serie preparada con una versión anterior se sigue usando si las
+        transacciones del par no cambiaron desde entonces (por ejemplo, si
+        solo se ingirieron filas de otros pares). El DataFrame devuelto es
+        compartido entre peticiones y no debe mutarse.
+        """
+        key = (product_id, store_id)
+        cached = self._series_cache.get(key)
+        if cached is not None and snapshot.unchanged_since(product_id, store_id, cached[0]):
+            return cached[1]
+
+        # Una recarga completa del dataset invalida todas las series preparadas
+        if self._cached_version is None or self._cached_version < snapshot.base_version:
+            self._series_cache.clear()
+        self._cached_version = max(self._cached_version or 0, snapshot.version)
+
+        with stage_duration.time(stage="series_preparation"):
+            prepared = self.prepare_time_series(
+                snapshot.get_series_rows(product_id, store_id), product_id, store_id
+            )
+        self._series_cache.put(key, (snapshot.version, prepared))
+        return prepared
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        return {**self._series_cache.stats(), "dataset_version": self._cached_version}
+
     def get_future_prices(
             self,
-            raw_data: pd.DataFrame,
-            product_id: str,
-            store_id: str,
+            historical_data: pd.DataFrame,
             start_date: pd.Timestamp,
             periods: int
     ) -> pd.Series:
         """
-        Genera los precios futuros para un producto y tienda específicos.
+        Genera los precios futuros a partir de la serie histórica ya preparada.
         """
-        # Obtener los datos históricos del producto y tienda específicos
-        historical_data = self.prepare_time_series(raw_data, product_id, store_id)
-
         if isinstance(historical_data, pd.DataFrame):
             if 'Price' in historical_data.columns:
                 historical_prices = historical_data['Price']
@@ -39,31 +80,31 @@ class DataPreparationService:
 
     def prepare_time_series(self, df: pd.DataFrame, product_id: str, store_id: str) -> pd.DataFrame:
         """Prepara los datos para el modelo de series temporales."""
-        log.info(f"Preparing data for ProductID {product_id} and StoreID {store_id}\n")
+        log.debug("Preparing data for ProductID %s and StoreID %s", product_id, store_id)
         try:
             # Filtrar por producto y tienda
             mask = (df['ProductID'] == product_id) & (df['StoreID'] == store_id)
-            log.info(f"Data filtered for ProductID {product_id} and StoreID {store_id}\n")
             product_data = df[mask].copy()
-            log.info(f"Data filtered for ProductID {product_id} and StoreID {store_id}")
+            log.debug("Data filtered for ProductID %s and StoreID %s", product_id, store_id)
 
             if product_data.empty:
                 raise ValueError(f"No data found for ProductID {product_id} and StoreID {store_id}")
 
             # Convertir fecha a datetime si no lo está
-            product_data['Date'] = pd.to_datetime(product_data['Date'])
-            log.info("Date column converted to datetime")
+            if not pd.api.types.is_datetime64_any_dtype(product_data['Date']):
+                product_data['Date'] = pd.to_datetime(product_data['Date'])
+                log.debug("Date column converted to datetime")
 
             # Agregar por día (en caso de múltiples transacciones por día)
             daily_data = product_data.groupby('Date').agg({
                 'Quantity': 'sum',
                 'Price': 'mean'  # Promedio del precio por día
             }).reset_index()
-            log.info("Data aggregated by day")
+            log.debug("Data aggregated by day")
 
             # Ordenar por fecha
             daily_data = daily_data.sort_values('Date')
-            log.info("Data sorted by date")
+            log.debug("Data sorted by date")
 
             # Rellenar fechas faltantes con 0 en cantidad
             date_range = pd.date_range(
@@ -71,14 +112,14 @@ class DataPreparationService:
                 end=daily_data['Date'].max(),
                 freq='D'
             )
-            log.info("Date range created")
+            log.debug("Date range created")
 
             full_data = daily_data.set_index('Date').reindex(date_range)
-            log.info("Date range reindexed")
+            log.debug("Date range reindexed")
             full_data['Quantity'] = full_data['Quantity'].fillna(0)
-            log.info("Quantity column filled with 0 for missing dates")
+            log.debug("Quantity column filled with 0 for missing dates")
             full_data['Price'] = full_data['Price'].ffill()  # Forward fill para precios
-            log.info("Price column forward filled for missing dates")
+            log.debug("Price column forward filled for missing dates")
             return full_data
 
         except Exception as e:
@@ -0,0 +1,175 @@
+import itertools
+import math
+import time
+import warnings
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from statsmodels.tools.sm_exceptions import ConvergenceWarning
+
+from models.sarimax_fit import build_sarimax, fit_sarimax
+from services.training_job_service import TrainingJobService
+from settings.logger import setup_logger
+
+log = setup_logger()
+
+# Iteraciones del ajuste completo de un candidato si los parámetros no fijan
+# `maxiter` (valor por defecto de statsmodels)
+FULL_FIT_MAXITER = 50
+
+
+def fit_candidate(
+        prepared_data: pd.DataFrame,
+        model_params: Dict[str, Any],
+        maxiter: int,
+        start_params: Optional[List[float]] = None
+) -> Dict[str, Any]:
+    """
+    Ajusta un candidato de la búsqueda sin guardarlo. Se ejecuta en un proceso
+    del pool de entrenamiento y devuelve solo las métricas y los parámetros,
+    que sirven como punto de partida si el candidato pasa a la siguiente etapa
+    y, si resulta elegido, para guardarlo sin volver a ajustarlo.
+    """
+    start = time.perf_counter()
+    model = build_sarimax(prepared_data, model_params)
+    with warnings.catch_warnings():
+        # En la etapa corta no converger es lo esperado; se reporta en `converged`
+        warnings.simplefilter("ignore", ConvergenceWarning)
+        fitted, mle_retvals = fit_sarimax(prepared_data, model, model_params, start_params, maxiter)
+    return {
+        "aic": float(fitted.aic),
+        "bic": float(fitted.bic),
+        "params": np.asarray(fitted.params, dtype=float).tolist(),
+        "converged": bool(mle_retvals.get('converged', True)),
+        "iterations": mle_retvals.get('iterations'),
+        "fit_seconds": round(time.perf_counter() - start, 4)
+    }
+
+
+class OrderSearchService:
+    """
+    Selección automática de (p,d,q)(P,D,Q,s) sobre una grilla de órdenes.
+
+    La búsqueda tiene dos etapas sobre el pool de entrenamiento. Primero todos
+    los candidatos se ajustan con pocas iteraciones; los que ya convergen
+    quedan evaluados y los que quedan a más de `prune_margin` del mejor
+    criterio se descartan. Los sobrevivientes se terminan de ajustar partiendo
+    de los parámetros de la primera etapa.
+
+    La diferenciación no se comparte entre candidatos: cada uno la hace dentro
+    de su propio modelo de espacio de estados (o sobre su propia copia de la
+    serie con `simple_differencing`). Diferenciar cuesta O(n) y es
+    despreciable frente al ajuste. Además, preservar la diferenciación en el
+    estado mantiene los criterios comparables entre candidatos con distinto
+    `d`/`D`, cosa que no ocurriría con una serie diferenciada de antemano.
+    """
+
+    def __init__(self, training_job_service: TrainingJobService):
+        self.training_jobs = training_job_service
+
+    @staticmethod
+    def candidates(grid: Dict[str, Any], base_params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Parámetros de modelo de cada combinación de la grilla."""
+        combinations = itertools.product(grid['p'], grid['d'], grid['q'], grid['P'], grid['D'], grid['Q'])
+        candidates = [
+            {**base_params, 'order': [p, d, q], 'seasonal_order': [P, D, Q, grid['s']]}
+            for p, d, q, P, D, Q in combinations
+        ]
+        if len(candidates) > grid['max_candidates']:
+            raise ValueError(
+                f"The order grid has {len(candidates)} candidates; the limit is {grid['max_candidates']}"
+            )
+        return candidates
+
+    async def search(
+            self,
+            prepared_data: pd.DataFrame,
+            base_params: Dict[str, Any],
+            grid: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """
+        Busca el mejor orden para una serie ya preparada y devuelve el
+        candidato elegido (con sus parámetros) y la tabla de candidatos.
+        """
+        start = time.perf_counter()
+        criterion = grid['criterion']
+        candidates = self.candidates(grid, base_params)
+
+        # Etapa 1: ajuste corto de todos los candidatos
+        screening = await self.training_jobs.run_many(
+            fit_candidate,
+            [(prepared_data, params, grid['screening_maxiter']) for params in candidates]
+        )
+        entries = []
+        for params, result in zip(candidates, screening):
+            entry = {"order": params['order'], "seasonal_order": params['seasonal_order']}
+            if isinstance(result, Exception) or not math.isfinite(result[criterion]):
+                entry.update(status="failed", error=str(result) if isinstance(result, Exception) else
+                             f"non-finite {criterion}")
+            else:
+                entry.update(result, status="fitted" if result["converged"] else "screened")
+                entry["screening_" + criterion] = result[criterion]
+            entries.append(entry)
+
+        scored = [entry for entry in entries if entry["status"] != "failed"]
+        if not scored:
+            raise ValueError("No candidate order could be fitted")
+        threshold = min(entry[criterion] for entry in scored) + grid['prune_margin']
+
+        # Etapa 2: completar el ajuste de los candidatos no dominados
+        survivors = []
+        for entry in scored:
+            if entry["status"] == "screened":
+                if entry[criterion] > threshold:
+                    entry["status"] = "pruned"
+                else:
+                    survivors.append(entry)
+
+        refits = await self.training_jobs.run_many(
+            fit_candidate,
+            [
+                (prepared_data, {**base_params, 'order': entry['order'], 'seasonal_order': entry['seasonal_order']},
+                 base_params.get('maxiter') or FULL_FIT_MAXITER, entry['params'])
+                for entry in survivors
+            ]
+        )
+        for entry, result in zip(survivors, refits):
+            if isinstance(result, Exception) or not math.isfinite(result[criterion]):
+                entry["status"] = "failed"
+                entry["error"] = str(result) if isinstance(result, Exception) else f"non-finite {criterion}"
+            else:
+                entry.update(result, status="fitted")
+
+        fitted = [entry for entry in entries if entry["status"] == "fitted"]
+        if not fitted:
+            raise ValueError("No candidate order could be fitted")
+        # Preferir candidatos que convergieron; entre ellos, el de menor criterio
+        chosen = min(fitted, key=lambda entry: (not entry["converged"], entry[criterion]))
+
+        order_rank = {"fitted": 0, "pruned": 1, "failed": 2}
+        leaderboard = sorted(
+            entries,
+            key=lambda entry: (order_rank.get(entry["status"], 1), entry.get(criterion, math.inf))
+        )
+        search_seconds = time.perf_counter() - start
+        log.info(
+            f"Búsqueda de orden: {len(candidates)} candidatos, {len(survivors)} reajustados, "
+            f"elegido {chosen['order']}x{chosen['seasonal_order']} en {search_seconds:.2f}s"
+        )
+
+        return {
+            "chosen": chosen,
+            "summary": {
+                "criterion": criterion,
+                "chosen": {"order": chosen["order"], "seasonal_order": chosen["seasonal_order"]},
+                "candidates": len(candidates),
+                "pruned": sum(entry["status"] == "pruned" for entry in entries),
+                "failed": sum(entry["status"] == "failed" for entry in entries),
+                "search_seconds": round(search_seconds, 4),
+                "leaderboard": [
+                    {key: value for key, value in entry.items() if key != "params"}
+                    for entry in leaderboard
+                ]
+            }
+        }
@@ -0,0 +1,118 @@
+import asyncio
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from services.arima_prediction_service import ArimaPredictionService, ForecastRequest, _prices_key
+from settings.logger import setup_logger
+
+log = setup_logger()
+
+
+class PredictCoalescer:
+    """
+    Agrupa las predicciones concurrentes en lotes.
+
+    Las peticiones que llegan dentro de una ventana de `window_seconds` se
+    juntan y se resuelven con una sola llamada a
+    `ArimaPredictionService.forecast_many_with_etag`, que comparte el
+    snapshot del dataset, las series preparadas y los modelos cargados. Las
+    peticiones idénticas (mismo par, `steps` y precios) se calculan una sola
+    vez y todas reciben el mismo resultado. El lote se ejecuta en el pool de
+    hilos del event loop, que mientras tanto sigue aceptando peticiones.
+
+    La latencia agregada está acotada por la ventana: el lote se lanza al
+    vencer la ventana o antes, al juntar `max_batch` peticiones distintas.
+    Con `window_seconds` <= 0 cada petición va directo al servicio.
+    """
+
+    def __init__(self, service: ArimaPredictionService, window_seconds: float = 0.0, max_batch: int = 256):
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self.service = service
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self._pending: Dict[Tuple[Any, ...], "asyncio.Future[Tuple[Dict[str, Any], str]]"] = {}
+        self._batch: List[Tuple[Tuple[Any, ...], ForecastRequest]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self.requests = 0
+        self.deduplicated = 0
+        self.batches = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.window_seconds > 0
+
+    async def predict_with_etag(
+            self,
+            steps: int,
+            product_id: str,
+            store_id: str,
+            future_prices: Optional[pd.Series] = None
+    ) -> Tuple[Dict[str, Any], str]:
+        """Mismo contrato que `ArimaPredictionService.predict_with_etag`, resuelto en lote."""
+        if not self.enabled:
+            return await self.service.predict_with_etag(steps, product_id, store_id, future_prices)
+
+        self.requests += 1
+        key = (product_id, store_id, steps, _prices_key(future_prices))
+        future = self._pending.get(key)
+        if future is not None:
+            self.deduplicated += 1
+        else:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            self._batch.append((key, (steps, product_id, store_id, future_prices)))
+            if len(self._batch) >= self.max_batch:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window_seconds, self._flush)
+        # shield: si el cliente se desconecta, el resultado sigue llegando a los demás
+        return await asyncio.shield(future)
+
+    def _flush(self) -> None:
+        """Lanza el lote acumulado; se ejecuta siempre en el event loop."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._batch = self._batch, []
+        if not batch:
+            return
+        self.batches += 1
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Tuple[Any, ...], ForecastRequest]]) -> None:
+        loop = asyncio.get_running_loop()
+        try:
+            outcomes = await loop.run_in_executor(
+                None, self.service.forecast_many_with_etag, [request for _, request in batch]
+            )
+        except Exception as e:
+            outcomes = [e] * len(batch)
+
+        for (key, _), outcome in zip(batch, outcomes):
+            future = self._pending.pop(key)
+            if future.done():
+                continue
+            if isinstance(outcome, Exception):
+                log.error(f"Error generando predicciones: {str(outcome)}")
+                future.set_exception(ValueError(f"Error generando predicciones: {str(outcome)}"))
+                # Evita el aviso de excepción no leída si todos los clientes se desconectaron
+                future.exception()
+            else:
+                future.set_result(outcome)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "window_seconds": self.window_seconds,
+            "max_batch": self.max_batch,
+            "requests": self.requests,
+            "deduplicated": self.deduplicated,
+            "batches": self.batches,
+            "pending": len(self._pending),
+        }
@@ -1,5 +1,5 @@
-from typing import Optional, Dict, Any
-import pandas as pd
+from typing import Optional, Dict, Any, List
+import numpy as np
 from settings.logger import setup_logger
 from repositories.model_prediction_repository import PredictionRepository
 
@@ -17,51 +17,24 @@ class TopProductService:
             store_id: Optional[str] = None
     ) -> Dict[str, Any]:
         try:
-            # Cargar datos usando el PredictionRepository
-            raw_data = self.repository.load_data()
-
-            # Log para debugging
-            log.info(f"Columns in raw_data: {raw_data.columns.tolist()}")
-
-            # Renombrar columnas para coincidir con el formato esperado
-            column_mapping = {
-                'Date': 'date',
-                'ProductID': 'product_id',
-                'StoreID': 'store_id',
-                'Quantity': 'quantity',
-                'Price': 'price'
-            }
-
-            # Renombrar las columnas
-            raw_data = raw_data.rename(columns=column_mapping)
-
-            # Convertir fechas
-            raw_data['date'] = pd.to_datetime(raw_data['date'])
-            mask = (raw_data['date'] >= pd.to_datetime(start_date)) & \
-                   (raw_data['date'] <= pd.to_datetime(end_date))
+            # Los totales salen del cubo de ventas del snapshot actual, que se
+            # reconstruye cuando cambia el dataset
+            sales_cube = self.repository.load_snapshot().sales_cube
+            products, totals = sales_cube.product_totals(start_date, end_date, store_id)
+            quantity, price_sum, price_count, rows = totals.T
 
-            filtered_data = raw_data[mask]
-            log.info(f"Filtered data by date range: {filtered_data.shape} rows")
-
-            # Aplicar filtro de tienda si se especifica
-            if store_id:
-                filtered_data = filtered_data[filtered_data['store_id'] == store_id]
-                log.info(f"Filtered data by store: {filtered_data.shape} rows")
-
-            if filtered_data.empty:
+            if not rows.any():
                 raise ValueError("No se encontraron datos para el período especificado")
 
-            # Agrupar por producto y calcular métricas
-            product_stats = filtered_data.groupby('product_id').agg({
-                'quantity': 'sum',
-                'price': 'mean',
-            }).reset_index()
-
-            # Calcular ventas totales
-            product_stats['total_sales'] = product_stats['quantity'] * product_stats['price']
-
-            # Encontrar el producto más vendido por cantidad
-            top_product = product_stats.loc[product_stats['quantity'].idxmax()]
+            # Encontrar el producto más vendido por cantidad entre los que tienen ventas en el rango
+            top_index = int(np.argmax(np.where(rows > 0, quantity, -np.inf)))
+            average_price = price_sum[top_index] / price_count[top_index] if price_count[top_index] else np.nan
+            top_product = {
+                'product_id': products[top_index],
+                'quantity': quantity[top_index],
+                'price': average_price,
+                'total_sales': quantity[top_index] * average_price
+            }
 
             # Construir la respuesta con los tipos correctos según TopProductResponse
             return {
@@ -79,4 +52,111 @@ class TopProductService:
         except Exception as e:
             log.error(f"Error finding top product: {str(e)}")
             log.error(f"Full error traceback:", exc_info=True)
-            raise ValueError(f"Error finding top product: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error finding top product: {str(e)}")
+
+    @staticmethod
+    def _rank(
+            product_ids: np.ndarray,
+            quantity: np.ndarray,
+            price_sum: np.ndarray,
+            price_count: np.ndarray,
+            n: int,
+            metric: str
+    ) -> List[Dict[str, Any]]:
+        """
+        Los `n` mejores productos según `metric` mediante selección parcial:
+        argpartition separa los `n` primeros en O(productos) y solo ellos se
+        ordenan.
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            average_price = np.where(price_count > 0, price_sum / price_count, np.nan)
+        sales = quantity * average_price
+        score = np.nan_to_num(quantity if metric == "quantity" else sales, nan=-np.inf)
+
+        if n < len(score):
+            candidates = np.argpartition(-score, n - 1)[:n]
+        else:
+            candidates = np.arange(len(score))
+        # Orden estable por puntaje descendente; en empate, el primero en el catálogo
+        top = candidates[np.lexsort((candidates, -score[candidates]))]
+
+        columns = zip(
+            product_ids[top].tolist(),
+            np.round(quantity[top]).astype(np.int64).tolist(),
+            np.round(average_price[top], 2).tolist(),
+            np.round(sales[top], 2).tolist()
+        )
+        return [
+            {
+                "rank": rank,
+                "product_id": str(product_id),
+                "total_quantity": total_quantity,
+                "average_price": price,
+                "total_sales": total_sales
+            }
+            for rank, (product_id, total_quantity, price, total_sales) in enumerate(columns, start=1)
+        ]
+
+    async def get_top_products(
+            self,
+            start_date: str,
+            end_date: str,
+            n: int = 50,
+            metric: str = "quantity",
+            store_id: Optional[str] = None,
+            by_store: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Ranking de los `n` productos más vendidos por cantidad o por ventas.
+        Con `by_store` devuelve un ranking por tienda, todos calculados sobre
+        una sola consulta al cubo de ventas.
+        """
+        try:
+            sales_cube = self.repository.load_snapshot().sales_cube
+
+            if by_store:
+                product_codes, store_codes, sums = sales_cube.series_totals(start_date, end_date, store_id)
+                # Solo cuentan los pares con transacciones en el rango
+                active = sums[:, 3] > 0
+                product_codes, store_codes, sums = product_codes[active], store_codes[active], sums[active]
+
+                order = np.argsort(store_codes, kind='stable')
+                product_codes, store_codes, sums = product_codes[order], store_codes[order], sums[order]
+                boundaries = np.flatnonzero(np.r_[True, store_codes[1:] != store_codes[:-1], True])
+                product_ids = sales_cube.products.to_numpy()
+                rankings = [
+                    {
+                        "store_id": str(sales_cube.stores[store_codes[start]]),
+                        "products": self._rank(
+                            product_ids[product_codes[start:stop]], sums[start:stop, 0],
+                            sums[start:stop, 1], sums[start:stop, 2], n, metric
+                        )
+                    }
+                    for start, stop in zip(boundaries[:-1], boundaries[1:])
+                ] if len(sums) else []
+            else:
+                products, totals = sales_cube.product_totals(start_date, end_date, store_id)
+                present = totals[:, 3] > 0
+                rankings = [{
+                    "store_id": store_id,
+                    "products": self._rank(
+                        products[present], totals[present, 0], totals[present, 1], totals[present, 2], n, metric
+                    )
+                }] if present.any() else []
+
+            if not rankings:
+                raise ValueError("No se encontraron datos para el período especificado")
+
+            return {
+                "metric": metric,
+                "n": n,
+                "period": {
+                    "start_date": start_date,
+                    "end_date": end_date
+                },
+                "rankings": rankings
+            }
+
+        except Exception as e:
+            log.error(f"Error ranking top products: {str(e)}")
+            raise ValueError(f"Error ranking top products: {str(e)}")
@@ -0,0 +1,210 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from settings.logger import DEFAULT_LOG_LEVEL, configure_log_level, setup_logger
+
+log = setup_logger()
+
+
+class TrainingQueueFullError(RuntimeError):
+    """El pool de entrenamiento no admite más trabajos pendientes."""
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class TrainingJobService:
+    """
+    Ejecuta los ajustes de modelos en un pool de procesos.
+
+    Los ajustes de SARIMAX son CPU-bound y bloquearían el event loop de
+    uvicorn; aquí se delegan a procesos hijos. Además mantiene un registro
+    en memoria de los trabajos lanzados en segundo plano para poder
+    consultar su estado (queued/running/done/failed).
+    """
+
+    def __init__(
+            self,
+            pool_size: int = 0,
+            queue_depth: int = 32,
+            max_finished_jobs: int = 1000,
+            log_level: str = DEFAULT_LOG_LEVEL
+    ):
+        self.pool_size = pool_size or os.cpu_count() or 1
+        self.queue_depth = queue_depth
+        self.max_finished_jobs = max_finished_jobs
+        self.log_level = log_level
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._outstanding = 0
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._futures: Dict[str, Future] = {}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn evita heredar hilos y locks del proceso de uvicorn; por eso
+            # el nivel de log se pasa explícitamente a cada proceso
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.pool_size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=configure_log_level,
+                initargs=(self.log_level,)
+            )
+        return self._executor
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> Future:
+        with self._lock:
+            if self._outstanding >= self.pool_size + self.queue_depth:
+                raise TrainingQueueFullError(
+                    f"Training queue is full ({self._outstanding} jobs pending or running)"
+                )
+            self._outstanding += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except Exception:
+            with self._lock:
+                self._outstanding -= 1
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._outstanding -= 1
+
+    def submit(self, fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        """
+        Encola `fn(*args)` en el pool y devuelve un future de asyncio.
+
+        Lanza TrainingQueueFullError de inmediato si el pool está lleno.
+        """
+        return asyncio.wrap_future(self._submit(fn, *args))
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Ejecuta `fn(*args)` en el pool y espera su resultado sin bloquear el event loop."""
+        return await self.submit(fn, *args)
+
+    async def run_many(self, fn: Callable[..., Any], arg_tuples: Sequence[Tuple[Any, ...]]) -> List[Any]:
+        """
+        Ejecuta `fn(*args)` para cada tupla de argumentos con a lo sumo
+        `pool_size` tareas en vuelo, y devuelve los resultados en el mismo
+        orden. Una tarea que falla devuelve su excepción en lugar de
+        interrumpir al resto; si el pool está lleno se espera y se reintenta.
+        """
+        results: List[Any] = [None] * len(arg_tuples)
+        pending = list(range(len(arg_tuples)))[::-1]
+        in_flight: Dict["asyncio.Future[Any]", int] = {}
+
+        while pending or in_flight:
+            while pending and len(in_flight) < self.pool_size:
+                position = pending.pop()
+                try:
+                    in_flight[self.submit(fn, *arg_tuples[position])] = position
+                except TrainingQueueFullError:
+                    pending.append(position)
+                    break
+
+            if not in_flight:
+                await asyncio.sleep(0.5)
+                continue
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                position = in_flight.pop(future)
+                results[position] = future.exception() or future.result()
+        return results
+
+    def submit_job(self, fn: Callable[..., Any], *args: Any, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Lanza `fn(*args)` en segundo plano y devuelve el trabajo registrado."""
+        future = self._submit(fn, *args)
+        job_id = uuid.uuid4().hex
+        job = {
+            "job_id": job_id,
+            "status": "queued",
+            "submitted_at": _now(),
+            "finished_at": None,
+            "result": None,
+            "error": None,
+            **(metadata or {}),
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+            self._futures[job_id] = future
+        future.add_done_callback(lambda done: self._finish_job(job_id, done))
+        return self.get_job(job_id)
+
+    def _finish_job(self, job_id: str, future: Future) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job["finished_at"] = _now()
+            error = future.exception()
+            if error is None:
+                job["status"] = "done"
+                job["result"] = future.result()
+            else:
+                job["status"] = "failed"
+                job["error"] = str(error)
+                log.error("Trabajo de entrenamiento %s falló: %s", job_id, error)
+            self._futures.pop(job_id, None)
+            self._prune_finished()
+
+    def _prune_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("done", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def _status(self, job_id: str, job: Dict[str, Any]) -> str:
+        """
+        Estado actual del trabajo; se llama con el lock tomado. Mientras no
+        termina, "queued" o "running" se deduce del future, de modo que no
+        depende de que alguien consulte el trabajo. ProcessPoolExecutor marca
+        como iniciado también el trabajo que ya pasó a su cola de llamadas,
+        así que puede haber uno "running" más que procesos del pool.
+        """
+        future = self._futures.get(job_id)
+        if job["status"] == "queued" and future is not None and future.running():
+            job["status"] = "running"
+        return job["status"]
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            self._status(job_id, job)
+            return dict(job)
+
+    def find_active_job(self, **metadata: Any) -> Optional[Dict[str, Any]]:
+        """Trabajo en cola o en curso cuyos metadatos coinciden con `metadata`, si existe."""
+        with self._lock:
+            job_ids = [
+                job_id for job_id, job in self._jobs.items()
+                if self._status(job_id, job) in ("queued", "running")
+                and all(job.get(name) == value for name, value in metadata.items())
+            ]
+        return self.get_job(job_ids[0]) if job_ids else None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            statuses = [self._status(job_id, job) for job_id, job in self._jobs.items()]
+            return {
+                "pool_size": self.pool_size,
+                "queue_depth": self.queue_depth,
+                "outstanding": self._outstanding,
+                "jobs": {status: statuses.count(status) for status in ("queued", "running", "done", "failed")},
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -1,3 +1,5 @@
+from typing import List, Tuple
+
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 from settings.logger import setup_logger
@@ -12,8 +14,50 @@ class Settings(BaseSettings):
     database_connection: str
     dataset_id: str
     dataset_file: str
+    series_cache_max_entries: int = 2048
+    series_cache_max_bytes: int = 256 * 1024 * 1024
+    model_cache_max_entries: int = 256
+    model_cache_max_bytes: int = 512 * 1024 * 1024
+    forecast_cache_max_entries: int = 4096
+    forecast_cache_max_bytes: int = 64 * 1024 * 1024
+    # "per_model" llama a forecast de cada modelo; "vectorized" proyecta los lotes juntos
+    forecast_backend: str = "per_model"
+    # Ventana en milisegundos para agrupar predicciones concurrentes (0 = sin agrupar)
+    predict_coalesce_window_ms: float = 0.0
+    # Peticiones distintas por lote agrupado; al llegar a este número el lote sale sin esperar la ventana
+    predict_coalesce_max_batch: int = 256
+    # Pares sin modelo entrenado se responden con el pronóstico estacional ingenuo
+    baseline_fallback: bool = True
+    # Semanas promediadas por el pronóstico de referencia
+    baseline_seasons: int = 4
+    # "full" guarda el SARIMAXResults completo; "compact" solo parámetros y estado final
+    model_artifact_format: str = "full"
+    # Procesos del pool de entrenamiento (0 = número de CPUs) y trabajos en espera
+    training_pool_size: int = 0
+    training_queue_depth: int = 32
+    # Iteraciones máximas del optimizador cuando se parte de un modelo previo
+    warm_start_maxiter: int = 20
+    # Pares "producto:tienda" separados por comas que se precargan al iniciar
+    model_cache_prewarm: str = ""
+    # "memory" carga el dataset completo; "partitioned" lo lee por tienda desde disco;
+    # "shared" lo publica una vez en archivos mapeados en memoria que comparten los workers
+    dataset_storage: str = "memory"
+    # Buckets de ProductID dentro de cada tienda (0 = solo por tienda)
+    dataset_partition_buckets: int = 0
+    # Memoria máxima para particiones cargadas; también fija el bloque de lectura del CSV
+    dataset_memory_budget_bytes: int = 1024 * 1024 * 1024
+    # Nivel del logger "LOGS"; DEBUG muestra los pasos internos de cada predicción
+    log_level: str = "INFO"
 
     class Config:
         env_file = ".env"  # Archivo desde donde se cargarán las variables de entorno
         env_file_encoding = "utf-8"  # Codificación del archivo
 
+    def prewarm_pairs(self) -> List[Tuple[str, str]]:
+        pairs = []
+        for item in self.model_cache_prewarm.split(","):
+            if ":" in item:
+                product_id, store_id = item.strip().split(":", 1)
+                pairs.append((product_id, store_id))
+        return pairs
+
@@ -1,9 +1,17 @@
 import logging
 
+# Nivel hasta que se aplica el de Settings (ver `configure_log_level`)
+DEFAULT_LOG_LEVEL = "INFO"
+
+
 def setup_logger():
-    # Configurar el logger
+    # El logger se configura una sola vez; las llamadas siguientes (una por
+    # módulo al importarse) reutilizan el mismo handler
     logger = logging.getLogger("LOGS")
-    logger.setLevel(logging.INFO)
+    if logger.handlers:
+        return logger
+
+    logger.setLevel(DEFAULT_LOG_LEVEL)
 
     # Configurar el formato de los logs
     formatter = logging.Formatter('%(asctime)s - %(filename)s - %(levelname)s - %(message)s')
@@ -16,3 +24,12 @@ def setup_logger():
     logger.addHandler(console_handler)
 
     return logger
+
+
+def configure_log_level(level: str) -> None:
+    """
+    Fija el nivel del logger "LOGS". El nivel sale siempre de
+    `Settings.log_level`: lo aplica main.py en el proceso de uvicorn y el
+    inicializador del pool en cada proceso de entrenamiento.
+    """
+    setup_logger().setLevel(level.upper())
@@ -0,0 +1,39 @@
+import time
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from repositories.transaction_journal import typed_transactions
+
+
+class IngestTransactionsUseCase:
+    """
+    Incorpora transacciones nuevas sin recargar el CSV: se persisten en el
+    journal del dataset y se agregan al snapshot en memoria, su índice de
+    series y el cubo de ventas.
+    """
+
+    def __init__(self, repository):
+        self.repository = repository
+
+    def execute(self, transactions: List[Dict[str, Any]]) -> Dict[str, Any]:
+        start = time.perf_counter()
+        try:
+            rows = typed_transactions(pd.DataFrame(transactions).rename(columns={
+                'date': 'Date',
+                'product_id': 'ProductID',
+                'store_id': 'StoreID',
+                'quantity': 'Quantity',
+                'price': 'Price'
+            }))
+        except Exception as e:
+            raise ValueError(f"Invalid transactions: {str(e)}")
+
+        snapshot = self.repository.ingest_transactions(rows)
+        return {
+            "ingested_rows": len(rows),
+            "pairs": int(rows[['ProductID', 'StoreID']].drop_duplicates().shape[0]),
+            "dataset_version": snapshot.version,
+            "total_rows": snapshot.row_count,
+            "ingest_seconds": round(time.perf_counter() - start, 4)
+        }
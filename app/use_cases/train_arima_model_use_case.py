@@ -1,26 +1,179 @@
-from statsmodels.tsa.statespace.sarimax import SARIMAX
-from typing import Dict, Any, Optional
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Any, Optional, Tuple, List, AsyncIterator
 
+import numpy as np
+import pandas as pd
+
+from metrics.registry import stage_duration
+from models.compact_arima_model import CompactArimaModel
+from models.sarimax_fit import TRAINING_PROFILES, build_sarimax, filter_sarimax, fit_sarimax, stored_param_names
+from repositories.dataset_cache import BaseSnapshot
+from repositories.model_prediction_repository import PredictionRepository
 from services.data_preparation_service import DataPreparationService
+from services.order_search_service import OrderSearchService
+from services.training_job_service import TrainingJobService, TrainingQueueFullError
+from use_cases.update_arima_model_use_case import update_and_save_model
+
+
+def _stored_spec(model: Any) -> Dict[str, Any]:
+    if isinstance(model, CompactArimaModel):
+        return model.spec
+    return {
+        'order': model.model.order,
+        'seasonal_order': model.model.seasonal_order,
+        'trend': model.model.trend,
+    }
+
+
+def _warm_start_params(
+        repository: PredictionRepository,
+        product_id: str,
+        store_id: str,
+        model: Any,
+        model_params: Dict[str, Any]
+) -> Tuple[Optional[np.ndarray], Optional[str]]:
+    """
+    Parámetros del modelo guardado para usarlos como punto de partida, o el
+    motivo por el que no se pueden reutilizar.
+    """
+    previous = repository.load_model(product_id, store_id)
+    if previous is None:
+        return None, "no stored model"
+
+    spec = _stored_spec(previous)
+    for key in ('order', 'seasonal_order', 'trend'):
+        if key in spec and list(np.atleast_1d(spec[key])) != list(np.atleast_1d(model_params[key])):
+            return None, f"{key} changed"
+
+    param_names = previous.param_names if isinstance(previous, CompactArimaModel) else list(previous.model.param_names)
+    if param_names != stored_param_names(model):
+        return None, "parameter names changed"
+
+    return np.asarray(previous.params, dtype=float), None
+
+
+def fit_and_save_model(
+        prepared_data: pd.DataFrame,
+        product_id: str,
+        store_id: str,
+        model_params: Dict[str, Any],
+        warm_start: bool = False,
+        warm_start_maxiter: int = 20,
+        fitted_params: Optional[List[float]] = None
+) -> Dict[str, Any]:
+    """
+    Ajusta el SARIMAX de un par y lo guarda. Se ejecuta en un proceso del pool
+    de entrenamiento, por lo que construye su propio repositorio.
+
+    Con `warm_start` el optimizador parte de los parámetros del modelo ya
+    guardado, con un límite de iteraciones más estricto. Si la
+    especificación cambió o el ajuste no converge, se reajusta desde cero.
+    Las opciones de ajuste de `model_params` (optimizador, iteraciones, bajo
+    consumo de memoria) se aplican en ambos casos.
+
+    Con `fitted_params`, los parámetros ya estimados del candidato elegido en
+    la búsqueda automática de orden, no se vuelve a optimizar: el modelo se
+    filtra una vez con esos parámetros y se guarda.
+    """
+    try:
+        start = time.perf_counter()
+        repository = PredictionRepository()
+
+        fitted_model = None
+        start_mode = "cold"
+        warm_start_fallback = None
+        if fitted_params is not None:
+            # Candidato ya estimado en la búsqueda de orden: solo se filtra
+            fitted_model, mle_retvals = filter_sarimax(prepared_data, model_params, fitted_params), {}
+            start_mode = "search"
+        else:
+            # Entrenar modelo
+            model = build_sarimax(prepared_data, model_params)
+
+            start_params = None
+            if warm_start:
+                start_params, warm_start_fallback = _warm_start_params(
+                    repository, product_id, store_id, model, model_params
+                )
+            if start_params is not None:
+                try:
+                    fitted_model, mle_retvals = fit_sarimax(
+                        prepared_data, model, model_params, start_params=start_params, maxiter=warm_start_maxiter
+                    )
+                    start_mode = "warm"
+                    if not mle_retvals.get('converged', True):
+                        fitted_model, start_mode = None, "cold"
+                        warm_start_fallback = "warm start did not converge"
+                except Exception as e:
+                    warm_start_fallback = f"warm start failed: {str(e)}"
+
+            if fitted_model is None:
+                fitted_model, mle_retvals = fit_sarimax(prepared_data, model, model_params)
+        fit_seconds = time.perf_counter() - start
+
+        # Guardar modelo
+        repository.save_model(
+            model=fitted_model, product_id=product_id, store_id=store_id)
+
+        # Preparar métricas y respuesta
+        return {
+            "model_info": {
+                "aic": fitted_model.aic,
+                "bic": fitted_model.bic,
+                "parameters": model_params,
+                "fit_seconds": round(fit_seconds, 4),
+                "iterations": mle_retvals.get('iterations'),
+                "start": start_mode,
+                "warm_start_fallback": warm_start_fallback
+            },
+            "data_info": {
+                "training_start": prepared_data.index[0].strftime('%Y-%m-%d'),
+                "training_end": prepared_data.index[-1].strftime('%Y-%m-%d'),
+                "total_observations": len(prepared_data)
+            }
+        }
+
+    except Exception as e:
+        raise ValueError(f"Error training model: {str(e)}")
+
+
+def _observe_fit(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Registra en las métricas el tiempo de ajuste medido en el proceso del pool."""
+    fit_seconds = result.get("model_info", {}).get("fit_seconds")
+    if fit_seconds is not None:
+        stage_duration.observe(fit_seconds, stage="fit")
+    return result
 
 
 class TrainARIMAUseCase:
-    def __init__(self, repository, data_preparation_service: DataPreparationService):
+    def __init__(
+            self,
+            repository,
+            data_preparation_service: DataPreparationService,
+            training_job_service: TrainingJobService,
+            order_search_service: OrderSearchService,
+            warm_start_maxiter: int = 20
+    ):
         self.repository = repository
         self.data_preparation = data_preparation_service
+        self.training_jobs = training_job_service
+        self.order_search = order_search_service
+        self.warm_start_maxiter = warm_start_maxiter
 
-    async def execute(
+    def _prepare(
             self,
             product_id: str,
             store_id: str,
-            parameters: Optional[Dict[str, Any]] = None
-    ) -> Dict[str, Any]:
+            parameters: Optional[Any] = None,
+            snapshot: Optional[BaseSnapshot] = None,
+            profile: str = "default"
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
         try:
             # Cargar y preparar datos
-            raw_data = self.repository.load_data()  # Cargar dataset completo
-            prepared_data = self.data_preparation.prepare_time_series(
-                raw_data, product_id, store_id
-            )
+            snapshot = snapshot or self.repository.load_snapshot()
+            prepared_data = self.data_preparation.get_time_series(snapshot, product_id, store_id)
 
             # Configurar parámetros del modelo
             default_params = {
@@ -31,36 +184,168 @@ class TrainARIMAUseCase:
                 'enforce_invertibility': False
             }
 
-            model_params = {**default_params, **(parameters or {})}
+            if profile not in TRAINING_PROFILES:
+                raise ValueError(f"Unknown training profile '{profile}'")
 
-            # Entrenar modelo
-            model = SARIMAX(
-                prepared_data['Quantity'],
-                exog=prepared_data['Price'],  # Usar precio como variable exógena
-                **model_params
-            )
-
-            fitted_model = model.fit(disp=False)
-
-            # Guardar modelo
-            self.repository.save_model(
-                model=fitted_model, product_id=product_id, store_id=store_id)
-
-            # Preparar métricas y respuesta
-            response = {
-                "model_info": {
-                    "aic": fitted_model.aic,
-                    "bic": fitted_model.bic,
-                    "parameters": model_params
-                },
-                "data_info": {
-                    "training_start": prepared_data.index[0].strftime('%Y-%m-%d'),
-                    "training_end": prepared_data.index[-1].strftime('%Y-%m-%d'),
-                    "total_observations": len(prepared_data)
-                }
-            }
+            # Solo los campos indicados en la petición reemplazan al perfil
+            if hasattr(parameters, 'model_dump'):
+                parameters = parameters.model_dump(exclude_unset=True)
 
-            return response
+            model_params = {**default_params, **TRAINING_PROFILES[profile], **(parameters or {})}
+            return prepared_data, model_params
 
         except Exception as e:
             raise ValueError(f"Error training model: {str(e)}")
+
+    async def execute(
+            self,
+            product_id: str,
+            store_id: str,
+            parameters: Optional[Dict[str, Any]] = None,
+            warm_start: bool = False,
+            auto_order: Optional[Any] = None,
+            profile: str = "default"
+    ) -> Dict[str, Any]:
+        """
+        Entrena el modelo en el pool de procesos y espera el resultado. Con
+        `auto_order` primero busca el mejor orden en la grilla indicada y
+        guarda el candidato elegido con los parámetros estimados en la búsqueda.
+        `profile` elige el perfil de entrenamiento (ver `TRAINING_PROFILES`).
+        """
+        prepared_data, model_params = self._prepare(product_id, store_id, parameters, profile=profile)
+        if auto_order is None:
+            return _observe_fit(await self.training_jobs.run(
+                fit_and_save_model, prepared_data, product_id, store_id, model_params,
+                warm_start, self.warm_start_maxiter
+            ))
+
+        if hasattr(auto_order, 'model_dump'):
+            auto_order = auto_order.model_dump()
+        search = await self.order_search.search(prepared_data, model_params, auto_order)
+        chosen = search["chosen"]
+        model_params = {**model_params, 'order': chosen['order'], 'seasonal_order': chosen['seasonal_order']}
+        # El elegido ya está estimado: se guarda con sus parámetros, sin reajustarlo
+        result = await self.training_jobs.run(
+            fit_and_save_model, prepared_data, product_id, store_id, model_params,
+            False, self.warm_start_maxiter, chosen['params']
+        )
+        result["order_search"] = search["summary"]
+        return _observe_fit(result)
+
+    def submit(
+            self,
+            product_id: str,
+            store_id: str,
+            parameters: Optional[Dict[str, Any]] = None,
+            warm_start: bool = False,
+            profile: str = "default"
+    ) -> Dict[str, Any]:
+        """Encola el entrenamiento y devuelve el trabajo sin esperar al ajuste."""
+        prepared_data, model_params = self._prepare(product_id, store_id, parameters, profile=profile)
+        return self.training_jobs.submit_job(
+            fit_and_save_model, prepared_data, product_id, store_id, model_params,
+            warm_start, self.warm_start_maxiter,
+            metadata={"product_id": product_id, "store_id": store_id}
+        )
+
+    def submit_once(self, product_id: str, store_id: str) -> Dict[str, Any]:
+        """
+        Encola el entrenamiento del par con los parámetros por defecto, salvo
+        que ya haya uno en cola o en curso; en ese caso devuelve ese trabajo.
+        """
+        job = self.training_jobs.find_active_job(product_id=product_id, store_id=store_id)
+        if job is not None:
+            return job
+        return self.submit(product_id, store_id)
+
+    def resolve_batch_pairs(
+            self,
+            pairs: Optional[List[Tuple[str, str]]] = None,
+            store_id: Optional[str] = None,
+            min_observations: Optional[int] = None
+    ) -> List[Tuple[str, str]]:
+        """
+        Pares a entrenar en lote: los indicados explícitamente o, si no se
+        indican, todos los del dataset filtrados por tienda y por número
+        mínimo de transacciones.
+        """
+        series_index = self.repository.load_snapshot().series_index
+        candidates = pairs if pairs else list(series_index.pairs())
+        return [
+            (product_id, pair_store_id) for product_id, pair_store_id in candidates
+            if (store_id is None or pair_store_id == store_id)
+            and (min_observations is None or series_index.row_count(product_id, pair_store_id) >= min_observations)
+        ]
+
+    async def execute_batch(
+            self,
+            pairs: List[Tuple[str, str]],
+            parameters: Optional[Dict[str, Any]] = None,
+            mode: str = "fit",
+            warm_start: bool = False,
+            profile: str = "default"
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Entrena los pares en paralelo sobre el pool de procesos y entrega el
+        resultado de cada uno a medida que termina. Con `mode="update"` en
+        lugar de reajustar se agregan las observaciones nuevas a los modelos
+        existentes.
+
+        El dataset y su índice se cargan una sola vez para todo el lote, y se
+        mantienen a lo sumo `pool_size` ajustes en vuelo para no agotar la
+        cola compartida con otras peticiones.
+        """
+        snapshot = self.repository.load_snapshot()
+        pending = deque(pairs)
+        in_flight: Dict[asyncio.Future, Tuple[str, str]] = {}
+        max_in_flight = self.training_jobs.pool_size
+
+        while pending or in_flight:
+            while pending and len(in_flight) < max_in_flight:
+                product_id, store_id = pending.popleft()
+                try:
+                    prepared_data, model_params = self._prepare(
+                        product_id, store_id, parameters, snapshot, profile=profile
+                    )
+                    if mode == "update":
+                        future = self.training_jobs.submit(
+                            update_and_save_model, prepared_data, product_id, store_id
+                        )
+                    else:
+                        future = self.training_jobs.submit(
+                            fit_and_save_model, prepared_data, product_id, store_id, model_params,
+                            warm_start, self.warm_start_maxiter
+                        )
+                except TrainingQueueFullError:
+                    # El pool está ocupado por otras peticiones: reintentar luego
+                    pending.appendleft((product_id, store_id))
+                    break
+                except Exception as e:
+                    yield {"product_id": product_id, "store_id": store_id, "status": "failed", "error": str(e)}
+                    continue
+                in_flight[future] = (product_id, store_id)
+
+            if not in_flight:
+                await asyncio.sleep(0.5)
+                continue
+
+            done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                product_id, store_id = in_flight.pop(future)
+                if future.exception() is not None:
+                    yield {
+                        "product_id": product_id,
+                        "store_id": store_id,
+                        "status": "failed",
+                        "error": str(future.exception())
+                    }
+                    continue
+                result = _observe_fit(future.result())
+                model_info = {key: value for key, value in result["model_info"].items() if key != "parameters"}
+                yield {
+                    "product_id": product_id,
+                    "store_id": store_id,
+                    "status": "done",
+                    **model_info,
+                    **result["data_info"]
+                }
@@ -0,0 +1,93 @@
+import time
+from typing import Dict, Any
+
+import pandas as pd
+
+from models.compact_arima_model import CompactArimaModel
+from repositories.model_prediction_repository import PredictionRepository
+from services.data_preparation_service import DataPreparationService
+from services.training_job_service import TrainingJobService
+
+
+def model_training_end(model: Any) -> pd.Timestamp:
+    """Última fecha observada por un modelo guardado (completo o compacto)."""
+    if isinstance(model, CompactArimaModel):
+        if model.training_end is None:
+            raise ValueError("The stored model does not record its training end date")
+        return pd.Timestamp(model.training_end)
+
+    index = getattr(model.model, '_index', None)
+    if not isinstance(index, pd.DatetimeIndex):
+        raise ValueError("The stored model does not have a date index")
+    return index[-1]
+
+
+def update_and_save_model(prepared_data: pd.DataFrame, product_id: str, store_id: str) -> Dict[str, Any]:
+    """
+    Agrega al modelo guardado las observaciones posteriores a su fecha final de
+    entrenamiento, manteniendo fijos sus parámetros, y lo vuelve a guardar.
+    Se ejecuta en un proceso del pool de entrenamiento.
+    """
+    try:
+        start = time.perf_counter()
+        repository = PredictionRepository()
+        model = repository.load_model(product_id, store_id)
+        if model is None:
+            raise ValueError(f"No trained model found for ProductID {product_id} and StoreID {store_id}")
+
+        previous_end = model_training_end(model)
+        new_data = prepared_data.loc[prepared_data.index > previous_end]
+
+        if not new_data.empty:
+            if isinstance(model, CompactArimaModel):
+                model = model.append(
+                    new_data['Quantity'],
+                    exog=new_data['Price'],
+                    training_end=new_data.index[-1].strftime('%Y-%m-%d')
+                )
+            else:
+                model = model.append(new_data['Quantity'], exog=new_data['Price'], refit=False)
+            repository.save_model(model=model, product_id=product_id, store_id=store_id)
+
+        return {
+            "model_info": {
+                "aic": model.aic,
+                "bic": model.bic,
+                "update_seconds": round(time.perf_counter() - start, 4)
+            },
+            "data_info": {
+                "previous_training_end": previous_end.strftime('%Y-%m-%d'),
+                "training_end": model_training_end(model).strftime('%Y-%m-%d'),
+                "new_observations": len(new_data),
+                "total_observations": int(model.nobs)
+            }
+        }
+
+    except Exception as e:
+        raise ValueError(f"Error updating model: {str(e)}")
+
+
+class UpdateARIMAModelUseCase:
+    """
+    Actualiza un modelo existente con las observaciones nuevas sin volver a
+    optimizar sus parámetros; mucho más barato que un reentrenamiento.
+    """
+
+    def __init__(
+            self,
+            repository,
+            data_preparation_service: DataPreparationService,
+            training_job_service: TrainingJobService
+    ):
+        self.repository = repository
+        self.data_preparation = data_preparation_service
+        self.training_jobs = training_job_service
+
+    async def execute(self, product_id: str, store_id: str) -> Dict[str, Any]:
+        try:
+            snapshot = self.repository.load_snapshot()
+            prepared_data = self.data_preparation.get_time_series(snapshot, product_id, store_id)
+        except Exception as e:
+            raise ValueError(f"Error updating model: {str(e)}")
+
+        return await self.training_jobs.run(update_and_save_model, prepared_data, product_id, store_id)
@@ -0,0 +1,92 @@
+"""
+Compara el pronóstico modelo a modelo (SARIMAXResults.forecast y
+CompactArimaModel.forecast) con el pronóstico vectorizado de forecast_many.
+
+Se ajustan unos pocos modelos con órdenes distintos y se replican hasta
+`--models` para simular un lote grande; se verifica además que los
+pronósticos vectorizados coincidan con los de statsmodels.
+
+Uso:
+    python benchmarks/batch_forecast_benchmark.py --models 20000 --steps 30
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import numpy as np  # noqa: E402
+from statsmodels.tsa.statespace.sarimax import SARIMAX  # noqa: E402
+
+from models.batch_forecast import forecast_many  # noqa: E402
+from models.compact_arima_model import CompactArimaModel  # noqa: E402
+from services.data_preparation_service import DataPreparationService  # noqa: E402
+from synthetic_dataset import generate_dataset  # noqa: E402
+
+SPECS = [
+    ((1, 1, 1), (1, 1, 1, 7), 'n'),
+    ((2, 1, 0), (0, 1, 1, 7), 'n'),
+    ((1, 0, 1), (0, 0, 0, 0), 'c'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--models", type=int, default=20000)
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--statsmodels-sample", type=int, default=500,
+                        help="Llamadas a statsmodels cronometradas; el total se extrapola")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    df = generate_dataset(1, len(SPECS), args.days)
+    preparation = DataPreparationService()
+    results, prices = [], []
+    for (product_id, store_id), (order, seasonal_order, trend) in zip(
+            df[['ProductID', 'StoreID']].drop_duplicates().itertuples(index=False), SPECS):
+        series = preparation.prepare_time_series(df, product_id, store_id)
+        results.append(SARIMAX(
+            series['Quantity'], exog=series['Price'], order=order, seasonal_order=seasonal_order, trend=trend,
+            enforce_stationarity=False, enforce_invertibility=False
+        ).fit(disp=False))
+        prices.append(np.full(args.steps, series['Price'].iloc[-1]))
+
+    compact = [CompactArimaModel.from_results(result) for result in results]
+    max_diff = max(
+        np.max(np.abs(np.asarray(result.forecast(args.steps, exog=price)) - forecast))
+        for result, price, forecast in zip(
+            results, prices, forecast_many(compact, [args.steps] * len(compact), prices))
+    )
+
+    positions = [i % len(SPECS) for i in range(args.models)]
+    batch_models = [compact[i] for i in positions]
+    batch_prices = [prices[i] for i in positions]
+
+    sample = min(args.statsmodels_sample, args.models)
+    start = time.perf_counter()
+    for i in positions[:sample]:
+        results[i].forecast(args.steps, exog=prices[i])
+    statsmodels_time = (time.perf_counter() - start) * args.models / sample
+
+    start = time.perf_counter()
+    for model, price in zip(batch_models, batch_prices):
+        model.forecast(args.steps, exog=price)
+    compact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    forecast_many(batch_models, [args.steps] * args.models, batch_prices)
+    vectorized_time = time.perf_counter() - start
+
+    print(f"modelos:                  {args.models:,} ({len(SPECS)} órdenes distintos)")
+    print(f"statsmodels (extrapol.):  {statsmodels_time:.3f} s")
+    print(f"compacto modelo a modelo: {compact_time:.3f} s")
+    print(f"vectorizado:              {vectorized_time:.3f} s")
+    print(f"aceleración vs statsmodels: {statsmodels_time / vectorized_time:.0f}x")
+    print(f"diferencia máxima:        {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
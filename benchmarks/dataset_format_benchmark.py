@@ -0,0 +1,62 @@
+"""
+Compara tamaño en disco y tiempo de carga del CSV frente a la copia Feather tipada.
+
+Uso:
+    python benchmarks/dataset_format_benchmark.py --stores 100 --products 100 --days 365
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import pandas as pd  # noqa: E402
+
+from repositories.columnar_dataset import columnar_path, convert_csv_to_columnar, load_typed_dataset  # noqa: E402
+from synthetic_dataset import generate_dataset  # noqa: E402
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", type=int, default=100)
+    parser.add_argument("--products", type=int, default=100)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        csv_path = os.path.join(tmp_dir, "data_challenge.csv")
+        generate_dataset(args.stores, args.products, args.days).to_csv(csv_path, index=False)
+        feather_path = columnar_path(csv_path)
+
+        conversion = best_of(1, lambda: convert_csv_to_columnar(csv_path, feather_path))
+        csv_load = best_of(args.repeat, lambda: pd.read_csv(csv_path))
+        feather_load = best_of(args.repeat, lambda: load_typed_dataset(csv_path))
+
+        csv_frame = pd.read_csv(csv_path)
+        typed_frame = load_typed_dataset(csv_path)
+
+        print(f"filas:                    {len(csv_frame):,}")
+        print(f"tamaño CSV:               {os.path.getsize(csv_path) / 1e6:,.1f} MB")
+        print(f"tamaño Feather:           {os.path.getsize(feather_path) / 1e6:,.1f} MB")
+        print(f"memoria CSV (pandas):     {csv_frame.memory_usage(deep=True).sum() / 1e6:,.1f} MB")
+        print(f"memoria Feather (pandas): {typed_frame.memory_usage(deep=True).sum() / 1e6:,.1f} MB")
+        print(f"conversión única:         {conversion:.3f} s")
+        print(f"carga CSV:                {csv_load:.3f} s")
+        print(f"carga Feather (mmap):     {feather_load:.3f} s")
+        print(f"aceleración:              {csv_load / feather_load:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
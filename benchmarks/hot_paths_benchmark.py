@@ -0,0 +1,273 @@
+"""
+Mide los caminos críticos del servicio sobre un dataset sintético y compara
+los tiempos contra una línea base guardada.
+
+Se cronometran la carga del dataset, la preparación de series, los precios
+futuros, el entrenamiento SARIMAX, la predicción, el producto más vendido y
+los endpoints HTTP de punta a punta. Todo corre sin red: el CSV se genera en
+un directorio temporal, por lo que nunca se descarga con gdown.
+
+Uso:
+    python benchmarks/hot_paths_benchmark.py --output results.json
+    python benchmarks/hot_paths_benchmark.py --save-baseline benchmarks/baseline.json
+    python benchmarks/hot_paths_benchmark.py --baseline benchmarks/baseline.json --tolerance 0.25
+
+El proceso termina con código 1 si alguna medición supera la línea base en más
+de `--tolerance` (y en más de `--min-delta-ms`, para ignorar ruido en
+mediciones de microsegundos). Las variables de entorno del servicio que no
+fijan rutas (DATASET_STORAGE, MODEL_ARTIFACT_FORMAT, ...) se respetan, de modo
+que se pueden comparar configuraciones.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+APP_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app")
+sys.path.insert(0, APP_DIR)
+
+from synthetic_dataset import generate_dataset  # noqa: E402
+
+
+def measure(fn: Callable[[], Any], repeat: int, warmup: int = 1, setup: Optional[Callable[[], Any]] = None) -> Dict[str, Any]:
+    """Ejecuta `fn` `warmup` + `repeat` veces y resume los tiempos en segundos."""
+    timings = []
+    for i in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if i >= warmup:
+            timings.append(elapsed)
+    return {
+        "repeat": repeat,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "max": max(timings),
+    }
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment_info(args: argparse.Namespace, rows: int) -> Dict[str, Any]:
+    import numpy as np
+    import pandas as pd
+    import statsmodels
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "statsmodels": statsmodels.__version__,
+        "scale": {
+            "stores": args.stores,
+            "products": args.products,
+            "days": args.days,
+            "seed": args.seed,
+            "rows": rows,
+        },
+        "settings": {
+            name: os.environ[name]
+            for name in ("DATASET_STORAGE", "MODEL_ARTIFACT_FORMAT", "TRAINING_POOL_SIZE")
+            if name in os.environ
+        },
+    }
+
+
+def run_benchmarks(args: argparse.Namespace, data_dir: str) -> Dict[str, Dict[str, Any]]:
+    # Las rutas del servicio apuntan al directorio temporal; Settings se
+    # instancia al importar los módulos, así que se importan después
+    os.environ.update(
+        DATABASE_CONNECTION=data_dir,
+        DATASET_FILE="data_challenge.csv",
+        DATASET_ID="offline",
+        ARIMA_MODELS_BUCKET_S3=os.path.join(data_dir, "models"),
+    )
+    os.makedirs(os.environ["ARIMA_MODELS_BUCKET_S3"])
+
+    import pandas as pd
+
+    from models.data_models import ARIMAParameters
+    from repositories.model_prediction_repository import PredictionRepository
+    from services.arima_prediction_service import ArimaPredictionService
+    from services.data_preparation_service import DataPreparationService
+    from services.top_product_service import TopProductService
+    from use_cases.train_arima_model_use_case import fit_and_save_model
+
+    loop = asyncio.new_event_loop()
+    repository = PredictionRepository()
+    preparation = DataPreparationService()
+    prediction = ArimaPredictionService(repository, preparation)
+    top_products = TopProductService(repository)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    snapshot = repository.load_snapshot()
+    product_id, store_id = next(iter(snapshot.series_index.pairs()))
+    rows = snapshot.get_series_rows(product_id, store_id)
+    prepared = preparation.prepare_time_series(rows, product_id, store_id)
+    model_params = ARIMAParameters().model_dump()
+    start_date = prepared.index[0].strftime('%Y-%m-%d')
+    end_date = prepared.index[-1].strftime('%Y-%m-%d')
+
+    def bench(name: str, fn: Callable[[], Any], repeat: int = args.repeat, **kwargs: Any) -> None:
+        results[name] = measure(fn, repeat, **kwargs)
+        print(f"{name:<36} {results[name]['median'] * 1e3:>10.2f} ms", flush=True)
+
+    bench("load_data.cold", repository.load_data, setup=repository._dataset_cache.clear)
+    bench("load_data.warm", repository.load_data)
+    bench("load_series", lambda: repository.load_series(product_id, store_id))
+    bench("prepare_time_series", lambda: preparation.prepare_time_series(rows, product_id, store_id))
+    bench("get_time_series.cached", lambda: preparation.get_time_series(snapshot, product_id, store_id))
+    bench("get_future_prices", lambda: preparation.get_future_prices(
+        prepared, prepared.index[-1] + pd.Timedelta(days=1), args.steps
+    ))
+    bench("sarimax_training", lambda: fit_and_save_model(prepared, product_id, store_id, model_params),
+          repeat=args.train_repeat, warmup=0)
+    bench("predict", lambda: loop.run_until_complete(prediction.predict(args.steps, product_id, store_id)),
+          setup=prediction.clear)
+    bench("predict.cached", lambda: loop.run_until_complete(prediction.predict(args.steps, product_id, store_id)))
+    bench("get_top_product.cold", lambda: loop.run_until_complete(
+        top_products.get_top_product(start_date, end_date)
+    ), setup=repository._dataset_cache.clear)
+    bench("get_top_product.warm", lambda: loop.run_until_complete(
+        top_products.get_top_product(start_date, end_date)
+    ))
+    bench("get_top_product.store", lambda: loop.run_until_complete(
+        top_products.get_top_product(start_date, end_date, store_id)
+    ))
+    loop.close()
+
+    if not args.skip_http:
+        run_http_benchmarks(args, product_id, store_id, start_date, end_date, bench)
+    return results
+
+
+def run_http_benchmarks(
+        args: argparse.Namespace,
+        product_id: str,
+        store_id: str,
+        start_date: str,
+        end_date: str,
+        bench: Callable[..., None]
+) -> None:
+    from fastapi.testclient import TestClient
+
+    import main
+
+    def post(path: str, payload: Dict[str, Any]) -> Callable[[], None]:
+        def call() -> None:
+            response = client.post(path, json=payload)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} devolvió {response.status_code}: {response.text}")
+        return call
+
+    pair = {"product_id": product_id, "store_id": store_id}
+    period = {"start_date": start_date, "end_date": end_date}
+    with TestClient(main.app) as client:
+        bench("http.predict", post("/arima/predict", {**pair, "steps": args.steps}))
+        bench("http.top_product", post("/arima/top-product", period))
+        bench("http.top_products", post("/arima/top-products", {**period, "n": 10, "by_store": True}))
+        # El primer entrenamiento arranca el pool de procesos y queda fuera de la medición
+        bench("http.train", post("/arima/train", pair), repeat=args.train_repeat)
+
+
+def compare(
+        results: Dict[str, Dict[str, Any]],
+        baseline: Dict[str, Any],
+        tolerance: float,
+        min_delta: float
+) -> List[Dict[str, Any]]:
+    """Compara las medianas con la línea base y marca las regresiones."""
+    comparison = []
+    baseline_results = baseline.get("results", {})
+    for name, stats in results.items():
+        if name not in baseline_results:
+            continue
+        reference = baseline_results[name]["median"]
+        ratio = stats["median"] / reference if reference > 0 else float("inf")
+        regression = ratio > 1 + tolerance and stats["median"] - reference > min_delta
+        comparison.append({
+            "name": name,
+            "median": stats["median"],
+            "baseline_median": reference,
+            "ratio": round(ratio, 3),
+            "regression": regression,
+        })
+    return comparison
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--train-repeat", type=int, default=3)
+    parser.add_argument("--skip-http", action="store_true")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="JSON de una ejecución anterior contra el cual comparar")
+    parser.add_argument("--save-baseline", help="Además de --output, guarda los resultados como línea base")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Aumento relativo máximo de la mediana")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Aumento absoluto mínimo para marcar")
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    # Los logs de nivel INFO de cada petición ensucian la salida
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        df = generate_dataset(args.stores, args.products, args.days, seed=args.seed)
+        df.to_csv(os.path.join(data_dir, "data_challenge.csv"), index=False)
+        print(f"{len(df):,} filas sintéticas ({args.stores} tiendas x {args.products} productos x {args.days} días)")
+        report = {"environment": environment_info(args, len(df)), "results": run_benchmarks(args, data_dir)}
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline.get("environment", {}).get("scale") != report["environment"]["scale"]:
+            print("Aviso: la línea base se midió con otra escala de dataset")
+        report["comparison"] = compare(report["results"], baseline, args.tolerance, args.min_delta_ms / 1e3)
+        report["regressions"] = [item["name"] for item in report["comparison"] if item["regression"]]
+        print(f"\n{'medición':<36} {'actual':>10} {'base':>10} {'ratio':>7}")
+        for item in report["comparison"]:
+            flag = "  REGRESIÓN" if item["regression"] else ""
+            print(f"{item['name']:<36} {item['median'] * 1e3:>8.2f}ms {item['baseline_median'] * 1e3:>8.2f}ms "
+                  f"{item['ratio']:>7.2f}{flag}")
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, "w") as output:
+            json.dump(report, output, indent=2)
+        print(f"Resultados escritos en {path}")
+
+    if report.get("regressions"):
+        print(f"{len(report['regressions'])} regresiones respecto de la línea base")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Compara el artefacto completo (SARIMAXResults) frente al artefacto compacto.
+
+Mide tamaño en disco, tiempo de carga y tiempo de pronóstico, y verifica que
+ambos pronósticos coincidan.
+
+Uso:
+    python benchmarks/model_artifact_benchmark.py --days 730
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import joblib  # noqa: E402
+import numpy as np  # noqa: E402
+from statsmodels.tsa.statespace.sarimax import SARIMAX  # noqa: E402
+
+from models.compact_arima_model import CompactArimaModel  # noqa: E402
+from services.data_preparation_service import DataPreparationService  # noqa: E402
+from synthetic_dataset import generate_dataset  # noqa: E402
+
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=730)
+    parser.add_argument("--steps", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    df = generate_dataset(1, 1, args.days)
+    product_id, store_id = df['ProductID'].iloc[0], df['StoreID'].iloc[0]
+    series = DataPreparationService().prepare_time_series(df, product_id, store_id)
+    results = SARIMAX(
+        series['Quantity'], exog=series['Price'],
+        order=(1, 1, 1), seasonal_order=(1, 1, 1, 7),
+        enforce_stationarity=False, enforce_invertibility=False
+    ).fit(disp=False)
+    future_prices = np.full(args.steps, series['Price'].iloc[-1])
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        full_path = os.path.join(tmp_dir, "full.joblib")
+        compact_path = os.path.join(tmp_dir, "compact.joblib")
+        joblib.dump(results, full_path)
+        joblib.dump(CompactArimaModel.from_results(results).to_artifact(), compact_path)
+
+        full_load = best_of(args.repeat, lambda: joblib.load(full_path))
+        compact_load = best_of(args.repeat, lambda: CompactArimaModel(joblib.load(compact_path)))
+
+        full_model = joblib.load(full_path)
+        compact_model = CompactArimaModel(joblib.load(compact_path))
+        full_forecast = best_of(args.repeat, lambda: full_model.forecast(args.steps, exog=future_prices))
+        compact_forecast = best_of(args.repeat, lambda: compact_model.forecast(args.steps, exog=future_prices))
+        max_diff = np.max(np.abs(
+            np.asarray(full_model.forecast(args.steps, exog=future_prices))
+            - compact_model.forecast(args.steps, exog=future_prices)
+        ))
+
+        print(f"observaciones:            {len(series)}")
+        print(f"tamaño completo:          {os.path.getsize(full_path) / 1e3:,.1f} KB")
+        print(f"tamaño compacto:          {os.path.getsize(compact_path) / 1e3:,.1f} KB")
+        print(f"carga completo:           {full_load * 1e3:.2f} ms")
+        print(f"carga compacto:           {compact_load * 1e3:.2f} ms")
+        print(f"pronóstico completo:      {full_forecast * 1e3:.2f} ms")
+        print(f"pronóstico compacto:      {compact_forecast * 1e3:.2f} ms")
+        print(f"diferencia máxima:        {max_diff:.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Mide el throughput de /arima/predict bajo carga concurrente con y sin el
+agrupador de predicciones (PREDICT_COALESCE_WINDOW_MS).
+
+Se entrenan modelos para `--pairs` pares de un dataset sintético y se envían
+`--requests` predicciones con `--concurrency` clientes simultáneos, de punta
+a punta por la aplicación ASGI (sin red). Cada petición elige un par, un
+horizonte y uno de `--price-levels` precios, de modo que hay tanto pronósticos
+por calcular como peticiones idénticas concurrentes. El cache de pronósticos
+se vacía antes de cada ventana para que todas partan del mismo estado.
+
+Uso:
+    python benchmarks/predict_coalescing_benchmark.py --requests 4000 --concurrency 64 --windows 0,2,5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+from synthetic_dataset import generate_dataset  # noqa: E402
+
+
+async def run_load(app, payloads, concurrency):
+    import httpx
+
+    latencies = []
+    queue = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+
+    async def client_loop(client):
+        while not queue.empty():
+            payload = queue.get_nowait()
+            start = time.perf_counter()
+            response = await client.post("/arima/predict", json=payload)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"/arima/predict devolvió {response.status_code}: {response.text}")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+    return elapsed, sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", type=int, default=5)
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--pairs", type=int, default=20, help="Pares con modelo entrenado")
+    parser.add_argument("--requests", type=int, default=4000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--windows", default="0,2,5", help="Ventanas en ms separadas por comas; 0 = sin agrupar")
+    parser.add_argument("--max-batch", type=int, default=256)
+    parser.add_argument("--backend", choices=("per_model", "vectorized"), default="per_model")
+    parser.add_argument("--price-levels", type=int, default=4,
+                        help="Precios distintos por petición; más niveles = menos aciertos de cache")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    warnings.simplefilter("ignore")
+    logging.disable(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        df = generate_dataset(args.stores, args.products, args.days, seed=args.seed)
+        df.to_csv(os.path.join(data_dir, "data_challenge.csv"), index=False)
+        os.environ.update(
+            DATABASE_CONNECTION=data_dir,
+            DATASET_FILE="data_challenge.csv",
+            DATASET_ID="offline",
+            ARIMA_MODELS_BUCKET_S3=os.path.join(data_dir, "models"),
+            FORECAST_BACKEND=args.backend,
+        )
+        os.makedirs(os.environ["ARIMA_MODELS_BUCKET_S3"])
+
+        from dependency_injector import providers
+
+        import main as service_main
+        from models.data_models import ARIMAParameters
+        from services.predict_coalescer import PredictCoalescer
+        from use_cases.train_arima_model_use_case import fit_and_save_model
+
+        container = service_main.container
+        repository = container.repository()
+        preparation = container.data_preparation_service()
+        snapshot = repository.load_snapshot()
+        pairs = list(snapshot.series_index.pairs())[:args.pairs]
+        print(f"Entrenando {len(pairs)} modelos...", flush=True)
+        for product_id, store_id in pairs:
+            prepared = preparation.get_time_series(snapshot, product_id, store_id)
+            fit_and_save_model(prepared, product_id, store_id, ARIMAParameters().model_dump())
+
+        rng = random.Random(args.seed)
+        payloads = []
+        for _ in range(args.requests):
+            product_id, store_id = rng.choice(pairs)
+            steps = rng.choice((7, 14, 30))
+            price = 9.5 + 0.01 * rng.randrange(args.price_levels)
+            payloads.append({
+                "product_id": product_id, "store_id": store_id, "steps": steps, "future_prices": [price] * steps
+            })
+
+        loop = asyncio.new_event_loop()
+        loop.run_until_complete(service_main.startup_event())
+        service = container.arima_service()
+        print(f"{args.requests:,} peticiones, {args.concurrency} clientes concurrentes, backend {args.backend}\n")
+        print(f"{'ventana':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'lotes':>7} {'duplicadas':>11}")
+        for window in [float(value) for value in args.windows.split(",")]:
+            coalescer = PredictCoalescer(service, window_seconds=window / 1000, max_batch=args.max_batch)
+            container.predict_coalescer.override(providers.Object(coalescer))
+            service._forecast_cache.clear()
+            elapsed, latencies = loop.run_until_complete(run_load(service_main.app, payloads, args.concurrency))
+            p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+            print(f"{window:>6.1f}ms {len(payloads) / elapsed:>9.0f} {statistics.median(latencies) * 1e3:>8.2f} "
+                  f"{p99 * 1e3:>8.2f} {coalescer.batches:>7} {coalescer.deduplicated:>11}", flush=True)
+        loop.run_until_complete(service_main.shutdown_event())
+        loop.close()
+
+
+if __name__ == "__main__":
+    main()
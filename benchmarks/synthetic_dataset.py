@@ -0,0 +1,93 @@
+"""
+Generador de un dataset sintético de ventas con el esquema de data_challenge.csv.
+
+Uso:
+    python benchmarks/synthetic_dataset.py --stores 50 --products 200 --days 365 --output /tmp/data.csv
+"""
+import argparse
+import hashlib
+
+import numpy as np
+import pandas as pd
+
+
+def make_ids(prefix: str, count: int) -> np.ndarray:
+    """IDs hexadecimales de 12 caracteres, con el mismo aspecto que los reales."""
+    return np.array([
+        hashlib.sha1(f"{prefix}-{i}".encode()).hexdigest()[:12]
+        for i in range(count)
+    ])
+
+
+def generate_dataset(
+        stores: int,
+        products: int,
+        days: int,
+        start_date: str = "2023-01-01",
+        coverage: float = 0.8,
+        seed: int = 42
+) -> pd.DataFrame:
+    """
+    Genera transacciones diarias por (tienda, producto).
+
+    La cantidad sigue una estacionalidad semanal y responde negativamente al
+    precio; `coverage` es la fracción de días con ventas registradas.
+    """
+    rng = np.random.default_rng(seed)
+    store_ids = make_ids("store", stores)
+    product_ids = make_ids("product", products)
+    dates = pd.date_range(start=start_date, periods=days, freq="D")
+
+    store_idx, product_idx, day_idx = np.meshgrid(
+        np.arange(stores, dtype=np.int32),
+        np.arange(products, dtype=np.int32),
+        np.arange(days, dtype=np.int32),
+        indexing="ij"
+    )
+    store_idx, product_idx, day_idx = store_idx.ravel(), product_idx.ravel(), day_idx.ravel()
+    keep = rng.random(store_idx.size) < coverage
+    store_idx, product_idx, day_idx = store_idx[keep], product_idx[keep], day_idx[keep]
+
+    base_price = rng.uniform(2.0, 40.0, products)
+    base_demand = rng.uniform(5.0, 60.0, (stores, products))
+    weekly_amplitude = rng.uniform(0.1, 0.4, products)
+    elasticity = rng.uniform(0.5, 2.0, products)
+
+    # Precio con promociones ocasionales alrededor del precio base
+    promo = rng.random(store_idx.size) < 0.1
+    price = base_price[product_idx] * np.where(promo, 0.8, 1.0) * rng.normal(1.0, 0.02, store_idx.size)
+    relative_price = price / base_price[product_idx]
+
+    weekly = 1.0 + weekly_amplitude[product_idx] * np.sin(2 * np.pi * (dates.dayofweek.values[day_idx]) / 7)
+    demand = base_demand[store_idx, product_idx] * weekly * relative_price ** (-elasticity[product_idx])
+    quantity = rng.poisson(demand)
+
+    df = pd.DataFrame({
+        "Date": dates[day_idx].strftime("%Y-%m-%d"),
+        "ProductID": product_ids[product_idx],
+        "StoreID": store_ids[store_idx],
+        "Quantity": quantity,
+        "Price": np.round(price, 2),
+    })
+    # Orden aleatorio, como en un log de transacciones real
+    return df.iloc[rng.permutation(len(df))].reset_index(drop=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", type=int, default=20)
+    parser.add_argument("--products", type=int, default=50)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--start-date", default="2023-01-01")
+    parser.add_argument("--coverage", type=float, default=0.8)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", required=True)
+    args = parser.parse_args()
+
+    df = generate_dataset(args.stores, args.products, args.days, args.start_date, args.coverage, args.seed)
+    df.to_csv(args.output, index=False)
+    print(f"{len(df)} filas escritas en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
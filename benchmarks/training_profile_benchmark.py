@@ -0,0 +1,127 @@
+"""
+Compara los perfiles de entrenamiento ("default" y "fast") sobre un catálogo
+sintético: tiempo de ajuste, AIC y error de pronóstico fuera de la muestra.
+
+Para cada par se reservan los últimos `--holdout` días; cada perfil se ajusta
+con el resto de la serie y pronostica el período reservado con sus precios
+reales. Con `--ablation` se mide además cada opción del perfil rápido, y
+`low_memory`, por separado sobre el perfil por defecto.
+
+También se verifica, para cada perfil, que el artefacto compacto se
+actualice igual que statsmodels: se agrega el período reservado con
+`CompactArimaModel.append` y con `SARIMAXResults.append(refit=False)` y se
+comparan el pronóstico siguiente, la log-verosimilitud y el AIC.
+
+Uso:
+    python benchmarks/training_profile_benchmark.py --stores 4 --products 10 --holdout 28 --ablation
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
+
+import numpy as np  # noqa: E402
+
+from models.compact_arima_model import CompactArimaModel  # noqa: E402
+from models.data_models import ARIMAParameters  # noqa: E402
+from models.sarimax_fit import TRAINING_PROFILES, build_sarimax, fit_sarimax  # noqa: E402
+from services.data_preparation_service import DataPreparationService  # noqa: E402
+from synthetic_dataset import generate_dataset  # noqa: E402
+
+
+def evaluate(train, test, model_params):
+    start = time.perf_counter()
+    model = build_sarimax(train, model_params)
+    fitted, mle_retvals = fit_sarimax(train, model, model_params)
+    fit_seconds = time.perf_counter() - start
+    forecast = np.asarray(fitted.forecast(len(test), exog=test['Price'].to_numpy()))
+    errors = forecast - test['Quantity'].to_numpy()
+
+    # Actualización con el período reservado: artefacto compacto vs statsmodels
+    steps = 7
+    future_prices = np.full(steps, test['Price'].iloc[-1])
+    appended = fitted.append(test['Quantity'], exog=test['Price'], refit=False)
+    compact = CompactArimaModel.from_results(fitted).append(test['Quantity'], exog=test['Price'])
+    append_diff = max(
+        float(np.max(np.abs(compact.forecast(steps, exog=future_prices)
+                            - np.asarray(appended.forecast(steps, exog=future_prices))))),
+        abs(compact.llf - float(appended.llf)),
+        abs(compact.aic - float(appended.aic)),
+    )
+    return {
+        "fit_seconds": fit_seconds,
+        "aic": float(fitted.aic),
+        "mae": float(np.mean(np.abs(errors))),
+        "rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "iterations": mle_retvals.get('iterations') or 0,
+        "append_diff": append_diff,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--stores", type=int, default=4)
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--holdout", type=int, default=28, help="Días reservados para medir el error")
+    parser.add_argument("--ablation", action="store_true", help="Medir también cada opción del perfil rápido")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")
+
+    variants = {name: preset for name, preset in TRAINING_PROFILES.items()}
+    if args.ablation:
+        fast = TRAINING_PROFILES["fast"]
+        for key in ('simple_differencing', 'concentrate_scale'):
+            variants[f"solo {key}"] = {key: fast[key]}
+        variants[f"solo maxiter={fast['maxiter']}"] = {'maxiter': fast['maxiter']}
+        # Fuera del perfil rápido, pero expuesto en ARIMAParameters
+        variants["solo low_memory"] = {'low_memory': True}
+
+    df = generate_dataset(args.stores, args.products, args.days, seed=args.seed)
+    preparation = DataPreparationService()
+    defaults = ARIMAParameters().model_dump()
+    pairs = df[['ProductID', 'StoreID']].drop_duplicates().itertuples(index=False)
+
+    results = {name: {} for name in variants}
+    failures = {name: 0 for name in variants}
+    for product_id, store_id in pairs:
+        series = preparation.prepare_time_series(df, product_id, store_id)
+        train, test = series.iloc[:-args.holdout], series.iloc[-args.holdout:]
+        for name, preset in variants.items():
+            try:
+                results[name][(product_id, store_id)] = evaluate(train, test, {**defaults, **preset})
+            except Exception:
+                failures[name] += 1
+
+    baseline = results["default"]
+    print(f"{len(baseline)} pares, {args.days} días, {args.holdout} días reservados\n")
+    print(f"{'perfil':<28} {'ajuste s':>9} {'mediana ms':>11} {'acel.':>6} {'iter.':>6} "
+          f"{'ΔAIC medio':>11} {'MAE':>8} {'RMSE':>8} {'Δappend':>9} {'fallos':>7}")
+    total_default = sum(entry["fit_seconds"] for entry in baseline.values())
+    for name, by_pair in results.items():
+        if not by_pair:
+            print(f"{name:<28} sin ajustes exitosos")
+            continue
+        entries = list(by_pair.values())
+        total = sum(entry["fit_seconds"] for entry in entries)
+        # ΔAIC solo sobre los pares que ambos perfiles pudieron ajustar
+        common = [pair for pair in by_pair if pair in baseline]
+        delta_aic = statistics.mean(
+            by_pair[pair]["aic"] - baseline[pair]["aic"] for pair in common
+        ) if common else float("nan")
+        print(f"{name:<28} {total:>9.2f} {statistics.median(e['fit_seconds'] for e in entries) * 1e3:>11.1f} "
+              f"{total_default / total:>5.1f}x {statistics.mean(e['iterations'] for e in entries):>6.1f} "
+              f"{delta_aic:>11.2f} {statistics.mean(e['mae'] for e in entries):>8.3f} "
+              f"{statistics.mean(e['rmse'] for e in entries):>8.3f} "
+              f"{max(e['append_diff'] for e in entries):>9.1e} {failures[name]:>7}", flush=True)
+    print("\nΔappend: diferencia máxima entre CompactArimaModel.append y SARIMAXResults.append "
+          "(pronóstico, log-verosimilitud y AIC)")
+
+
+if __name__ == "__main__":
+    main()
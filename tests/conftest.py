@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos del servicio se importan desde app/, igual que en los benchmarks
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "app"))
@@ -0,0 +1,166 @@
+import importlib
+import os
+import warnings
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from models.compact_arima_model import CompactArimaModel
+from models.data_models import ARIMAParameters
+from models.sarimax_fit import TRAINING_PROFILES, build_sarimax, filter_sarimax, fit_sarimax
+
+STEPS = 7
+
+
+def daily_series(days, seed=0, start="2024-01-01"):
+    """Serie diaria con estacionalidad semanal y efecto del precio, como la que arma DataPreparationService."""
+    rng = np.random.default_rng(seed)
+    index = pd.date_range(start, periods=days, freq="D")
+    price = 10 + rng.normal(0, 0.5, days).cumsum() * 0.1
+    weekly = 4 * np.sin(2 * np.pi * np.arange(days) / 7)
+    quantity = 30 + weekly - 1.5 * price + rng.normal(0, 1, days).cumsum() * 0.3 + rng.normal(0, 1, days)
+    return pd.DataFrame({"Quantity": quantity, "Price": price}, index=index)
+
+
+@pytest.fixture(scope="module")
+def series():
+    data = daily_series(160)
+    return data.iloc[:130], data.iloc[130:]
+
+
+def fit(train, **overrides):
+    params = {**ARIMAParameters().model_dump(), **overrides}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        fitted, _ = fit_sarimax(train, build_sarimax(train, params), params)
+    return fitted
+
+
+SPECS = {
+    "default": {},
+    "trend": {"order": [1, 0, 1], "seasonal_order": [1, 0, 0, 7], "trend": "ct"},
+    "fast": TRAINING_PROFILES["fast"],
+}
+
+
+@pytest.fixture(scope="module", params=list(SPECS))
+def fitted(request, series):
+    train, _ = series
+    return fit(train, **SPECS[request.param])
+
+
+def future_prices(test):
+    return np.full(STEPS, test["Price"].iloc[-1])
+
+
+def test_forecast_matches_statsmodels(fitted, series):
+    _, test = series
+    compact = CompactArimaModel.from_results(fitted)
+    assert np.allclose(compact.forecast(STEPS, exog=future_prices(test)),
+                       np.asarray(fitted.forecast(STEPS, exog=future_prices(test))))
+    assert np.isclose(compact.llf, fitted.llf)
+    assert np.isclose(compact.aic, fitted.aic)
+    assert np.isclose(compact.bic, fitted.bic)
+
+
+def test_append_matches_statsmodels_without_refit(fitted, series):
+    _, test = series
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        appended = fitted.append(test["Quantity"], exog=test["Price"], refit=False)
+    compact = CompactArimaModel.from_results(fitted).append(
+        test["Quantity"], exog=test["Price"], training_end=test.index[-1].strftime("%Y-%m-%d")
+    )
+    assert compact.nobs == appended.nobs
+    assert compact.training_end == "2024-06-08"
+    assert np.allclose(compact.forecast(STEPS, exog=future_prices(test)),
+                       np.asarray(appended.forecast(STEPS, exog=future_prices(test))))
+    assert np.isclose(compact.llf, appended.llf)
+    assert np.isclose(compact.aic, appended.aic)
+    assert np.isclose(compact.bic, appended.bic)
+
+
+def test_compact_artifact_roundtrip(fitted, series, tmp_path):
+    _, test = series
+    compact = CompactArimaModel.from_results(fitted)
+    path = tmp_path / "model.joblib"
+    joblib.dump(compact.to_artifact(), path)
+    loaded = joblib.load(path)
+    assert CompactArimaModel.is_artifact(loaded)
+    assert np.allclose(CompactArimaModel(loaded).forecast(STEPS, exog=future_prices(test)),
+                       compact.forecast(STEPS, exog=future_prices(test)))
+
+
+def test_forecast_requires_exog(fitted):
+    with pytest.raises(ValueError):
+        CompactArimaModel.from_results(fitted).forecast(STEPS)
+
+
+@pytest.mark.parametrize("spec", list(SPECS))
+def test_filter_sarimax_reproduces_fitted_results(series, spec):
+    # Así se guarda el candidato elegido en la búsqueda de orden, sin reajustarlo
+    train, test = series
+    fitted = fit(train, **SPECS[spec])
+    params = {**ARIMAParameters().model_dump(), **SPECS[spec]}
+    restored = filter_sarimax(train, params, np.asarray(fitted.params).tolist())
+    assert restored.model.param_names == fitted.model.param_names
+    assert np.isclose(restored.llf, fitted.llf)
+    assert np.isclose(restored.aic, fitted.aic)
+    assert np.allclose(np.asarray(restored.forecast(STEPS, exog=future_prices(test))),
+                       np.asarray(fitted.forecast(STEPS, exog=future_prices(test))))
+
+
+@pytest.mark.parametrize("option", ["simple_differencing", "concentrate_scale"])
+def test_unsupported_results_are_rejected(series, option):
+    train, _ = series
+    params = {**ARIMAParameters().model_dump(), option: True}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        raw = build_sarimax(train, params).fit(disp=False, maxiter=10)
+    with pytest.raises(ValueError):
+        CompactArimaModel.from_results(raw)
+
+
+@pytest.fixture
+def repository(tmp_path, monkeypatch):
+    for name, value in {
+        "ARIMA_MODELS_BUCKET_S3": str(tmp_path),
+        "DATABASE_CONNECTION": str(tmp_path),
+        "DATASET_ID": "test",
+        "DATASET_FILE": "sales.csv",
+    }.items():
+        monkeypatch.setenv(name, value)
+    module = importlib.import_module("repositories.model_prediction_repository")
+    monkeypatch.setattr(module.settings, "model_artifact_format", "compact")
+    repository = module.PredictionRepository()
+    repository.model_path = str(tmp_path)
+    return repository
+
+
+def test_repository_falls_back_to_full_artifact(repository, series):
+    train, test = series
+    params = {**ARIMAParameters().model_dump(), "simple_differencing": True}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        raw = build_sarimax(train, params).fit(disp=False, maxiter=10)
+
+    repository.save_model(raw, "p1", "s1")
+    stored = joblib.load(repository._model_file("p1", "s1"))
+    assert not CompactArimaModel.is_artifact(stored)
+    assert stored.model.simple_differencing
+    loaded = repository.load_model("p1", "s1")
+    assert np.allclose(np.asarray(loaded.forecast(STEPS, exog=future_prices(test))),
+                       np.asarray(raw.forecast(STEPS, exog=future_prices(test))))
+    assert not [name for name in os.listdir(repository.model_path) if name.endswith(".tmp")]
+
+
+def test_repository_stores_compact_artifact(repository, fitted, series):
+    _, test = series
+    repository.save_model(fitted, "p1", "s1")
+    assert CompactArimaModel.is_artifact(joblib.load(repository._model_file("p1", "s1")))
+    loaded = repository.load_model("p1", "s1")
+    assert isinstance(loaded, CompactArimaModel)
+    assert np.allclose(loaded.forecast(STEPS, exog=future_prices(test)),
+                       np.asarray(fitted.forecast(STEPS, exog=future_prices(test))))
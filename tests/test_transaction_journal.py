@@ -0,0 +1,251 @@
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+from repositories.columnar_dataset import DATASET_COLUMNS, read_typed_csv
+from repositories.dataset_cache import DatasetCache, OverlaySnapshot
+from repositories.transaction_journal import (
+    append_transactions,
+    journal_lock,
+    journal_path,
+    read_transactions,
+    typed_transactions,
+)
+
+
+def transactions(pairs, day="2024-02-01", quantity=1):
+    return typed_transactions(pd.DataFrame(
+        [{"Date": day, "ProductID": product_id, "StoreID": store_id, "Quantity": quantity, "Price": 2.5}
+         for product_id, store_id in pairs],
+        columns=DATASET_COLUMNS
+    ))
+
+
+def write_csv(path, days):
+    dates = pd.date_range("2024-01-01", periods=days, freq="D")
+    rows = [{"Date": date.strftime("%Y-%m-%d"), "ProductID": product_id, "StoreID": store_id,
+             "Quantity": 3, "Price": 10.0}
+            for product_id in ("p1", "p2") for store_id in ("s1", "s2") for date in dates]
+    pd.DataFrame(rows, columns=DATASET_COLUMNS).to_csv(path, index=False)
+    return len(rows)
+
+
+def touch_later(path):
+    """Adelanta el mtime para que el cambio se note aunque el reloj tenga poca resolución."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = str(tmp_path / "sales.csv")
+    write_csv(path, days=10)
+    return path
+
+
+@pytest.fixture
+def cache():
+    return DatasetCache(loader=read_typed_csv)
+
+
+def test_read_transactions_resumes_from_offset(csv_path):
+    first_size = append_transactions(csv_path, transactions([("p1", "s1"), ("p2", "s1")]))
+    total_size = append_transactions(csv_path, transactions([("p1", "s2")]))
+    assert total_size > first_size
+
+    rows, offset = read_transactions(journal_path(csv_path), 0)
+    assert len(rows) == 3 and offset == total_size
+
+    rows, offset = read_transactions(journal_path(csv_path), first_size)
+    assert rows[['ProductID', 'StoreID']].values.tolist() == [["p1", "s2"]]
+    assert offset == total_size
+
+
+def test_read_transactions_leaves_incomplete_line(csv_path):
+    size = append_transactions(csv_path, transactions([("p1", "s1")]))
+    with open(journal_path(csv_path), "ab") as journal:
+        journal.write(b"2024-02-02,p1,s1,4")
+
+    rows, offset = read_transactions(journal_path(csv_path), 0)
+    assert len(rows) == 1 and offset == size
+
+    with open(journal_path(csv_path), "ab") as journal:
+        journal.write(b",2.5\n")
+    rows, offset = read_transactions(journal_path(csv_path), offset)
+    assert rows['Quantity'].tolist() == [4]
+    assert offset == os.path.getsize(journal_path(csv_path))
+
+
+def test_cache_replays_only_new_journal_bytes(csv_path, cache):
+    base_rows = len(read_typed_csv(csv_path))
+    append_transactions(csv_path, transactions([("p1", "s1")]))
+    snapshot = cache.get_snapshot(csv_path)
+    assert snapshot.row_count == base_rows + 1
+    assert cache.stats()["misses"] == 1
+
+    append_transactions(csv_path, transactions([("p2", "s2"), ("p9", "s1")]))
+    updated = cache.get_snapshot(csv_path)
+    assert cache.stats()["appends"] == 1 and cache.stats()["reloads"] == 0
+    assert updated.row_count == base_rows + 3
+    assert updated.version == snapshot.version + 1
+    assert updated.base_version == snapshot.base_version
+
+    # Solo cambian los pares del lote nuevo
+    assert updated.unchanged_since("p1", "s1", snapshot.version)
+    assert not updated.unchanged_since("p2", "s2", snapshot.version)
+    assert not updated.unchanged_since("p9", "s1", snapshot.version)
+    assert len(updated.get_series_rows("p2", "s2")) == 11
+    assert len(updated.get_series_rows("p9", "s1")) == 1
+
+    # Sin bytes nuevos se devuelve el mismo snapshot
+    assert cache.get_snapshot(csv_path) is updated
+
+    cache.clear()
+    rebuilt = cache.get_snapshot(csv_path)
+    assert rebuilt.row_count == updated.row_count
+    for pair in (("p1", "s1"), ("p2", "s2"), ("p9", "s1")):
+        pd.testing.assert_frame_equal(
+            updated.get_series_rows(*pair).reset_index(drop=True).astype({'ProductID': str, 'StoreID': str}),
+            rebuilt.get_series_rows(*pair).reset_index(drop=True).astype({'ProductID': str, 'StoreID': str})
+        )
+
+
+def test_csv_change_rotates_journal(csv_path, cache):
+    append_transactions(csv_path, transactions([("p1", "s1")]))
+    snapshot = cache.get_snapshot(csv_path)
+
+    # Una exportación nueva del CSV ya incluye lo ingerido hasta ahora
+    new_rows = write_csv(csv_path, days=12)
+    touch_later(csv_path)
+    reloaded = cache.get_snapshot(csv_path)
+    assert cache.stats()["reloads"] == 1
+    assert reloaded.row_count == new_rows
+    assert reloaded.base_version == reloaded.version > snapshot.version
+    assert not reloaded.unchanged_since("p2", "s2", snapshot.version)
+    assert reloaded.unchanged_since("p2", "s2", reloaded.version)
+
+    directory = os.path.dirname(csv_path)
+    archived = [name for name in os.listdir(directory) if name.startswith("sales.journal.") and
+                name.endswith(".csv") and name != os.path.basename(journal_path(csv_path))]
+    assert len(archived) == 1
+    rows, _ = read_transactions(os.path.join(directory, archived[0]))
+    assert len(rows) == 1
+    assert not os.path.exists(journal_path(csv_path))
+
+    # Lo ingerido después de la rotación se aplica sobre el CSV nuevo
+    append_transactions(csv_path, transactions([("p1", "s1")], day="2024-03-01"))
+    assert cache.get_snapshot(csv_path).row_count == new_rows + 1
+    assert cache.stats()["appends"] == 1
+
+
+def test_journal_appended_before_rotation_is_not_double_counted(csv_path, cache):
+    append_transactions(csv_path, transactions([("p1", "s1")]))
+    cache.get_snapshot(csv_path)
+    new_rows = write_csv(csv_path, days=12)
+    touch_later(csv_path)
+
+    # Otro proceso ingiere antes de que este recargue: la rotación ocurre al escribir
+    append_transactions(csv_path, transactions([("p2", "s1")]))
+    rows, _ = read_transactions(journal_path(csv_path))
+    assert rows[['ProductID', 'StoreID']].values.tolist() == [["p2", "s1"]]
+    assert cache.get_snapshot(csv_path).row_count == new_rows + 1
+
+
+def test_journal_shrunk_below_offset_triggers_full_reload(csv_path, cache):
+    base_rows = len(read_typed_csv(csv_path))
+    first_size = append_transactions(csv_path, transactions([("p1", "s1")]))
+    append_transactions(csv_path, transactions([("p2", "s2"), ("p2", "s1")]))
+    snapshot = cache.get_snapshot(csv_path)
+    assert snapshot.row_count == base_rows + 3
+
+    with open(journal_path(csv_path), "r+b") as journal:
+        journal.truncate(first_size)
+    reloaded = cache.get_snapshot(csv_path)
+    assert cache.stats()["reloads"] == 1 and cache.stats()["appends"] == 0
+    assert reloaded.row_count == base_rows + 1
+    assert reloaded.base_version == reloaded.version > snapshot.version
+    assert not reloaded.unchanged_since("p1", "s1", snapshot.version)
+    assert len(reloaded.get_series_rows("p2", "s2")) == 10
+
+
+def test_concurrent_appends_are_not_interleaved(csv_path, cache):
+    threads_count, batches, batch_size = 8, 25, 7
+    pairs = [(f"p{index}", "s1") for index in range(batch_size)]
+    start = threading.Barrier(threads_count)
+
+    def ingest(worker):
+        start.wait()
+        for batch in range(batches):
+            append_transactions(csv_path, transactions(pairs, quantity=worker * 1000 + batch))
+
+    threads = [threading.Thread(target=ingest, args=(worker,)) for worker in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    rows, offset = read_transactions(journal_path(csv_path))
+    assert offset == os.path.getsize(journal_path(csv_path))
+    assert len(rows) == threads_count * batches * batch_size
+    # Cada lote quedó completo y contiguo
+    assert (rows['Quantity'].to_numpy().reshape(-1, batch_size) == rows['Quantity'].to_numpy()[::batch_size, None]).all()
+    assert rows['ProductID'].tolist() == [product_id for product_id, _ in pairs] * threads_count * batches
+
+    snapshot = cache.get_snapshot(csv_path)
+    assert snapshot.row_count == len(read_typed_csv(csv_path)) + len(rows)
+
+
+def test_journal_lock_is_exclusive(csv_path):
+    events = []
+    with journal_lock(csv_path):
+        writer = threading.Thread(target=append_transactions, args=(csv_path, transactions([("p1", "s1")])))
+        writer.start()
+        writer.join(timeout=0.2)
+        events.append(writer.is_alive())
+    writer.join()
+    assert events == [True]
+    assert len(read_transactions(journal_path(csv_path))[0]) == 1
+
+
+class InMemoryDataset:
+    """Dataset de solo lectura mínimo, con la interfaz que usa OverlaySnapshot."""
+
+    def __init__(self, data):
+        self.data = data
+        self.pair_counts = data.groupby(['ProductID', 'StoreID']).size().to_dict()
+        self.row_count = len(data)
+
+    def get_series_rows(self, product_id, store_id):
+        return self.data[(self.data['ProductID'] == product_id) & (self.data['StoreID'] == store_id)]
+
+
+class InMemoryOverlaySnapshot(OverlaySnapshot):
+    def _build_sales_cube(self):
+        raise NotImplementedError
+
+
+def test_overlay_snapshot_indexes_ingested_rows_by_pair(csv_path):
+    data = read_typed_csv(csv_path).astype({'ProductID': str, 'StoreID': str})
+    snapshot = InMemoryOverlaySnapshot.load(InMemoryDataset(data), transactions([("p1", "s1"), ("p2", "s1")]), 1)
+    batches = [
+        transactions([("p2", "s1"), ("p1", "s1"), ("p9", "s9")], day="2024-02-02"),
+        transactions([("p1", "s1")], day="2024-02-03"),
+    ]
+    for version, batch in enumerate(batches, start=2):
+        previous = snapshot
+        snapshot = snapshot.append(batch, version)
+        assert snapshot.row_count == previous.row_count + len(batch)
+
+    ingested = pd.concat([transactions([("p1", "s1"), ("p2", "s1")]), *batches], ignore_index=True)
+    for product_id, store_id in (("p1", "s1"), ("p2", "s1"), ("p9", "s9"), ("p2", "s2")):
+        expected = pd.concat([
+            data[(data['ProductID'] == product_id) & (data['StoreID'] == store_id)],
+            ingested[(ingested['ProductID'] == product_id) & (ingested['StoreID'] == store_id)]
+        ], ignore_index=True)
+        rows = snapshot.get_series_rows(product_id, store_id).reset_index(drop=True)
+        pd.testing.assert_frame_equal(rows, expected, check_dtype=False)
+        assert snapshot.series_index.row_count(product_id, store_id) == len(expected)
+
+    assert snapshot.unchanged_since("p2", "s1", 2) and not snapshot.unchanged_since("p1", "s1", 2)